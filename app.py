@@ -4,13 +4,30 @@ from textual.app import App, ComposeResult
 from textual.widgets import Header, Footer, Input, RichLog, Label
 from textual.binding import Binding
 from rich.markdown import Markdown
+from rich.text import Text
 import asyncio
+import itertools
 import os
-from pathlib import Path
+import sys
+import time
 from core.agent import NeuroAgent
-from core.logger import sys_log
-from core.providers.gemini import GeminiProvider
-from core.providers.ollama import OllamaProvider
+from core.daemon import DEFAULT_SOCKET, serve
+from core.files import FileManager
+from core.remote import RemoteAgent
+from core.widgets import StreamingMarkdown
+
+
+def agent_kwargs():
+    """NeuroAgent settings from the environment (shared by the app and the daemon)."""
+    # Failover: a backup provider starts if the first token takes longer than NEUROTERM_HEDGE_MS
+    hedge_ms = os.getenv("NEUROTERM_HEDGE_MS")
+    fallbacks = {}
+    if os.getenv("OPENROUTER_API_KEY"):
+        fallbacks["openrouter"] = {"api_key": os.getenv("OPENROUTER_API_KEY")}
+    return {"provider_name": "gemini", "api_key": os.getenv("GEMINI_API_KEY", ""), "fallbacks": fallbacks,
+            "hedge_after": float(hedge_ms) / 1000 if hedge_ms else None,
+            # NEUROTERM_FANOUT=1: also search global memory alongside the current project's
+            "fan_out": os.getenv("NEUROTERM_FANOUT") == "1"}
 
 class NeuroTermApp(App):
     CSS = """
@@ -19,6 +36,7 @@ class NeuroTermApp(App):
     Input { dock: bottom; border: solid #00ffff; background: #000000; color: #00ffff; }
     .status { color: #ff00ff; text-align: center; height: 1; display: none; background: #000000; border: solid #ff00ff; }
     .status.thinking { display: block; }
+    StreamingMarkdown { background: #000000; color: #00ff00; border-left: solid #00ff00; }
     """
 
     BINDINGS = [
@@ -26,16 +44,20 @@ class NeuroTermApp(App):
         Binding("ctrl+l", "clear", "Clear"),
     ]
 
-    def __init__(self):
+    def __init__(self, agent=None):
         super().__init__()
-        api_key = os.getenv("GEMINI_API_KEY", "")
-        self.agent = NeuroAgent("gemini", api_key=api_key)
+        # lazy: Chroma, embeddings and the provider SDK load in the background after mount.
+        # With a RemoteAgent all of that already lives in the daemon.
+        self.agent = agent or NeuroAgent(lazy=True, **agent_kwargs())
+        # /scan walks this terminal's tree, even when the agent lives in the daemon
+        self.files = getattr(self.agent, "files", None) or FileManager()
         self.debug_mode = False
         self.thinking_task = None
 
     def compose(self) -> ComposeResult:
         yield Header()
         yield RichLog(id="chat", markup=True)
+        yield StreamingMarkdown(id="stream")
         yield Label("", id="status", classes="status")
         yield Input(placeholder="Enter message or /help...")
         yield Footer()
@@ -44,7 +66,23 @@ class NeuroTermApp(App):
         self.log_widget = self.query_one(RichLog)
         self.input = self.query_one(Input)
         self.status_label = self.query_one("#status")
+        self.stream_view = self.query_one(StreamingMarkdown)
         self.log_widget.write(Markdown("# 🖥️ NEUROTERM v3.0 - Agentic System Online"))
+        if getattr(self.agent, "remote", False):
+            self.log_widget.write(f"🔌 Attached to daemon at {self.agent.path}")
+        # Once the first frame is drawn, open the vector DB and preload Ollama models
+        # in the background; requests wait on readiness
+        self.call_after_refresh(self.run_worker, self.agent.warm_up(), exclusive=False)
+        if not getattr(self.agent, "remote", False):
+            # The daemon runs its own idle compaction
+            self.run_worker(self.agent.idle_compaction(), exclusive=False)
+
+    def _daemon_wide(self):
+        # Settings live on the one shared agent: attached terminals all see the change
+        return " (daemon-wide: every attached terminal)" if getattr(self.agent, "remote", False) else ""
+
+    async def on_unmount(self):
+        await self.agent.aclose()
 
     def start_thinking(self):
         self.status_label.add_class("thinking")
@@ -69,14 +107,15 @@ class NeuroTermApp(App):
         if self.debug_mode:
              self.log_widget.write(Markdown("`[DEBUG] Request sent to Agent Stream...`"))
 
+        # Render as tokens arrive; finished blocks move into the log, the open one stays live
+        self.stream_view.begin(self.log_widget, prefix="**Neuroterm:** ")
         try:
-            response = ""
             async for token in self.agent.stream(msg):
-                response += token
-            self.log_widget.write(Markdown(f"**Neuroterm:** {response}"))
+                self.stream_view.append(token)
         except Exception as e:
-            self.log_widget.write(f"❌ Error: {str(e)}")
+            self.stream_view.append(f"\n\n❌ Error: {str(e)}")
         finally:
+            self.stream_view.end()
             self.stop_thinking()
 
     async def handle_command(self, cmd: str):
@@ -88,11 +127,18 @@ class NeuroTermApp(App):
             if base == "/help":
                 self.log_widget.write(Markdown("""
 **COMMANDS:**
-- `/test <file>`: Run autonomous fix loop
+- `/test <file> [n]`: Run autonomous fix loop (n parallel candidates)
 - `/log`: View system logs
 - `/debug`: Toggle debug mode
 - `/autofix <file>`: Simple one-shot fix
 - `/provider <name>`: Switch AI
+- `/index [path]`: Index project code for RAG
+- `/scan [path] [depth]`: File tree (respects .gitignore)
+- `/cache [on|off|stats|clear]`: Semantic response cache
+- `/backups [file|diff <id>|restore <id>|gc]`: Browse and restore file backups
+- `/stats [all|export <file>]`: Latency percentiles per stage and provider
+- `/compact`: Dedupe, summarize and expire old chat memory
+- `/project [name|path|global|fanout on|off]`: Memory namespace for this terminal
 - `/allow write`: Enable editing
 """))
             
@@ -100,13 +146,16 @@ class NeuroTermApp(App):
                 if not arg:
                     self.log_widget.write("Usage: /test <file>")
                     return
+                # /test <file> [n]: n > 1 races n candidate fixes in parallel
+                path, _, count = arg.partition(" ")
+                candidates = int(count) if count.strip().isdigit() else 1
                 self.start_thinking()
-                async for update in self.agent.autonomous_fix(arg):
+                async for update in self.agent.autonomous_fix(path, candidates=candidates):
                     self.log_widget.write(Markdown(update))
                 self.stop_thinking()
 
             elif base == "/log":
-                logs = sys_log.get_recent_logs(15)
+                logs = (await self.agent.call("log", n=15))["lines"]
                 self.log_widget.write(Markdown("**📝 Recent System Logs:**"))
                 self.log_widget.write("\n".join(logs))
 
@@ -116,13 +165,131 @@ class NeuroTermApp(App):
 
             elif base == "/allow":
                 if arg == "write":
-                    self.agent.files.write_allowed = True
-                    self.log_widget.write("✅ Write Access ENABLED")
+                    await self.agent.call("allow_write")
+                    self.log_widget.write("✅ Write Access ENABLED" + self._daemon_wide())
+
+            elif base == "/project":
+                action, _, value = arg.partition(" ")
+                if action == "fanout":
+                    result = await self.agent.call("project", fan_out=value.strip() == "on")
+                else:
+                    result = await self.agent.call("project", target=arg)
+                if arg and action != "fanout":
+                    self.log_widget.write(f"📁 Memory namespace: {result['project']}")
+                    return
+                lines = [f"- {'▶ ' if p['id'] == result['project'] else ''}`{p['id']}` "
+                         f"{p['root'] or '(memory outside any project)'}: {p['turns']} turns"
+                         for p in result["projects"]]
+                self.log_widget.write(Markdown(
+                    f"**📁 Projects** (global fan-out {'on' if result['fan_out'] else 'off'}):\n\n" + "\n".join(lines)))
 
             elif base == "/provider":
-                self.agent.provider_name = arg
-                self.agent._load_provider()
-                self.log_widget.write(f"✅ Switched to {arg}")
+                await self.agent.call("provider", name=arg)
+                self.log_widget.write(f"✅ Switched to {arg}" + self._daemon_wide())
+
+            elif base == "/index":
+                self.start_thinking()
+                try:
+                    stats = await self.agent.call("index", root=arg)
+                finally:
+                    self.stop_thinking()
+                self.log_widget.write(Markdown(
+                    f"📚 **Indexed** {stats['files']} files into `{stats['project']}` in {stats['seconds']}s: "
+                    f"{stats['reindexed']} re-indexed ({stats['chunks']} chunks), "
+                    f"{stats['unchanged']} unchanged, {stats['removed']} removed"))
+
+            elif base == "/scan":
+                path, _, depth = arg.partition(" ")
+                path = path or "."
+                if not os.path.isdir(path):
+                    self.log_widget.write(f"❌ Not a directory: {path}")
+                    return
+                lines = self.files.iter_tree(path, int(depth) if depth.strip().isdigit() else 3)
+                # Walked on a worker thread and written in batches, so big trees appear as they are found
+                while batch := await asyncio.to_thread(lambda: list(itertools.islice(lines, 200))):
+                    self.log_widget.write(Text("".join(batch).rstrip("\n")))
+
+            elif base == "/cache":
+                state = await self.agent.call("cache", action=arg)
+                if arg == "on":
+                    self.log_widget.write("✅ Response cache ENABLED" + self._daemon_wide())
+                elif arg == "off":
+                    self.log_widget.write("✅ Response cache DISABLED" + self._daemon_wide())
+                elif not state["enabled"]:
+                    self.log_widget.write("Response cache is off. Use /cache on")
+                elif arg == "clear":
+                    self.log_widget.write("🧹 Response cache cleared" + self._daemon_wide())
+                else:
+                    stats = state["stats"]
+                    self.log_widget.write(Markdown(
+                        f"⚡ **Response cache:** {stats['entries']} entries, {stats['hits']} hits / "
+                        f"{stats['misses']} misses ({stats['hit_ratio']:.0%}), "
+                        f"{stats['expired']} expired, {stats['invalidated']} invalidated"))
+
+            elif base == "/backups":
+                action, _, target = arg.partition(" ")
+                try:
+                    result = await self.agent.call("backups", action=action, target=target)
+                except Exception as e:
+                    self.log_widget.write(f"❌ {e}")
+                    return
+                if "diff" in result:
+                    self.log_widget.write(Markdown(f"```diff\n{result['diff'] or 'No changes since this backup.'}\n```"))
+                elif "restored" in result:
+                    self.log_widget.write(f"⏪ Restored backup #{target} to {result['restored']}")
+                elif "gc" in result:
+                    stats = result["gc"]
+                    self.log_widget.write(f"🧹 Dropped {stats['rows']} backups, {stats['blobs']} blobs "
+                                          f"({stats['bytes_freed']} bytes)")
+                else:
+                    lines = [f"- `#{b['id']}` {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(b['timestamp']))} "
+                             f"`{b['path']}` ({b['size'] or '?'}B)" for b in result["backups"]]
+                    stats = result["stats"]
+                    self.log_widget.write(Markdown(
+                        "**🛡️ Backups:**\n" + ("\n".join(lines) or "None yet.") +
+                        f"\n\n{stats['backups']} backups of {stats['files']} files: "
+                        f"{stats['logical_bytes']} bytes stored as {stats['stored_bytes']}"))
+
+            elif base == "/stats":
+                action, _, target = arg.partition(" ")
+                result = await self.agent.call("stats", action=action, target=target)
+                if "exported" in result:
+                    self.log_widget.write(f"📤 Exported {result['exported']} spans to {result['path']}")
+                    return
+                rows, ingest = result["rows"], result["ingest"]
+                self.log_widget.write(Markdown(
+                    f"📥 **Memory ingest:** {ingest['depth']} pending (oldest {ingest['oldest_pending_s']:.1f}s), "
+                    f"{ingest['flushed']} saved, {ingest['failed']} failed, "
+                    f"lag {ingest['last_lag_s']:.2f}s last / {ingest['max_lag_s']:.2f}s max"))
+                if not rows:
+                    self.log_widget.write("No spans recorded yet.")
+                    return
+                table = ["| stage | provider | n | p50 ms | p95 ms | p99 ms | tok/s |", "|---|---|---|---|---|---|---|"]
+                for r in rows:
+                    tok_s = f"{r['tok_s']:.1f}" if r["tok_s"] is not None else ""
+                    table.append(f"| {r['stage']} | {r['provider']} | {r['count']} | {r['p50']:.1f} | "
+                                 f"{r['p95']:.1f} | {r['p99']:.1f} | {tok_s} |")
+                self.log_widget.write(Markdown("**📊 Latency by stage:**\n\n" + "\n".join(table)))
+
+            elif base == "/compact":
+                self.start_thinking()
+                try:
+                    report = await self.agent.call("compact")
+                finally:
+                    self.stop_thinking()
+                before, after = report["before"], report["after"]
+                table = ["| | before | after |", "|---|---|---|"]
+                for key, label in (("logs", "conversation turns"), ("digests", "digests"), ("vectors", "vectors"),
+                                   ("db_bytes", "SQLite bytes"), ("chroma_bytes", "Chroma bytes"),
+                                   ("retrieval_p50_ms", "retrieval p50 ms"), ("retrieval_p95_ms", "retrieval p95 ms")):
+                    table.append(f"| {label} | {before[key]} | {after[key]} |")
+                dedup, summarized = report["deduplicated"], report["summarized"]
+                self.log_widget.write(Markdown(
+                    f"**🗜️ Memory compacted** in {report['seconds']}s: {dedup['vectors']} duplicate vectors dropped "
+                    f"({dedup['logs']} turns merged), {report['expired']} turns expired, "
+                    f"{summarized['turns']} turns summarized into {summarized['digests']} digests, "
+                    f"{report['vacuumed_bytes']} bytes vacuumed"
+                    f"{', vector index rebuilt' if report['rebuilt'] else ''}\n\n" + "\n".join(table)))
 
             elif base == "/autofix":
                 # Legacy simple fix
@@ -138,11 +305,21 @@ class NeuroTermApp(App):
         # Quick one-shot fix wrapper
         if not arg: return
         self.start_thinking()
-        prompt = f"Fix this code:\n{self.agent.files.read_file(arg)}"
+        code = (await self.agent.call("read", path=arg))["content"]
+        prompt = f"Fix this code:\n{code}"
         resp = ""
         async for token in self.agent.stream(prompt): resp += token
         self.log_widget.write(Markdown("**Fix Suggested:**\n" + resp))
         self.stop_thinking()
 
 if __name__ == "__main__":
-    NeuroTermApp().run()
+    # --serve: host one warm agent for every terminal; otherwise attach to a running daemon if there is one
+    if "--serve" in sys.argv:
+        try:
+            asyncio.run(serve(DEFAULT_SOCKET, **agent_kwargs()))
+        except KeyboardInterrupt:
+            pass
+    elif "--local" not in sys.argv and RemoteAgent.available(DEFAULT_SOCKET):
+        NeuroTermApp(RemoteAgent(DEFAULT_SOCKET)).run()
+    else:
+        NeuroTermApp().run()
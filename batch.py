@@ -0,0 +1,238 @@
+"""Headless batch mode: run a JSONL file of jobs through NeuroAgent, no UI.
+
+Each input line is one job:
+
+  {"id": "review-1", "prompt": "Review core/files.py for error handling gaps"}
+  {"id": "fix-1", "fix": "scripts/broken.py", "candidates": 3}
+
+"id" is optional (defaults to the line number). Results are appended to the
+output JSONL as each job finishes, so the output doubles as the checkpoint:
+re-running with the same output file skips every id already recorded
+(--retry-errors re-runs the failed ones, --fresh starts over).
+
+    python batch.py jobs.jsonl -o results.jsonl [--provider gemini] [--model M]
+        [--workers 8] [--concurrency ollama=1,*=4] [--rpm gemini=60]
+        [--retry-errors] [--fresh]
+
+--concurrency caps in-flight generations per provider and --rpm rate-limits
+requests per minute per provider ("*" or a bare number applies to all).
+"ollama" is the local router model; --provider ollama answers as "ollama:<model>".
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from pathlib import Path
+
+from core.agent import NeuroAgent
+from core.limits import ProviderLimiter
+from core.logger import sys_log
+from core.tracing import current_trace, percentile, tracer
+
+
+def parse_limits(spec):
+    """"ollama=1,gemini=8" -> {"ollama": 1.0, "gemini": 8.0}; "4" -> 4.0."""
+    if not spec:
+        return None
+    if "=" not in spec:
+        return float(spec)
+    return {name.strip(): float(value) for name, value in (part.split("=", 1) for part in spec.split(","))}
+
+
+def read_done(path, retry_errors=False):
+    """Ids already recorded in an output file (the last record per id wins)."""
+    status = {}
+    if not path.exists():
+        return set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                # A line cut short by a crash; that job simply runs again
+                continue
+            status[record.get("id")] = record.get("status")
+    return {job_id for job_id, s in status.items() if s == "ok" or not retry_errors}
+
+
+def ends_with_newline(path):
+    with open(path, "rb") as f:
+        if f.seek(0, os.SEEK_END) == 0:
+            return True
+        f.seek(-1, os.SEEK_END)
+        return f.read(1) == b"\n"
+
+
+def read_jobs(path):
+    with open(path, encoding="utf-8") as f:
+        for number, line in enumerate(f, 1):
+            if not line.strip():
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                job = {"error": f"invalid JSON: {e}"}
+            job.setdefault("id", f"line-{number}")
+            yield job
+
+
+class BatchRunner:
+    def __init__(self, agent, output, workers=8):
+        self.agent = agent
+        self.output = output
+        self.workers = workers
+        self.results = []
+        self._out = None
+
+    def _request_span(self):
+        # agent.stream()/autonomous_fix() start a trace in this task's context
+        for span in reversed(tracer.trace(current_trace.get())):
+            if span["name"] in ("request", "fix"):
+                return span
+        return None
+
+    async def _run_prompt(self, job):
+        chunks = []
+        banner = True
+        async for chunk in self.agent.stream(job["prompt"]):
+            if banner:
+                # The routing banner is UI chrome, not part of the answer
+                banner = False
+                continue
+            chunks.append(chunk)
+        answer = "".join(chunks)
+        return {"output": answer, "tokens": len(chunks), "status": "error" if "❌" in answer else "ok"}
+
+    async def _run_fix(self, job):
+        updates = []
+        async for update in self.agent.autonomous_fix(job["fix"], job.get("max_attempts", 3), job.get("candidates", 1)):
+            updates.append(update)
+        ok = bool(updates) and not updates[-1].startswith("⚠️")
+        return {"output": "".join(updates), "status": "ok" if ok else "error"}
+
+    async def run_job(self, job):
+        record = {"id": job["id"]}
+        start = time.perf_counter()
+        try:
+            if "error" in job:
+                raise ValueError(job["error"])
+            if "prompt" in job:
+                record.update(await self._run_prompt(job))
+            elif "fix" in job:
+                record.update(await self._run_fix(job))
+            else:
+                raise ValueError("job needs a 'prompt' or a 'fix' path")
+            span = self._request_span()
+            if span is not None:
+                record["provider"] = span["provider"]
+                record.update({k: span["attrs"][k] for k in ("route", "failover") if k in span["attrs"]})
+        except Exception as e:
+            sys_log.log("BATCH", f"Job {job['id']} failed: {e}", "ERROR")
+            record.update(status="error", error=str(e))
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        self._write(record)
+        return record
+
+    def _write(self, record):
+        self._out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._out.flush()
+        os.fsync(self._out.fileno())
+        self.results.append(record)
+        print(f"[{len(self.results)}] {record['id']}: {record['status']} ({record['seconds']:.1f}s)", file=sys.stderr)
+
+    async def _worker(self, queue):
+        while (job := await queue.get()) is not None:
+            await self.run_job(job)
+
+    async def run(self, jobs):
+        with open(self.output, "a", encoding="utf-8") as out:
+            # Don't glue the first new record onto a line a crash cut short
+            if not ends_with_newline(self.output):
+                out.write("\n")
+            self._out = out
+            queue = asyncio.Queue(maxsize=self.workers * 2)
+            workers = [asyncio.create_task(self._worker(queue)) for _ in range(self.workers)]
+            try:
+                for job in jobs:
+                    await queue.put(job)
+                for _ in workers:
+                    await queue.put(None)
+                await asyncio.gather(*workers)
+            finally:
+                for worker in workers:
+                    worker.cancel()
+        return self.results
+
+
+def report(results, wall):
+    ok = sum(r["status"] == "ok" for r in results)
+    tokens = sum(r.get("tokens", 0) for r in results)
+    print(f"\n{len(results)} jobs ({ok} ok, {len(results) - ok} failed) in {wall:.1f}s")
+    if not results:
+        return
+    print(f"throughput: {len(results) / wall * 60:.1f} requests/min, {tokens / wall:.1f} tokens/s")
+    by_provider = {}
+    for r in results:
+        by_provider.setdefault(r.get("provider") or "-", []).append(r)
+    print(f"\n{'provider':12} {'jobs':>5} {'tokens':>7} {'p50 s':>7} {'p95 s':>7}")
+    for provider, group in sorted(by_provider.items()):
+        seconds = [r["seconds"] for r in group]
+        print(f"{provider:12} {len(group):5} {sum(r.get('tokens', 0) for r in group):7} "
+              f"{percentile(seconds, 50):7.2f} {percentile(seconds, 95):7.2f}")
+
+
+def build_agent(args):
+    kwargs = {"model": args.model} if args.model else {}
+    if args.provider != "ollama":
+        kwargs["api_key"] = os.getenv(f"{args.provider.upper()}_API_KEY", "")
+    fallbacks = {}
+    if args.provider != "openrouter" and os.getenv("OPENROUTER_API_KEY"):
+        fallbacks["openrouter"] = {"api_key": os.getenv("OPENROUTER_API_KEY")}
+    hedge_ms = os.getenv("NEUROTERM_HEDGE_MS")
+    limiter = ProviderLimiter(parse_limits(args.concurrency), parse_limits(args.rpm))
+    return NeuroAgent(args.provider, lazy=True, fallbacks=fallbacks, limiter=limiter,
+                      hedge_after=float(hedge_ms) / 1000 if hedge_ms else None, **kwargs)
+
+
+async def run(args):
+    output = Path(args.output)
+    if args.fresh and output.exists():
+        output.unlink()
+    done = read_done(output, args.retry_errors)
+    if done:
+        print(f"Resuming: {len(done)} jobs already in {output}", file=sys.stderr)
+    agent = build_agent(args)
+    await agent.warm_up()
+    runner = BatchRunner(agent, output, args.workers)
+    start = time.perf_counter()
+    try:
+        await runner.run(job for job in read_jobs(args.jobs) if job["id"] not in done)
+    finally:
+        await agent.aclose()
+        report(runner.results, time.perf_counter() - start)
+    return runner.results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("jobs", help="input JSONL")
+    parser.add_argument("-o", "--output", default="results.jsonl")
+    parser.add_argument("--provider", default="gemini")
+    parser.add_argument("--model")
+    parser.add_argument("--workers", type=int, default=8, help="jobs in flight")
+    parser.add_argument("--concurrency", default="ollama=1,*=4", help="in-flight generations per provider")
+    parser.add_argument("--rpm", help="requests per minute per provider")
+    parser.add_argument("--retry-errors", action="store_true")
+    parser.add_argument("--fresh", action="store_true", help="discard the existing output")
+    args = parser.parse_args()
+    try:
+        results = asyncio.run(run(args))
+    except KeyboardInterrupt:
+        sys.exit(130)
+    sys.exit(0 if all(r["status"] == "ok" for r in results) else 1)
+
+
+if __name__ == "__main__":
+    main()
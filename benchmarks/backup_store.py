@@ -0,0 +1,109 @@
+"""Bytes on disk per 100 auto-fix style edits, legacy copies vs BackupStore.
+
+Starts from a synthetic ~`kb` KB Python module and applies `edits` small
+patches (change a line, insert a few lines, delete one), backing the file
+up before each one the way autonomous_fix does. Every fifth iteration the
+"fix" is a no-op retry, so the same content is backed up twice.
+
+  copy          legacy behaviour: a full .bak copy per backup
+  full          BackupStore(delta=False): compressed, deduplicated blobs
+  delta         BackupStore(delta=True): blobs stored as line deltas
+
+Each backup is then restored and compared byte-for-byte with the version
+it came from; restore latency is reported as p50/max.
+
+    python -m benchmarks.backup_store [edits] [kb]
+"""
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.backups import BackupStore
+from core.storage import SQLiteStore
+
+
+def module_source(kb, rng):
+    lines = []
+    i = 0
+    while sum(len(l) for l in lines) < kb * 1024:
+        lines += [f"def handler_{i}(request, retries={rng.randint(1, 5)}):\n",
+                  f"    value = request.get('field_{i}', {rng.randint(0, 999)})\n",
+                  f"    if value > {rng.randint(0, 999)}:\n",
+                  f"        return compute_{i % 17}(value, retries)\n",
+                  "    return None\n", "\n"]
+        i += 1
+    return lines
+
+
+def edit(lines, rng, n):
+    lines = list(lines)
+    at = rng.randrange(len(lines))
+    kind = n % 3
+    if kind == 0:
+        lines[at] = lines[at].rstrip("\n") + f"  # fix {n}\n"
+    elif kind == 1:
+        lines[at:at] = [f"    log.debug('attempt {n}')\n", f"    value = sanitize(value, {n})\n"]
+    else:
+        del lines[at]
+    return lines
+
+
+def dir_bytes(path):
+    return sum(p.stat().st_size for p in Path(path).rglob("*") if p.is_file())
+
+
+def run(mode, edits, kb, tmp):
+    rng = random.Random(7)
+    work = Path(tmp) / mode
+    work.mkdir()
+    target = work / "module.py"
+    lines = module_source(kb, rng)
+    versions = []
+    store = None if mode == "copy" else BackupStore(
+        SQLiteStore.open(work / "b.db"), work / "blobs", delta=mode == "delta", keep_per_file=0)
+
+    start = time.perf_counter()
+    for n in range(edits):
+        target.write_text("".join(lines))
+        if store is None:
+            dest = work / f"module.py.{n}.bak"
+            shutil.copy2(target, dest)
+            versions.append((dest, target.read_bytes()))
+        else:
+            versions.append((store.save(target)["id"], target.read_bytes()))
+        if n % 5 != 4:
+            lines = edit(lines, rng, n)
+    save_s = time.perf_counter() - start
+
+    restore = []
+    for ref, expected in versions:
+        t = time.perf_counter()
+        data = ref.read_bytes() if store is None else store.read(ref)
+        restore.append((time.perf_counter() - t) * 1000)
+        assert data == expected, f"{mode}: restored content differs"
+
+    size = sum(p.stat().st_size for p in work.glob("*.bak")) if store is None else dir_bytes(work / "blobs")
+    return size, save_s, restore
+
+
+def main():
+    edits = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    kb = int(sys.argv[2]) if len(sys.argv) > 2 else 40
+    print(f"{edits} backups of a ~{kb}KB module (every 5th is an unchanged retry)")
+    print(f"{'mode':6} {'bytes':>10} {'per edit':>9} {'ratio':>7} {'save ms':>8} {'restore p50':>12} {'max':>7}")
+    with tempfile.TemporaryDirectory() as tmp:
+        baseline = None
+        for mode in ("copy", "full", "delta"):
+            size, save_s, restore = run(mode, edits, kb, tmp)
+            baseline = baseline or size
+            print(f"{mode:6} {size:10} {size // edits:9} {baseline / size:6.1f}x {save_s / edits * 1000:8.2f} "
+                  f"{statistics.median(restore):10.2f}ms {max(restore):5.2f}ms")
+        SQLiteStore.close_all()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+"""FileManager.tree / iter_files on a synthetic monorepo, legacy walk vs DirWalker.
+
+Builds `files` files (default 100k) in a scratch git repo: source packages a
+few levels deep, plus a node_modules tree, a .git directory and .gitignored
+build output (about a third of all files) that should never be walked.
+
+  legacy        the previous tree(): recursive Path.iterdir + is_dir, no ignore rules
+  cold          DirWalker, empty snapshot (scandir per directory)
+  warm          DirWalker again, nothing changed (one stat per directory)
+  touched       warm, after adding a file to 1% of directories
+
+Each is timed for a full walk (max_depth=None) and for tree() at the
+default depth/entry limits; for the streaming API (iter_tree), time to the first entry.
+
+    python -m benchmarks.dir_walker [files]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.files import FileManager
+
+
+def build(root, files, seed=0):
+    rng = random.Random(seed)
+    (root / ".git").mkdir()
+    (root / ".gitignore").write_text("*.pyc\nbuild-*/\n/coverage/\n")
+    shares = {"src": 0.66, "node_modules": 0.2, "build-out": 0.06, "coverage": 0.04, ".git/objects": 0.04}
+    dirs = []
+    for top, share in shares.items():
+        count = int(files * share)
+        made = 0
+        while made < count:
+            parts = [top] + [f"{'pkg' if i == 0 else 'mod'}{rng.randrange(12)}" for i in range(rng.randint(1, 4))]
+            d = root.joinpath(*parts)
+            d.mkdir(parents=True, exist_ok=True)
+            dirs.append(d)
+            for i in range(min(rng.randint(5, 40), count - made)):
+                ext = rng.choice((".py", ".py", ".js", ".md", ".pyc", ".json"))
+                (d / f"file_{made}{ext}").write_bytes(b"x = 1\n")
+                made += 1
+    return sorted({d for d in dirs if d.parts[len(root.parts)] == "src"})
+
+
+def legacy_walk(path):
+    """What tree() did, without its depth limit: every directory, no pruning."""
+    out = []
+    stack = [Path(path)]
+    while stack:
+        for entry in sorted(stack.pop().iterdir()):
+            out.append(entry)
+            if entry.is_dir():
+                stack.append(entry)
+    return out
+
+
+def legacy_tree(path, level=0):
+    path = Path(path)
+    tree_str = f"{path.name}/\n" if level == 0 else ""
+    for entry in sorted(path.iterdir()):
+        prefix = "  " * (level + 1)
+        if entry.is_dir():
+            tree_str += f"{prefix}📁 {entry.name}/\n"
+            if level < 2:
+                tree_str += legacy_tree(entry, level + 1)
+        else:
+            tree_str += f"{prefix}📄 {entry.name}\n"
+    return tree_str
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return (time.perf_counter() - start) * 1000, result
+
+
+def first_entry_ms(files, root):
+    start = time.perf_counter()
+    lines = files.iter_tree(root)
+    next(lines)  # the root's own line
+    next(lines)
+    return (time.perf_counter() - start) * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    with tempfile.TemporaryDirectory() as tmp:
+        root = Path(tmp) / "monorepo"
+        root.mkdir()
+        start = time.perf_counter()
+        src_dirs = build(root, count)
+        print(f"Built {count} files in {time.perf_counter() - start:.1f}s")
+        # Let every directory age past the walker's racy window so it can be cached
+        time.sleep(2.1)
+
+        rows = []
+        ms, found = timed(legacy_walk, root)
+        tree_ms, _ = timed(legacy_tree, root)
+        rows.append(("legacy", ms, sum(1 for p in found if p.is_file()), tree_ms, None))
+
+        def walk(files):
+            return sum(1 for _ in files.walker.walk(root, files_only=True))
+
+        # Cold: a fresh snapshot for each measurement
+        walk_ms, found = timed(walk, FileManager())
+        tree_ms, _ = timed(FileManager().tree, root)
+        rows.append(("cold", walk_ms, found, tree_ms, first_entry_ms(FileManager(), root)))
+
+        files = FileManager()
+        walk(files)
+        files.tree(root)
+        for label in ("warm", "touched"):
+            if label == "touched":
+                for d in random.Random(1).sample(src_dirs, max(1, len(src_dirs) // 100)):
+                    (d / "added.py").write_text("y = 2\n")
+                time.sleep(2.1)
+            walk_ms, found = timed(walk, files)
+            tree_ms, _ = timed(files.tree, root)
+            rows.append((label, walk_ms, found, tree_ms, first_entry_ms(files, root)))
+
+        print(f"\n{'':10} {'full walk ms':>13} {'files':>8} {'tree() ms':>10} {'1st entry ms':>13}")
+        for label, walk_ms, found, tree_ms, first in rows:
+            first = f"{first:.2f}" if first is not None else "-"
+            print(f"{label:10} {walk_ms:>13.1f} {found:>8} {tree_ms:>10.1f} {first:>13}")
+        print(f"\nsnapshot: {files.walker.stats()}")
+        iter_ms, _ = timed(lambda: sum(1 for _ in files.iter_files(root)))
+        print(f"iter_files (walk + stat per file, warm): {iter_ms:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,292 @@
+"""End-to-end latency/throughput suite against local stand-in LLM servers.
+
+Starts benchmarks.fake_llm (Ollama NDJSON + OpenAI-compatible SSE), points
+the app at it through OLLAMA_HOST and the OpenRouter provider's base_url,
+and runs in a scratch directory:
+
+  route     NeuroGraph.route_request over a mixed prompt set (tiers + latency)
+  stream    NeuroAgent.stream, sequential and `concurrency` at a time:
+            time to first token, total time, tokens/s
+  memory    IngestQueue write-behind throughput, retrieve_context latency
+  autofix   autonomous_fix on a broken script, serial and 3 candidates
+  cache     response cache: an identical repeat must be a hit (and not be
+            routed), editing a file the answer referenced must turn it into a miss
+
+Every metric is saved to a JSON file (--save). With --baseline, metrics are
+compared against a previous run and regressions beyond --threshold are
+flagged (and fail the run with --fail-on-regression).
+
+    python -m benchmarks.e2e [--scenarios route,stream,memory,autofix,cache] [--requests 40]
+        [--concurrency 8] [--ttft-ms 150] [--rate 60] [--jitter 0.2]
+        [--save results.json] [--baseline baseline.json] [--threshold 0.1]
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_llm import FakeLLMServer
+from core.tracing import percentile
+
+ROUTE_PROMPTS = [
+    "explain what this function does",
+    "what does the retry handler return",
+    "refactor the cache module to remove the global state",
+    "design a plugin architecture for providers",
+    "show me the file config.py",
+    "why is the worker slow under load",
+    "look at the queue and tell me about it",
+    "migrate the storage layer to async",
+]
+
+
+def distribution(prefix, values, unit="ms"):
+    return {f"{prefix}.p50_{unit}": percentile(values, 50), f"{prefix}.p95_{unit}": percentile(values, 95),
+            f"{prefix}.p99_{unit}": percentile(values, 99)}
+
+
+async def scenario_route(args, tmp):
+    from core.graph import NeuroGraph
+    from core.memory import MemoryManager
+    graph = NeuroGraph(db_path=Path(tmp) / "route.db")
+    graph.set_embedder(MemoryManager(db_path=Path(tmp) / "route_mem.db", chroma_path=str(Path(tmp) / "chroma"),
+                                     lazy=True).embed_query)
+    latencies = []
+    for i in range(args.requests * 2):
+        prompt = f"{ROUTE_PROMPTS[i % len(ROUTE_PROMPTS)]} (case {i % 13})"
+        start = time.perf_counter()
+        await graph.route_request(prompt)
+        latencies.append((time.perf_counter() - start) * 1000)
+    metrics = distribution("route", latencies)
+    metrics.update({f"route.tier_{tier}": count for tier, count in graph.route_stats.items()})
+    return metrics
+
+
+async def run_stream(agent, prompt):
+    start = time.perf_counter()
+    first, tokens = None, 0
+    banner = True
+    async for token in agent.stream(prompt):
+        if banner:
+            # The first chunk is the routing banner, not model output
+            banner = False
+            continue
+        if first is None:
+            first = time.perf_counter() - start
+        tokens += 1
+    return first or 0.0, time.perf_counter() - start, tokens
+
+
+async def scenario_stream(args, tmp, server):
+    from core.agent import NeuroAgent
+    agent = NeuroAgent("openrouter", api_key="bench", model="fake", base_url=f"{server.url}/v1", lazy=True)
+    await agent.warm_up()
+    prompts = [f"{ROUTE_PROMPTS[i % len(ROUTE_PROMPTS)]} #{i}" for i in range(args.requests)]
+
+    sequential = [await run_stream(agent, p) for p in prompts]
+
+    slots = asyncio.Semaphore(args.concurrency)
+
+    async def limited(prompt):
+        async with slots:
+            return await run_stream(agent, prompt)
+
+    start = time.perf_counter()
+    concurrent = await asyncio.gather(*(limited(p) for p in prompts))
+    wall = time.perf_counter() - start
+    await agent.aclose()
+
+    metrics = {}
+    metrics.update(distribution("stream.ttft", [r[0] * 1000 for r in sequential]))
+    metrics.update(distribution("stream.total", [r[1] * 1000 for r in sequential]))
+    metrics["stream.tokens_per_s"] = sum(r[2] for r in sequential) / sum(r[1] for r in sequential)
+    metrics.update(distribution(f"stream.c{args.concurrency}.ttft", [r[0] * 1000 for r in concurrent]))
+    metrics[f"stream.c{args.concurrency}.requests_per_s"] = len(concurrent) / wall
+    metrics[f"stream.c{args.concurrency}.tokens_per_s"] = sum(r[2] for r in concurrent) / wall
+    return metrics
+
+
+async def scenario_memory(args, tmp):
+    from core.ingest import IngestQueue
+    from core.memory import MemoryManager
+    memory = MemoryManager(db_path=Path(tmp) / "mem.db", chroma_path=str(Path(tmp) / "mem_chroma"))
+    ingest = IngestQueue(memory)
+    n = args.requests * 5
+
+    start = time.perf_counter()
+    for i in range(n):
+        ingest.submit(f"how do I fix the parser_{i} error", f"Validate the input to parser_{i} first.", "")
+    submitted = time.perf_counter() - start
+    await ingest.drain()
+    total = time.perf_counter() - start
+
+    latencies = []
+    for i in range(args.requests):
+        start = time.perf_counter()
+        await asyncio.to_thread(memory.retrieve_context, f"parser_{i * 7 % n} keeps failing")
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    metrics = {"memory.submit_us": submitted / n * 1e6, "memory.ingest_per_s": n / total}
+    metrics.update(distribution("memory.retrieve", latencies))
+    return metrics
+
+
+async def scenario_autofix(args, tmp, server):
+    from core.agent import NeuroAgent
+    agent = NeuroAgent("openrouter", api_key="bench", model="fake", base_url=f"{server.url}/v1", lazy=True)
+    script = Path(tmp) / "broken.py"
+    metrics = {}
+    for candidates in (1, 3):
+        latencies = []
+        for _ in range(max(args.requests // 10, 3)):
+            script.write_text("import sys\nvalue = 41\nraise RuntimeError('BUG')\nprint(value + 1)\n")
+            start = time.perf_counter()
+            async for update in agent.autonomous_fix(str(script), candidates=candidates):
+                pass
+            latencies.append((time.perf_counter() - start) * 1000)
+            if "BUG" in script.read_text():
+                raise RuntimeError(f"autofix with {candidates} candidates did not fix the script: {update!r}")
+        metrics.update(distribution(f"autofix.n{candidates}", latencies))
+    await agent.aclose()
+    return metrics
+
+
+async def scenario_cache(args, tmp, server):
+    from core.agent import NeuroAgent
+    agent = NeuroAgent("openrouter", api_key="bench", model="fake", base_url=f"{server.url}/v1", lazy=True,
+                       response_cache=True)
+    source = Path(tmp) / "handler.py"
+    source.write_text("def handle(request):\n    return None\n")
+    latencies = {"miss": [], "hit": []}
+    for prompt in ("why does the retry handler give up after one attempt", f"what does {source} return"):
+        for i in range(3):
+            start = time.perf_counter()
+            async for _ in agent.stream(prompt):
+                pass
+            latencies["hit" if i else "miss"].append((time.perf_counter() - start) * 1000)
+            # The saved turn is what the repeat retrieves
+            await agent.ingest.drain()
+    stats = agent.response_cache.stats()
+    if stats["hits"] != 4:
+        raise RuntimeError(f"identical repeats were not served from the cache: {stats}")
+    # Hits are answered before routing: only the two misses were routed
+    if sum(agent.graph.route_stats.values()) != 2:
+        raise RuntimeError(f"cache hits were routed: {dict(agent.graph.route_stats)}")
+    source.write_text("def handle(request):\n    return request\n")
+    async for _ in agent.stream(f"what does {source} return"):
+        pass
+    if agent.response_cache.stats()["invalidated"] != 1:
+        raise RuntimeError(f"editing a referenced file did not invalidate: {agent.response_cache.stats()}")
+    await agent.aclose()
+    metrics = {"cache.hit_ratio": stats["hit_ratio"]}
+    metrics.update(distribution("cache.miss", latencies["miss"]))
+    metrics.update(distribution("cache.hit", latencies["hit"]))
+    return metrics
+
+
+def compare(results, baseline, threshold):
+    """Print per-metric change vs baseline. Returns the regressed metric names."""
+    regressions = []
+    print(f"\n{'metric':36} {'baseline':>12} {'now':>12} {'change':>8}")
+    for name, now in sorted(results["metrics"].items()):
+        before = baseline["metrics"].get(name)
+        if before is None or "tier_" in name:
+            continue
+        change = (now - before) / before if before else 0.0
+        # *_per_s is better higher, everything else (latency) better lower
+        worse = -change if name.endswith("_per_s") else change
+        flag = "  REGRESSION" if worse > threshold else ""
+        if flag:
+            regressions.append(name)
+        print(f"{name:36} {before:12.2f} {now:12.2f} {change:+7.1%}{flag}")
+    return regressions
+
+
+async def run(args):
+    server = FakeLLMServer(ttft_ms=args.ttft_ms, tokens_per_s=args.rate, jitter=args.jitter,
+                           answer_tokens=args.tokens, embed_ms=args.embed_ms).start()
+    os.environ["OLLAMA_HOST"] = server.url
+    metrics = {}
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            # Default data paths (neuroterm.db, embedding cache, backups) resolve here too
+            os.environ["NEUROTERM_HOME"] = tmp
+            from core.logger import sys_log
+            from core.tracing import tracer
+            sys_log.configure(log_file=Path(tmp) / "system.log")
+            tracer.db_path = Path(tmp) / "spans.db"
+            try:
+                for name in args.scenarios.split(","):
+                    start = time.perf_counter()
+                    if name == "route":
+                        found = await scenario_route(args, tmp)
+                    elif name == "stream":
+                        found = await scenario_stream(args, tmp, server)
+                    elif name == "memory":
+                        found = await scenario_memory(args, tmp)
+                    elif name == "autofix":
+                        found = await scenario_autofix(args, tmp, server)
+                    elif name == "cache":
+                        found = await scenario_cache(args, tmp, server)
+                    else:
+                        raise SystemExit(f"unknown scenario {name}")
+                    print(f"[{name}] done in {time.perf_counter() - start:.1f}s")
+                    metrics.update(found)
+            finally:
+                from core.storage import SQLiteStore
+                tracer.flush()
+                sys_log.stop()
+                SQLiteStore.close_all()
+                os.chdir(cwd)
+    finally:
+        server.stop()
+    return metrics
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--scenarios", default="route,stream,memory,autofix,cache")
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--ttft-ms", type=float, default=150)
+    parser.add_argument("--rate", type=float, default=60, help="tokens/s per stream")
+    parser.add_argument("--jitter", type=float, default=0.2)
+    parser.add_argument("--tokens", type=int, default=60, help="tokens per answer")
+    parser.add_argument("--embed-ms", type=float, default=10)
+    parser.add_argument("--save", help="write results JSON here")
+    parser.add_argument("--baseline", help="compare against this results JSON")
+    parser.add_argument("--threshold", type=float, default=0.10)
+    parser.add_argument("--fail-on-regression", action="store_true")
+    args = parser.parse_args()
+
+    metrics = asyncio.run(run(args))
+    results = {
+        "meta": {"time": time.time(), "python": platform.python_version(), "platform": platform.platform(),
+                 "config": {k: v for k, v in vars(args).items() if k not in ("save", "baseline")}},
+        "metrics": metrics,
+    }
+    print(f"\n{'metric':36} {'value':>12}")
+    for name, value in sorted(metrics.items()):
+        print(f"{name:36} {value:12.2f}")
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(results, indent=2))
+        print(f"\nSaved to {args.save}")
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text())
+        if baseline["meta"]["config"] != results["meta"]["config"]:
+            print("\nNote: baseline was recorded with a different configuration")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions and args.fail_on_regression:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Replays a synthetic session through CachedEmbeddings and reports hit ratios.
+
+The inner embedder is a stand-in that sleeps for a fixed per-text latency
+(default 25ms, roughly a warm nomic-embed-text call), so "saved" time is
+what the same session would have spent waiting on Ollama. The session is
+run twice: the second run models a restart, served from the SQLite tier.
+
+    python -m benchmarks.embedding_cache [turns] [latency_ms]
+"""
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.embeddings import CachedEmbeddings
+from core.storage import SQLiteStore
+
+
+class StandInEmbeddings:
+    def __init__(self, latency, dim=768):
+        self.latency = latency
+        self.dim = dim
+        self.calls = 0
+
+    def _vec(self, text):
+        rng = random.Random(text)
+        return [rng.random() for _ in range(self.dim)]
+
+    def embed_documents(self, texts):
+        self.calls += len(texts)
+        time.sleep(self.latency * len(texts))
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def session(turns, seed=7):
+    """Queries with the repetition of a real session, plus re-ingested chunks."""
+    rng = random.Random(seed)
+    topics = [f"how does module {i} handle errors" for i in range(turns // 4)]
+    events = []
+    for turn in range(turns):
+        query = rng.choice(topics) if rng.random() < 0.6 else f"one-off question {turn}"
+        events.append(("query", query))
+        chunks = [f"User: {query}\nAI: answer chunk {j}" for j in range(3)]
+        events.append(("docs", chunks))
+    return events
+
+
+def replay(cache, events):
+    start = time.perf_counter()
+    for kind, payload in events:
+        if kind == "query":
+            cache.embed_query(payload)
+        else:
+            cache.embed_documents(payload)
+    return time.perf_counter() - start
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 25) / 1000
+    events = session(turns)
+    texts = sum(1 if k == "query" else len(p) for k, p in events)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Path(tmp) / "emb.db"
+        for label in ("cold", "restart"):
+            inner = StandInEmbeddings(latency)
+            cache = CachedEmbeddings(inner, "stand-in", db_path=db)
+            elapsed = replay(cache, events)
+            s = cache.stats()
+            uncached = texts * latency
+            print(f"{label:8} texts={texts} inner_calls={inner.calls} hit_ratio={s['hit_ratio']:.2%} "
+                  f"(mem {s['memory_hits']}, disk {s['disk_hits']}) time={elapsed:.2f}s "
+                  f"vs uncached {uncached:.2f}s, saved {uncached - elapsed:.2f}s")
+        SQLiteStore.close_all()
+
+
+if __name__ == "__main__":
+    main()
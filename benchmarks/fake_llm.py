@@ -0,0 +1,192 @@
+"""Stand-in LLM server for benchmarks: Ollama and OpenAI-compatible streaming.
+
+Runs on its own thread and event loop so serving tokens never competes with
+the code being measured. Endpoints:
+
+  POST /api/chat              Ollama NDJSON chat stream
+  POST /api/generate          Ollama generate (used for model warm-up)
+  POST /api/embed             Ollama batch embeddings
+  POST /api/embeddings        Ollama single embedding (langchain OllamaEmbeddings)
+  POST /v1/chat/completions   OpenAI-compatible SSE stream (OpenRouter)
+
+Each answer waits `ttft_ms` before the first token and then streams at
+`tokens_per_s`; every delay is scaled by a random factor in [1 - jitter,
+1 + jitter]. The answer depends on the prompt:
+  - routing prompts get "simple" or "complex"
+  - auto-fix prompts get the code back without its lines containing "BUG"
+  - anything else gets `answer_tokens` words of filler
+
+    server = FakeLLMServer(ttft_ms=150, tokens_per_s=60).start()
+    os.environ["OLLAMA_HOST"] = server.url
+    ...
+    server.stop()
+"""
+import asyncio
+import json
+import random
+import re
+import threading
+import time
+import zlib
+
+import numpy as np
+
+WORDS = "the cache router stream token worker returns a value when the queue is ready".split()
+COMPLEX_HINTS = ("refactor", "architecture", "design", "optimi", "migrate", "concurren")
+
+
+class FakeLLMServer:
+    def __init__(self, ttft_ms=150, tokens_per_s=60, jitter=0.2, answer_tokens=80, embed_ms=10,
+                 dim=256, host="127.0.0.1", port=0, seed=0):
+        self.ttft = ttft_ms / 1000
+        self.tokens_per_s = tokens_per_s
+        self.jitter = jitter
+        self.answer_tokens = answer_tokens
+        self.embed_delay = embed_ms / 1000
+        self.dim = dim
+        self.host = host
+        self.port = port
+        self.rng = random.Random(seed)
+        self.requests = {}
+        self._writers = set()
+        self._loop = None
+        self._server = None
+        self._ready = threading.Event()
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name="fake-llm", daemon=True)
+        self._thread.start()
+        self._ready.wait()
+        return self
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop = None
+
+    async def _shutdown(self):
+        self._server.close()
+        # Closing idle keep-alive connections lets their _handle loops see EOF and return
+        handlers = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for writer in list(self._writers):
+            writer.close()
+        await asyncio.wait(handlers, timeout=2) if handlers else None
+
+    def _run(self):
+        self._loop = asyncio.new_event_loop()
+        self._server = self._loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        self.port = self._server.sockets[0].getsockname()[1]
+        self._ready.set()
+        self._loop.run_forever()
+        self._loop.close()
+
+    # --- content -----------------------------------------------------------
+
+    def _delay(self, seconds):
+        return max(seconds * (1 + self.rng.uniform(-self.jitter, self.jitter)), 0)
+
+    def answer(self, prompt):
+        if "Reply ONLY with the word 'simple' or 'complex'" in prompt:
+            return ["complex" if any(h in prompt.lower() for h in COMPLEX_HINTS) else "simple"]
+        fix = re.search(r"CODE:\n(.*)\n\nTASK: Return ONLY the fixed code", prompt, re.S)
+        if fix:
+            lines = [line for line in fix.group(1).splitlines() if "BUG" not in line]
+            return ["```python\n"] + [line + "\n" for line in lines] + ["```"]
+        return [self.rng.choice(WORDS) + " " for _ in range(self.answer_tokens)]
+
+    def vector(self, text):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"[a-z_]+", text.lower()):
+            v[zlib.crc32(word.encode()) % self.dim] += 1.0
+        norm = np.linalg.norm(v)
+        return (v / norm if norm else v).tolist()
+
+    async def tokens(self, prompt):
+        await asyncio.sleep(self._delay(self.ttft))
+        for i, token in enumerate(self.answer(prompt)):
+            if i:
+                await asyncio.sleep(self._delay(1 / self.tokens_per_s))
+            yield token
+
+    # --- HTTP --------------------------------------------------------------
+
+    async def _handle(self, reader, writer):
+        self._writers.add(writer)
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode("latin-1").split(" ", 2)
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+                self.requests[path] = self.requests.get(path, 0) + 1
+                await self._route(path, json.loads(body or b"{}"), writer)
+                if headers.get("connection", "").lower() == "close":
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+
+    async def _route(self, path, payload, writer):
+        if path == "/api/chat":
+            prompt = payload["messages"][-1]["content"]
+            await self._stream(writer, "application/x-ndjson", self._ollama_chunks(payload, prompt))
+        elif path == "/v1/chat/completions":
+            prompt = payload["messages"][-1]["content"]
+            await self._stream(writer, "text/event-stream", self._openai_chunks(payload, prompt))
+        elif path == "/api/embed":
+            texts = payload["input"] if isinstance(payload["input"], list) else [payload["input"]]
+            await asyncio.sleep(self._delay(self.embed_delay))
+            await self._json(writer, {"model": payload.get("model"), "embeddings": [self.vector(t) for t in texts]})
+        elif path == "/api/embeddings":
+            await asyncio.sleep(self._delay(self.embed_delay))
+            await self._json(writer, {"embedding": self.vector(payload.get("prompt", ""))})
+        elif path == "/api/generate":
+            await self._json(writer, {"model": payload.get("model"), "response": "", "done": True})
+        else:
+            await self._json(writer, {"error": f"unknown path {path}"}, status="404 Not Found")
+
+    async def _json(self, writer, obj, status="200 OK"):
+        body = json.dumps(obj).encode()
+        writer.write(f"HTTP/1.1 {status}\r\nContent-Type: application/json\r\n"
+                     f"Content-Length: {len(body)}\r\n\r\n".encode() + body)
+        await writer.drain()
+
+    async def _stream(self, writer, content_type, chunks):
+        writer.write(f"HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n"
+                     "Transfer-Encoding: chunked\r\n\r\n".encode())
+        async for chunk in chunks:
+            data = chunk.encode()
+            writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+            await writer.drain()
+        writer.write(b"0\r\n\r\n")
+        await writer.drain()
+
+    async def _ollama_chunks(self, payload, prompt):
+        model = payload.get("model", "fake")
+        async for token in self.tokens(prompt):
+            yield json.dumps({"model": model, "message": {"role": "assistant", "content": token}, "done": False}) + "\n"
+        yield json.dumps({"model": model, "message": {"role": "assistant", "content": ""}, "done": True}) + "\n"
+
+    async def _openai_chunks(self, payload, prompt):
+        base = {"id": f"chatcmpl-{time.time_ns()}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": payload.get("model", "fake")}
+        async for token in self.tokens(prompt):
+            chunk = dict(base, choices=[{"index": 0, "delta": {"content": token}, "finish_reason": None}])
+            yield f"data: {json.dumps(chunk)}\n\n"
+        chunk = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        yield f"data: {json.dumps(chunk)}\n\ndata: [DONE]\n\n"
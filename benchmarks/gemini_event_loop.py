@@ -0,0 +1,135 @@
+"""Checks that GeminiProvider.stream keeps the event loop responsive.
+
+A local socket server stands in for the Gemini API and dribbles chunks out
+slowly. While a provider streams from it, a timer task ticks every 10ms; the
+largest gap between ticks shows whether the loop was blocked. The old
+synchronous iteration is run the same way for comparison, and a final run
+cancels the stream mid-way to make sure the connection is released.
+
+    python -m benchmarks.gemini_event_loop
+"""
+import asyncio
+import socket
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+from core.providers.gemini import GeminiProvider
+
+CHUNKS = 40
+CHUNK_DELAY = 0.025
+TICK = 0.01
+
+
+def start_server():
+    closed = threading.Event()
+    srv = socket.create_server(("127.0.0.1", 0))
+
+    def serve():
+        while True:
+            conn, _ = srv.accept()
+            threading.Thread(target=handle, args=(conn,), daemon=True).start()
+
+    def handle(conn):
+        try:
+            for i in range(CHUNKS):
+                time.sleep(CHUNK_DELAY)
+                conn.sendall(f"token{i} \n".encode())
+        except OSError:
+            closed.set()
+        finally:
+            conn.close()
+
+    threading.Thread(target=serve, daemon=True).start()
+    return srv.getsockname()[1], closed
+
+
+class StandInModels:
+    def __init__(self, port):
+        self.port = port
+
+    def generate_content_stream(self, model, contents):
+        with socket.create_connection(("127.0.0.1", self.port)) as sock:
+            for line in sock.makefile("r"):
+                yield SimpleNamespace(text=line.rstrip("\n"))
+
+
+class StandInAsyncModels(StandInModels):
+    async def generate_content_stream(self, model, contents):
+        reader, writer = await asyncio.open_connection("127.0.0.1", self.port)
+
+        async def chunks():
+            try:
+                while line := await reader.readline():
+                    yield SimpleNamespace(text=line.decode().rstrip("\n"))
+            finally:
+                writer.close()
+        return chunks()
+
+
+def stand_in_provider(port):
+    provider = GeminiProvider.__new__(GeminiProvider)
+    provider.model = "stand-in"
+    provider.client = SimpleNamespace(
+        models=StandInModels(port),
+        aio=SimpleNamespace(models=StandInAsyncModels(port)),
+    )
+    return provider
+
+
+async def legacy_stream(provider, prompt):
+    # The pre-async implementation: sync iteration inside an async generator
+    for chunk in provider.client.models.generate_content_stream(model=provider.model, contents=prompt):
+        if chunk.text:
+            yield chunk.text
+
+
+async def measure(stream):
+    ticks, gaps = 0, []
+
+    async def ticker():
+        nonlocal ticks
+        last = time.perf_counter()
+        while True:
+            await asyncio.sleep(TICK)
+            now = time.perf_counter()
+            gaps.append(now - last)
+            last = now
+            ticks += 1
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    tokens = [t async for t in stream]
+    elapsed = time.perf_counter() - start
+    task.cancel()
+    return {"tokens": len(tokens), "seconds": elapsed, "ticks": ticks, "max_gap_ms": max(gaps or [elapsed]) * 1000}
+
+
+async def main():
+    port, closed = start_server()
+    provider = stand_in_provider(port)
+
+    legacy = await measure(legacy_stream(provider, "hi"))
+    current = await measure(provider.stream("hi"))
+    for name, r in (("legacy sync", legacy), ("async", current)):
+        print(f"{name:12} tokens={r['tokens']:3} time={r['seconds']:.2f}s ticks={r['ticks']:4} max_gap={r['max_gap_ms']:.1f}ms")
+
+    # Cancel after a few tokens, the server should see the connection drop
+    async def consume():
+        async for _ in provider.stream("hi"):
+            pass
+    task = asyncio.create_task(consume())
+    await asyncio.sleep(CHUNK_DELAY * 5)
+    task.cancel()
+    await asyncio.gather(task, return_exceptions=True)
+    released = await asyncio.to_thread(closed.wait, CHUNK_DELAY * 10)
+    print(f"cancellation released connection: {released}")
+
+    ok = current["tokens"] == CHUNKS and current["max_gap_ms"] < 50 and released
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,105 @@
+"""Recall and latency of vector, lexical (FTS5) and hybrid (RRF) retrieval.
+
+Builds a synthetic memory of N interactions, each about a distinct
+identifier and error string, then asks about a sample of them in
+different words. The stand-in embedder hashes alphabetic words into a
+small vector and sleeps per call (default 20ms), which mimics two real
+properties of nomic-embed-text: a network round trip per query, and weak
+matching on exact identifiers and numbers.
+
+    python -m benchmarks.hybrid_retrieval [interactions] [embed_latency_ms]
+"""
+import random
+import re
+import statistics
+import sys
+import tempfile
+import time
+import zlib
+from pathlib import Path
+
+import numpy as np
+
+from core.embeddings import CachedEmbeddings
+from core.memory import MemoryManager
+from core.storage import SQLiteStore
+
+WORDS = ("config loader parser cache socket retry handler schema token stream worker queue "
+         "session router widget buffer index manifest backup provider").split()
+ERRORS = ["ValueError", "KeyError", "TimeoutError", "PermissionError", "JSONDecodeError"]
+
+
+class HashedBagEmbeddings:
+    def __init__(self, latency, dim=128):
+        self.latency = latency
+        self.dim = dim
+
+    def _vec(self, text):
+        v = np.zeros(self.dim, dtype=np.float32)
+        for word in re.findall(r"[a-z]+", text.lower()):
+            v[zlib.crc32(word.encode()) % self.dim] += 1.0
+        n = np.linalg.norm(v)
+        return (v / n if n else v).tolist()
+
+    def embed_documents(self, texts):
+        time.sleep(self.latency)
+        return [self._vec(t) for t in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+def corpus(n, seed=3):
+    rng = random.Random(seed)
+    items = []
+    for i in range(n):
+        a, b = rng.sample(WORDS, 2)
+        ident = f"{a}_{b}_{i}"
+        err = rng.choice(ERRORS)
+        user = f"my {a} {b} code crashes in {ident}() with {err}: bad value {i * 7919 % 100000}"
+        ai = (f"The {err} in {ident} happens because the {a} passes an unchecked {b}. "
+              f"Validate the input before calling {ident} and add a retry around the {a}.")
+        items.append((user, ai, "", time.time()))
+    return items
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    latency = (float(sys.argv[2]) if len(sys.argv) > 2 else 20) / 1000
+    k = 3
+
+    with tempfile.TemporaryDirectory() as tmp:
+        inner = HashedBagEmbeddings(0)
+        memory = MemoryManager(db_path=Path(tmp) / "m.db", chroma_path=str(Path(tmp) / "chroma"), lazy=True)
+        memory.initialize()
+        memory.embedding_fn = CachedEmbeddings(inner, "bench", db_path=Path(tmp) / "emb.db", memory_entries=0)
+        memory.vector_store._embedding_function = memory.embedding_fn
+        memory.code_store._embedding_function = memory.embedding_fn
+
+        items = corpus(n)
+        for i in range(0, n, 256):
+            memory.save_interactions(items[i:i + 256])
+
+        rng = random.Random(11)
+        probes = rng.sample(range(n), min(200, n))
+        inner.latency = latency
+        print(f"{n} interactions, {len(probes)} queries, k={k}, embed latency {latency * 1000:.0f}ms")
+        print(f"{'mode':8} {'recall@k':>9} {'p50':>8} {'p95':>8}")
+        for mode in ("vector", "lexical", "hybrid"):
+            # Every mode pays for its own query embeddings
+            memory.embedding_fn.store.execute("DELETE FROM embedding_cache")
+            hits, lat = 0, []
+            for i in probes:
+                ident = re.search(r"in (\S+)\(\)", items[i][0])[1]
+                query = f"why does {ident} keep failing"
+                start = time.perf_counter()
+                context = memory.retrieve_context(query, k=k, code_k=0, mode=mode)
+                lat.append((time.perf_counter() - start) * 1000)
+                hits += ident in context
+            lat.sort()
+            print(f"{mode:8} {hits / len(probes):9.1%} {statistics.median(lat):7.1f}ms {lat[int(len(lat) * 0.95)]:7.1f}ms")
+        SQLiteStore.close_all()
+
+
+if __name__ == "__main__":
+    main()
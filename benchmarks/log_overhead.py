@@ -0,0 +1,97 @@
+"""Cost of sys_log.log() on the caller's thread, and of /log, old vs new pipeline.
+
+Part 1 times `calls` log calls the way the streaming path makes them
+(short DEBUG/INFO lines, back to back) through:
+
+  legacy        logging.FileHandler written synchronously by the caller
+  queue/text    SystemLogger: QueueHandler -> listener thread, text file
+  queue/jsonl   same, JSON lines file
+
+and reports the mean and p99 cost per call as seen by the caller.
+
+Part 2 times get_recent_logs(15) against log files of growing size:
+the old readlines() implementation, the in-memory ring, and the
+reverse-seek tail_lines() fallback.
+
+    python -m benchmarks.log_overhead [calls]
+"""
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.logger import TEXT_FORMAT, sys_log, tail_lines
+
+
+def time_calls(log, calls):
+    costs = []
+    for i in range(calls):
+        start = time.perf_counter()
+        log("STREAM", f"token {i} routed to local (first byte 12.3ms)", "DEBUG" if i % 4 else "INFO")
+        costs.append(time.perf_counter() - start)
+    costs.sort()
+    return statistics.mean(costs) * 1e6, costs[int(len(costs) * 0.99)] * 1e6
+
+
+def legacy_logger(path):
+    logger = logging.getLogger("NeuroTerm.legacy")
+    logger.setLevel(logging.DEBUG)
+    logger.propagate = False
+    handler = logging.FileHandler(path, mode="a", encoding="utf-8")
+    handler.setFormatter(logging.Formatter(TEXT_FORMAT))
+    logger.addHandler(handler)
+
+    def log(component, message, level="INFO"):
+        getattr(logger, level.lower())(f"[{component.upper()}] {message}")
+    return log, handler
+
+
+def legacy_recent(path, n):
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+        return [line.strip() for line in lines[-n:]]
+
+
+def timed(fn, repeat=20):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{calls} log calls")
+        print(f"{'pipeline':12} {'mean us':>8} {'p99 us':>8}")
+        log, handler = legacy_logger(Path(tmp) / "legacy.log")
+        mean, p99 = time_calls(log, calls)
+        print(f"{'legacy':12} {mean:8.2f} {p99:8.2f}")
+        handler.close()
+        for fmt in ("text", "jsonl"):
+            sys_log.configure(log_file=Path(tmp) / f"queue.{fmt}", fmt=fmt, max_bytes=0)
+            mean, p99 = time_calls(sys_log.log, calls)
+            sys_log.stop()
+            print(f"{'queue/' + fmt:12} {mean:8.2f} {p99:8.2f}")
+
+        print("\nget_recent_logs(15)")
+        print(f"{'log size':>9} {'readlines':>10} {'ring':>8} {'tail':>8}")
+        big = Path(tmp) / "big.log"
+        line = "2026-01-01 00:00:00,000 - [DEBUG] - [STREAM] token 123 routed to local (first byte 12.3ms)\n"
+        sys_log.configure(log_file=big, max_bytes=0)
+        for _ in range(1000):
+            sys_log.log("STREAM", "token 123 routed to local (first byte 12.3ms)", "DEBUG")
+        for mb in (1, 10, 100):
+            with open(big, "a") as f:
+                while f.tell() < mb * 2**20:
+                    f.write(line * 1000)
+            print(f"{os.path.getsize(big) / 2**20:7.0f}MB {timed(lambda: legacy_recent(big, 15), 3):8.2f}ms "
+                  f"{timed(lambda: sys_log.get_recent_logs(15)):6.3f}ms {timed(lambda: tail_lines(big, 15)):6.3f}ms")
+        sys_log.stop()
+
+
+if __name__ == "__main__":
+    main()
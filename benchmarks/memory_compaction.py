@@ -0,0 +1,91 @@
+"""Memory size and retrieval latency before/after MemoryCompactor, on synthetic history.
+
+Fills a scratch MemoryManager with `turns` conversation turns spread over the
+last 180 days (a share of them repeats of earlier turns), runs one compaction
+against the stand-in LLM server (embeddings + digest summaries) and prints the
+before/after report.
+
+    python -m benchmarks.memory_compaction [turns]
+"""
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.fake_llm import FakeLLMServer
+
+TOPICS = ["parser error in the tokenizer", "users table migration", "cache eviction under load",
+          "docker compose networking", "pytest fixture scope", "retry handler backoff", "async queue shutdown",
+          "config loader defaults", "logging rotation", "provider timeout"]
+WORDS = ("index buffer socket thread schema token budget worker router stream chunk vector lock "
+         "header payload cursor session commit branch module").split()
+
+
+def history(turns, seed=0):
+    rng = random.Random(seed)
+    now = time.time()
+    items = []
+    for i in range(turns):
+        ts = now - rng.uniform(0, 180) * 86400
+        if items and rng.random() < 0.15:
+            # Same question asked again
+            items.append(rng.choice(items)[:3] + (ts,))
+            continue
+        topic = rng.choice(TOPICS)
+        detail = " ".join(rng.sample(WORDS, 4))
+        items.append((f"How do I fix the {topic}? It mentions {detail}.",
+                      f"For the {topic}, check the {detail.split()[0]} handling first, then {detail.split()[1]}.",
+                      "", ts))
+    return items
+
+
+async def run(turns):
+    server = FakeLLMServer(ttft_ms=20, tokens_per_s=2000, answer_tokens=60, embed_ms=2).start()
+    os.environ["OLLAMA_HOST"] = server.url
+    from core.compaction import MemoryCompactor
+    from core.logger import sys_log
+    from core.memory import MemoryManager
+    from core.providers.ollama import OllamaProvider
+    from core.storage import SQLiteStore
+    from core.tracing import tracer
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            # The embedding cache's default path resolves under NEUROTERM_HOME; tmp is no git
+            # tree, so everything lands in the global namespace
+            os.environ["NEUROTERM_HOME"] = tmp
+            cwd = os.getcwd()
+            os.chdir(tmp)
+            sys_log.configure(log_file=Path(tmp) / "system.log")
+            tracer.db_path = Path(tmp) / "spans.db"
+            memory = MemoryManager(db_path=Path(tmp) / "mem.db", chroma_path=str(Path(tmp) / "chroma"))
+            items = history(turns)
+            for i in range(0, len(items), 256):
+                memory.save_interactions(items[i:i + 256])
+            report = await MemoryCompactor(memory, OllamaProvider()).compact()
+            await OllamaProvider.aclose_pool()
+            tracer.flush()
+            sys_log.stop()
+            SQLiteStore.close_all()
+            os.chdir(cwd)
+    finally:
+        server.stop()
+    return report
+
+
+def main():
+    turns = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    report = asyncio.run(run(turns))
+    before, after = report["before"], report["after"]
+    print(f"{turns} turns, compacted in {report['seconds']}s")
+    print(f"{'':18} {'before':>10} {'after':>10}")
+    for key in ("logs", "digests", "vectors", "db_bytes", "chroma_bytes", "retrieval_p50_ms", "retrieval_p95_ms"):
+        print(f"{key:18} {before[key]:>10} {after[key]:>10}")
+    print(f"\ndeduplicated {report['deduplicated']}, expired {report['expired']}, "
+          f"summarized {report['summarized']}, rebuilt {report['rebuilt']}, vacuumed {report['vacuumed_bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
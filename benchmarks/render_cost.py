@@ -0,0 +1,113 @@
+"""Render cost per token for long streamed answers.
+
+Compares three strategies on a synthetic ~10k-token Markdown answer (prose
+paragraphs, lists and code blocks), rendering with Rich to an off-screen
+console the same width as a terminal:
+
+  full-per-token   re-parse and render the whole response on every token
+  full-per-frame   same, but throttled to one render per `fps` frame
+  incremental      MarkdownStreamBuffer: finished blocks rendered once,
+                   only the open tail re-rendered per frame
+
+Tokens are assumed to arrive at `rate` tokens/s, so a frame covers
+rate/fps tokens. For each strategy it prints the mean cost per token and
+the cost per token over the first and last tenth of the answer; a flat
+strategy has similar first/last numbers. The full re-render baselines
+grow quadratically, so they only replay the first `baseline` tokens.
+"incremental, no blank lines" streams the same answer with single newlines
+between blocks, as some models write lists and prose.
+
+    python -m benchmarks.render_cost [tokens] [rate] [fps] [baseline]
+"""
+import io
+import random
+import sys
+import time
+
+from rich.console import Console
+from rich.markdown import Markdown
+
+from core.widgets import MarkdownStreamBuffer
+
+
+def synthetic_answer(tokens, seed=5, blank_lines=True):
+    rng = random.Random(seed)
+    words = "the cache router stream token widget buffer returns a value when it is ready".split()
+    out, count = [], 0
+    while count < tokens:
+        kind = rng.random()
+        if kind < 0.6:
+            para = [rng.choice(words) for _ in range(rng.randint(20, 60))]
+            out += [w + " " for w in para] + ["\n\n"]
+            count += len(para)
+        elif kind < 0.8:
+            for _ in range(rng.randint(2, 5)):
+                item = [rng.choice(words) for _ in range(rng.randint(4, 10))]
+                out += ["- "] + [w + " " for w in item] + ["\n"]
+                count += len(item)
+            out.append("\n")
+        else:
+            out.append("```python\n")
+            for i in range(rng.randint(5, 30)):
+                line = f"value_{i} = compute({i}, cache=True)\n"
+                out += [line[:10], line[10:]]
+                count += 2
+            out.append("```\n\n")
+    return out if blank_lines else [t.replace("\n\n", "\n") for t in out if t != "\n"]
+
+
+def render(console, text):
+    console.print(Markdown(text))
+    console.file.seek(0)
+    console.file.truncate()
+
+
+def run(strategy, tokens, per_frame):
+    console = Console(file=io.StringIO(), width=100, force_terminal=True)
+    costs = []
+    buffer = MarkdownStreamBuffer()
+    response, pending = "", []
+    for i, token in enumerate(tokens):
+        start = time.perf_counter()
+        if strategy == "full-per-token":
+            response += token
+            render(console, response)
+        else:
+            pending.append(token)
+            if (i + 1) % per_frame == 0 or i == len(tokens) - 1:
+                text = "".join(pending)
+                pending.clear()
+                if strategy == "full-per-frame":
+                    response += text
+                    render(console, response)
+                else:
+                    committed = buffer.feed(text)
+                    if committed:
+                        render(console, committed)
+                    render(console, buffer.tail)
+        costs.append(time.perf_counter() - start)
+    return costs
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rate = float(sys.argv[2]) if len(sys.argv) > 2 else 60
+    fps = float(sys.argv[3]) if len(sys.argv) > 3 else 15
+    baseline = int(sys.argv[4]) if len(sys.argv) > 4 else 1500
+    tokens = synthetic_answer(n)
+    per_frame = max(int(rate / fps), 1)
+
+    print(f"{len(tokens)} tokens, {rate:.0f} tok/s, {fps:.0f} fps ({per_frame} tokens/frame)")
+    print(f"{'strategy':28} {'tokens':>7} {'mean us/tok':>12} {'first 10%':>10} {'last 10%':>10} {'total s':>8}")
+    runs = (("incremental", tokens), ("incremental, no blank lines", synthetic_answer(n, blank_lines=False)),
+            ("full-per-frame", tokens[:baseline]), ("full-per-token", tokens[:baseline]))
+    for label, sample in runs:
+        costs = run(label.split(",")[0], sample, per_frame)
+        tenth = max(len(costs) // 10, 1)
+        us = lambda xs: sum(xs) / len(xs) * 1e6
+        print(f"{label:28} {len(sample):7} {us(costs):12.1f} {us(costs[:tenth]):10.1f} "
+              f"{us(costs[-tenth:]):10.1f} {sum(costs):8.2f}")
+
+
+if __name__ == "__main__":
+    main()
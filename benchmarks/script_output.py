@@ -0,0 +1,50 @@
+"""FileManager.aexecute_script on huge output, with and without an on_output callback.
+
+A child script writes `mb` MB to stdout in 64KB writes, either as normal
+lines or with no newline at all (the worst case for line splitting, which
+must carry the unterminated line over from chunk to chunk). Reports wall
+time, lines delivered to on_output and peak RSS of this process.
+
+    python -m benchmarks.script_output [mb]
+"""
+import asyncio
+import resource
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.files import FileManager
+
+SCRIPT = """import sys
+chunk = {chunk!r} * 65536
+for _ in range({count}):
+    sys.stdout.write(chunk[:65536])
+sys.stdout.flush()
+"""
+
+
+async def run(path, callback):
+    delivered = [0]
+    on_output = (lambda stream, line: delivered.__setitem__(0, delivered[0] + 1)) if callback else None
+    start = time.perf_counter()
+    result = await FileManager().aexecute_script(str(path), on_output=on_output, timeout=120)
+    return time.perf_counter() - start, delivered[0], result
+
+
+def main():
+    mb = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'output':12} {'on_output':>10} {'seconds':>8} {'lines':>7} {'peak RSS MB':>12} {'ok':>4}")
+        for label, chunk in (("lines", "0123456789abcde\n"), ("no newline", "x")):
+            path = Path(tmp) / "noisy.py"
+            path.write_text(SCRIPT.format(chunk=chunk, count=mb * 16))
+            for callback in (False, True):
+                seconds, lines, result = asyncio.run(run(path, callback))
+                rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+                print(f"{label:12} {str(callback):>10} {seconds:>8.2f} {lines:>7} {rss:>12.0f} "
+                      f"{'yes' if result['success'] else 'no':>4}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Compares the old connect-per-call SQLite pattern with core.storage.SQLiteStore.
+
+Measures inserts/sec for single-row writes (one per interaction, as
+save_interaction does) and for batched writes (as the ingest worker does),
+plus latency of the "recent logs" query against a table of N rows.
+
+    python -m benchmarks.sqlite_store [rows]
+"""
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from core.storage import SQLiteStore
+
+SCHEMA = '''CREATE TABLE IF NOT EXISTS logs
+            (id INTEGER PRIMARY KEY, timestamp REAL, user_msg TEXT, ai_msg TEXT, context TEXT)'''
+INSERT = "INSERT INTO logs (timestamp, user_msg, ai_msg, context) VALUES (?, ?, ?, ?)"
+RECENT = "SELECT user_msg, ai_msg FROM logs WHERE timestamp > ? ORDER BY timestamp DESC LIMIT 20"
+
+
+def rows(n):
+    now = time.time()
+    return [(now + i, f"question {i}", "answer " * 40, "") for i in range(n)]
+
+
+def per_call(db, data):
+    conn = sqlite3.connect(db)
+    conn.execute(SCHEMA)
+    conn.close()
+
+    start = time.perf_counter()
+    for row in data:
+        conn = sqlite3.connect(db)
+        conn.execute(INSERT, row)
+        conn.commit()
+        conn.close()
+    single = len(data) / (time.perf_counter() - start)
+
+    latencies = []
+    for _ in range(200):
+        t = time.perf_counter()
+        conn = sqlite3.connect(db)
+        conn.execute(RECENT, (data[len(data) // 2][0],)).fetchall()
+        conn.close()
+        latencies.append(time.perf_counter() - t)
+    return single, None, latencies
+
+
+def pooled(db, data):
+    store = SQLiteStore(db)
+    store.execute(SCHEMA)
+    store.execute("CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp)")
+
+    start = time.perf_counter()
+    for row in data:
+        store.execute(INSERT, row)
+    single = len(data) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for i in range(0, len(data), 16):
+        store.executemany(INSERT, data[i:i + 16])
+    batched = len(data) / (time.perf_counter() - start)
+
+    latencies = []
+    for _ in range(200):
+        t = time.perf_counter()
+        store.query(RECENT, (data[len(data) // 2][0],))
+        latencies.append(time.perf_counter() - t)
+    store.close()
+    return single, batched, latencies
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    data = rows(n)
+    with tempfile.TemporaryDirectory() as tmp:
+        results = {
+            "connect-per-call": per_call(Path(tmp) / "old.db", data),
+            "SQLiteStore (WAL)": pooled(Path(tmp) / "new.db", data),
+        }
+
+    print(f"{'pattern':20} {'single ins/s':>13} {'batched ins/s':>14} {'query p50':>10} {'query p95':>10}")
+    for name, (single, batched, lat) in results.items():
+        lat_ms = sorted(x * 1000 for x in lat)
+        p95 = lat_ms[int(len(lat_ms) * 0.95)]
+        batched_s = f"{batched:14.0f}" if batched else f"{'-':>14}"
+        print(f"{name:20} {single:13.0f} {batched_s} {statistics.median(lat_ms):9.3f}ms {p95:9.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
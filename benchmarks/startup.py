@@ -0,0 +1,90 @@
+"""Cold-start report for the TUI: import-time breakdown plus time to first frame.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and
+aggregates the cumulative import cost by top-level package, then boots
+NeuroTermApp headless (Textual's run_test) and times how long it takes
+until the app is mounted and has drawn. Background warm-up (Chroma,
+embeddings, Ollama preload) starts after that frame and is not counted.
+Both run in a scratch working directory so no neuroterm.db / system.log
+in the repo is touched.
+
+    python -m benchmarks.startup [--budget-ms 1500]
+
+Exits non-zero when time-to-first-frame exceeds the budget.
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+FIRST_FRAME = '''
+import time
+t0 = time.perf_counter()
+import asyncio
+from app import NeuroTermApp
+t_import = time.perf_counter()
+
+async def main():
+    app = NeuroTermApp()
+    t_init = time.perf_counter()
+    # run_test returns control once the app is mounted and the first screen is drawn
+    async with app.run_test():
+        t_frame = time.perf_counter()
+        app.exit()
+    print(f"{(t_import - t0) * 1000:.1f} {(t_init - t_import) * 1000:.1f} {(t_frame - t0) * 1000:.1f}")
+
+asyncio.run(main())
+'''
+
+
+def run(code, cwd, *flags):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    return subprocess.run([sys.executable, *flags, "-c", code], cwd=cwd, env=env,
+                          capture_output=True, text=True, timeout=120)
+
+
+def import_report(cwd, top=12):
+    proc = run("import app", cwd, "-X", "importtime")
+    by_package = defaultdict(int)
+    total = 0
+    for line in proc.stderr.splitlines():
+        m = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)", line)
+        if not m:
+            continue
+        self_us, cumulative_us, indent, module = int(m[1]), int(m[2]), len(m[3]), m[4]
+        by_package[module.split(".")[0]] += self_us
+        if indent == 1:
+            total += cumulative_us
+    return total / 1000, sorted(by_package.items(), key=lambda kv: -kv[1])[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--budget-ms", type=float, default=1500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as cwd:
+        total_ms, packages = import_report(cwd)
+        print(f"import app: {total_ms:.0f}ms total")
+        for name, us in packages:
+            print(f"  {name:28} {us / 1000:8.1f}ms")
+
+        proc = run(FIRST_FRAME, cwd)
+        if proc.returncode != 0:
+            print(proc.stderr)
+            return 1
+        import_ms, init_ms, frame_ms = map(float, proc.stdout.split()[-3:])
+
+    print(f"imports {import_ms:.0f}ms, NeuroTermApp() {init_ms:.0f}ms, first frame at {frame_ms:.0f}ms "
+          f"(budget {args.budget_ms:.0f}ms)")
+    return 0 if frame_ms <= args.budget_ms else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
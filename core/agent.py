@@ -1,95 +1,541 @@
-from core.providers import gemini, ollama, openrouter
+import asyncio
+import importlib
+import os
+import re
+import tempfile
+import time
+from contextlib import nullcontext
+from pathlib import Path
+from core.providers.ollama import OllamaProvider
 from core.files import FileManager
 from core.graph import NeuroGraph
+from core.compaction import MemoryCompactor
+from core.context import ContextBuilder, estimate_tokens, fit_text
+from core.indexer import CodeIndexer
+from core.ingest import IngestQueue
 from core.memory import MemoryManager
+from core.ops import run_op
+from core.response_cache import ResponseCache, cache_scope, referenced_files
 from core.logger import sys_log
+from core.streams import CircuitBreaker, HedgedStream, PrefetchedStream, is_error
+from core.tracing import tracer
 
+# name -> "module:Class"; provider SDKs are only imported once a provider is used
 PROVIDERS = {
-    "gemini": gemini.GeminiProvider,
-    "ollama": ollama.OllamaProvider,
-    "openrouter": openrouter.OpenRouterProvider,
-    "mistral": openrouter.OpenRouterProvider,
-    "huggingface": openrouter.OpenRouterProvider,
+    "gemini": "core.providers.gemini:GeminiProvider",
+    "ollama": "core.providers.ollama:OllamaProvider",
+    "openrouter": "core.providers.openrouter:OpenRouterProvider",
+    "mistral": "core.providers.openrouter:OpenRouterProvider",
+    "huggingface": "core.providers.openrouter:OpenRouterProvider",
 }
 
+# Breaker/limiter/trace key of the router's local model, which answers the "simple" tier
+LOCAL = "ollama"
+
+def load_provider_class(name):
+    if name not in PROVIDERS:
+        raise ValueError(f"Provider {name} not found.")
+    module_name, class_name = PROVIDERS[name].split(":")
+    return getattr(importlib.import_module(module_name), class_name)
+
 class NeuroAgent:
-    def __init__(self, provider_name="gemini", **kwargs):
+    def __init__(self, provider_name="gemini", pipelined=True, speculative=False, lazy=False,
+                 response_cache=False, fix_workers=4, fix_with_local=False, context_budgets=None,
+                 failover=True, hedge_after=None, fallbacks=None, breaker_threshold=3, breaker_cooldown=30.0,
+                 limiter=None, fan_out=False, **kwargs):
         self.provider_name = provider_name
         self.kwargs = kwargs
+        # pipelined: run RAG and routing concurrently instead of back to back
+        # speculative: also start local + cloud generation before the route is known
+        self.pipelined = pipelined
+        self.speculative = speculative
+        # Parallel auto-fix: max concurrent candidate runs, and whether to mix in local candidates
+        self.fix_workers = fix_workers
+        self.fix_with_local = fix_with_local
+        # Per-provider token budgets for retrieved context and auto-fix error output
+        self.context_builder = ContextBuilder(context_budgets)
+        # failover: on a provider error (or open circuit) retry on the other tier, then on `fallbacks`
+        # hedge_after: seconds without a first token before a backup provider is started in parallel
+        # fallbacks: {provider name: constructor kwargs} for extra providers, tried in order
+        self.failover = failover
+        self.hedge_after = hedge_after
+        self.fallbacks = dict(fallbacks or {})
+        self._fallback_providers = {}
+        self.breaker = CircuitBreaker(breaker_threshold, breaker_cooldown)
+        # Optional core.limits.ProviderLimiter gating every generation (batch mode)
+        self.limiter = limiter
         self.files = FileManager()
-        self.memory = MemoryManager()
+        # lazy: defer vector DB + provider SDK setup until warm_up() / first use
+        # fan_out: retrieval also searches global memory, not only the current project's
+        self.memory = MemoryManager(lazy=lazy, fan_out=fan_out)
+        self.ingest = IngestQueue(self.memory)
+        self.indexer = CodeIndexer(self.memory, self.files)
         self.graph = NeuroGraph()
-        self._load_provider()
+        self.graph.set_embedder(self.memory.embed_query)
+        self.graph.set_limiter(limiter)
+        self._provider = None
+        self._load_provider(eager=not lazy)
+        # Opt-in: replay answers to near-identical questions instead of regenerating them
+        self.response_cache = ResponseCache(self.memory.embed_query) if response_cache else None
+        # Dedupe / expire / summarize chat memory; digests are written by the local model
+        self.compactor = MemoryCompactor(self.memory, self.graph.local_llm)
+        self.last_active = time.monotonic()
 
-    def _load_provider(self):
+    def _load_provider(self, eager=True):
         if self.provider_name not in PROVIDERS:
             raise ValueError(f"Provider {self.provider_name} not found.")
-        provider_class = PROVIDERS[self.provider_name]
-        self.provider = provider_class(**self.kwargs)
-        self.graph.set_api_provider(self.provider)
+        self._provider = None
+        if eager:
+            self.provider
 
-    async def stream(self, prompt: str):
-        sys_log.log("AGENT", "--- New Stream Request ---")
-        
-        # 1. RAG
-        context = self.memory.retrieve_context(prompt)
-        
-        # 2. Routing
-        complexity = await self.graph.route_request(prompt)
-        
-        # 3. Execution
-        response_acc = ""
+    @property
+    def provider_key(self):
+        """Breaker/limiter/trace key of the configured provider (the "complex" tier). An Ollama
+        main provider gets its own, so it never shares a circuit or slots with the router model."""
+        if self.provider_name != LOCAL:
+            return self.provider_name
+        return f"ollama:{self.kwargs.get('model') or 'main'}"
+
+    @property
+    def provider(self):
+        if self._provider is None:
+            provider_class = load_provider_class(self.provider_name)
+            self._provider = provider_class(**self.kwargs)
+            self.graph.set_api_provider(self._provider)
+        return self._provider
+
+    async def warm_up(self):
+        # Import the provider SDK off the loop; the instance itself is built on first use
+        results = await asyncio.gather(
+            self.memory.warm(),
+            self.graph.local_llm.warm_up(),
+            asyncio.to_thread(load_provider_class, self.provider_name),
+            return_exceptions=True,
+        )
+        for result in results:
+            if isinstance(result, Exception):
+                sys_log.log("AGENT", f"Warm-up step failed: {result}", "ERROR")
+
+    async def aclose(self):
+        await self.ingest.drain()
+        await OllamaProvider.aclose_pool()
+        await asyncio.to_thread(tracer.flush)
+
+    async def index_project(self, root="."):
+        return await asyncio.to_thread(self.indexer.index, root)
+
+    async def compact_memory(self, project=None):
+        # Pending write-behind items first, so they are part of the run
+        await self.ingest.drain()
+        return await self.compactor.compact(project=project)
+
+    async def idle_compaction(self, idle_s=600, every_s=6 * 3600, poll_s=60):
+        """Background loop: compact once the agent has been idle for idle_s and the last run is every_s old."""
+        while True:
+            await asyncio.sleep(poll_s)
+            if time.monotonic() - self.last_active < idle_s:
+                continue
+            try:
+                if time.time() - await asyncio.to_thread(self.compactor.last_run) < every_s:
+                    continue
+                sys_log.log("AGENT", "Idle, compacting memory")
+                # Every namespace with history, not just the active one
+                for namespace in await asyncio.to_thread(self.memory.projects):
+                    if namespace["turns"]:
+                        await self.compact_memory(namespace["id"])
+            except Exception as e:
+                sys_log.log("AGENT", f"Idle compaction failed: {e}", "ERROR")
+
+    async def call(self, op, **params):
+        """Run a core.ops command (same interface as RemoteAgent.call)."""
+        return await run_op(self, op, params)
+
+    def _local_stream(self, prompt, context):
+        return self.graph.local_llm.stream(f"Context: {context}\n\nRequest: {prompt}")
+
+    def _cloud_stream(self, prompt, context):
+        full_prompt = f"RELEVANT MEMORY:\n{context}\n\nUSER REQUEST:\n{prompt}"
+        return self.provider.stream(full_prompt)
+
+    def _fallback(self, name):
+        if name not in self._fallback_providers:
+            self._fallback_providers[name] = load_provider_class(name)(**self.fallbacks[name])
+        return self._fallback_providers[name]
+
+    def _provider_stream(self, key, prompt, context):
+        # Dispatch on the tier key, not the provider name: an Ollama main provider is not the router model
+        if key == self.provider_key:
+            return self._cloud_stream(prompt, context)
+        if key == LOCAL:
+            return self._local_stream(prompt, context)
+        return self._fallback(key).stream(f"RELEVANT MEMORY:\n{context}\n\nUSER REQUEST:\n{prompt}")
+
+    def _failover_chain(self, primary):
+        """Provider keys to try for a request routed to `primary`, in order."""
+        chain = [primary, self.provider_key if primary == LOCAL else LOCAL, *self.fallbacks]
+        return list(dict.fromkeys(chain))
+
+    def _hedged(self, prompt, context, primary, streamer=None):
+        def source(name):
+            def start():
+                # A speculative stream for the primary is already running, reuse it
+                tokens = streamer if name == primary and streamer is not None else \
+                    self._provider_stream(name, prompt, context)
+                return self._traced(tokens, name)
+            return name, start
+        return HedgedStream([source(name) for name in self._failover_chain(primary)],
+                            self.hedge_after, self.breaker)
+
+    def _banner(self, complexity):
         if complexity == "simple":
             sys_log.log("AGENT", "Using Local Ollama (Simple)")
-            yield "🚀 [Local]: Handling via Ollama...\n\n"
-            streamer = self.graph.local_llm.stream(f"Context: {context}\n\nRequest: {prompt}")
+            return "🚀 [Local]: Handling via Ollama...\n\n"
+        sys_log.log("AGENT", f"Using Cloud {self.provider_name} (Complex)")
+        return f"☁️ [Cloud]: Handling via {self.provider_name.capitalize()}...\n\n"
+
+    def _build_context(self, prompt, candidates, provider):
+        """Pack retrieved chunks into the provider's token budget."""
+        chat, code = candidates
+        # Interleave so the rank prior does not put every chat turn ahead of every code chunk
+        ranked = [text for pair in zip(chat, code) for text in pair]
+        ranked += chat[len(code):] + code[len(chat):]
+        start = time.perf_counter()
+        # Baseline: what retrieve_context used to inline (top 2 turns + top 2 code chunks, raw)
+        # Budgets are per provider name: an "ollama:<model>" main provider uses Ollama's
+        context, report = self.context_builder.build(
+            prompt, ranked, provider.split(":")[0], baseline="\n---\n".join(chat[:2] + code[:2]))
+        tracer.record("context", (time.perf_counter() - start) * 1000, provider, **report)
+        sys_log.log("AGENT", f"Context for {provider}: {report['context_tokens']} tokens "
+                             f"({report['saved_tokens']:+d} saved, {report['duplicates']} dups, "
+                             f"{report['merged']} merged)", "DEBUG")
+        return context
+
+    async def _plan(self, prompt):
+        # 1. RAG + 2. Routing
+        if not self.pipelined:
+            candidates = self.memory.retrieve_candidates(prompt)
+            complexity = await self.graph.route_request(prompt)
+            return self._build_context(prompt, candidates, self._target(complexity)[0]), complexity, None
+
+        # Chroma + embedding are blocking, keep them off the event loop
+        context_task = asyncio.create_task(asyncio.to_thread(self.memory.retrieve_candidates, prompt))
+        route_task = asyncio.create_task(self.graph.route_request(prompt))
+        speculative = None
+        try:
+            candidates = await context_task
+            if self.speculative and not route_task.done():
+                sys_log.log("AGENT", "Route pending, starting speculative local + cloud streams", "DEBUG")
+                contexts = {
+                    "simple": self._build_context(prompt, candidates, LOCAL),
+                    "complex": self._build_context(prompt, candidates, self.provider_key),
+                }
+                speculative = {
+                    "simple": PrefetchedStream(self._limited(self._local_stream(prompt, contexts["simple"]), LOCAL)),
+                    "complex": PrefetchedStream(self._limited(self._cloud_stream(prompt, contexts["complex"]),
+                                                              self.provider_key)),
+                }
+            complexity = await route_task
+        except BaseException:
+            for task in (context_task, route_task):
+                task.cancel()
+            for candidate in (speculative or {}).values():
+                await candidate.cancel()
+            raise
+
+        winner = None
+        if speculative:
+            context = contexts[complexity]
+            winner = speculative.pop(complexity)
+            for loser in speculative.values():
+                await loser.cancel()
         else:
-            sys_log.log("AGENT", f"Using Cloud {self.provider_name} (Complex)")
-            yield f"☁️ [Cloud]: Handling via {self.provider_name.capitalize()}...\n\n"
-            full_prompt = f"RELEVANT MEMORY:\n{context}\n\nUSER REQUEST:\n{prompt}"
-            streamer = self.provider.stream(full_prompt)
-
-        async for token in streamer:
-            response_acc += token
-            yield token
-            
-        self.memory.save_interaction(prompt, response_acc, context)
+            context = self._build_context(prompt, candidates, self._target(complexity)[0])
+        return context, complexity, winner
+
+    def _target(self, complexity):
+        """(provider key, model) answering a route."""
+        if complexity == "simple":
+            return LOCAL, self.graph.local_llm.model
+        return self.provider_key, getattr(self.provider, "model", "")
+
+    async def _cached_answer(self, prompt, scope):
+        try:
+            with tracer.span("cache.lookup") as span:
+                vector = await asyncio.to_thread(self.memory.embed_query, prompt)
+                answer, vector = self.response_cache.lookup(prompt, scope, vector)
+                span["hit"] = answer is not None
+            return answer, vector
+        except Exception as e:
+            sys_log.log("AGENT", f"Response cache lookup failed: {e}", "ERROR")
+            return None, None
+
+    async def _limited(self, tokens, provider):
+        """Hold a limiter slot for as long as the stream runs."""
+        async with self.limiter.slot(provider) if self.limiter is not None else nullcontext():
+            async for token in tokens:
+                yield token
+
+    async def _traced(self, tokens, provider, stage="generate"):
+        """Pass a token stream through, recording time-to-first-token, tokens/s and total time."""
+        # Speculative streams took their slot when they started (see _plan)
+        held = self.limiter is None or isinstance(tokens, PrefetchedStream)
+        async with nullcontext() if held else self.limiter.slot(provider):
+            # Timing starts once a slot is held; the wait is recorded as limit.wait
+            start, t0 = time.time(), time.perf_counter()
+            first = None
+            attrs = {"tokens": 0}
+            try:
+                async for token in tokens:
+                    if first is None:
+                        first = time.perf_counter() - t0
+                        tracer.record(f"{stage}.first_token", first * 1000, provider)
+                        # Same in-band error test as the breaker and the router
+                        if is_error(token):
+                            attrs["error"] = "provider"
+                    attrs["tokens"] += 1
+                    yield token
+            except (GeneratorExit, asyncio.CancelledError):
+                attrs["error"] = "cancelled"
+                raise
+            except Exception as e:
+                attrs["error"] = type(e).__name__
+                raise
+            finally:
+                total = time.perf_counter() - t0
+                if first is not None and attrs["tokens"] > 1 and total > first:
+                    attrs["tok_s"] = round((attrs["tokens"] - 1) / (total - first), 1)
+                tracer.record(stage, total * 1000, provider, start, **attrs)
+
+    async def stream(self, prompt: str):
+        self.last_active = time.monotonic()
+        sys_log.log("AGENT", "--- New Stream Request ---")
+        tracer.start_trace()
+
+        with tracer.span("request") as request:
+            scope = vector = None
+            if self.response_cache is not None:
+                # Before routing and speculation: a hit costs one embedding and no LLM call
+                scope = cache_scope(self.provider_name, self.kwargs.get("model", ""), self.memory.project)
+                answer, vector = await self._cached_answer(prompt, scope)
+                if answer is not None:
+                    sys_log.log("AGENT", "Response cache hit, replaying")
+                    request["cached"] = True
+                    yield "⚡ [Cache]: Replaying a previous answer...\n\n"
+                    for chunk in re.findall(r"\S+\s*|\s+", answer):
+                        yield chunk
+                    return
+
+            context, complexity, streamer = await self._plan(prompt)
+            provider, _ = self._target(complexity)
+            request.update(route=complexity, provider=provider)
 
-    async def autonomous_fix(self, file_path, max_attempts=3):
+            # 3. Execution
+            response_acc = ""
+            yield self._banner(complexity)
+            if self.failover:
+                streamer = self._hedged(prompt, context, provider, streamer)
+            else:
+                if streamer is None:
+                    streamer = self._provider_stream(provider, prompt, context)
+                streamer = self._traced(streamer, provider)
+
+            switched = False
+            async for token in streamer:
+                if not switched and isinstance(streamer, HedgedStream) and streamer.winner != provider:
+                    switched = True
+                    why = [f"{n} failed" for n in streamer.failed] + [f"{n} circuit open" for n in streamer.skipped]
+                    sys_log.log("AGENT", f"Answered by {streamer.winner} instead of {provider} "
+                                         f"({', '.join(why) or 'hedged, first token won'})")
+                    request.update(provider=streamer.winner, failover=provider)
+                    yield f"↪️ [Failover]: {provider} was slow or failing, answering via {streamer.winner}...\n\n"
+                    # Don't cache a failover answer: the next ask should try the routed provider again
+                    scope = None
+                response_acc += token
+                yield token
+
+            if scope is not None and vector is not None and "❌" not in response_acc:
+                self.response_cache.store(prompt, scope, response_acc, vector, referenced_files(prompt, context))
+
+            # Write-behind: embedding + SQL happen in the ingest worker, not on the request path
+            self.ingest.submit(prompt, response_acc, context)
+        await tracer.maybe_flush()
+
+    def _fix_prompt(self, file_path, error, code):
+        # The code has to go in whole (the model rewrites it); the error output is what gets trimmed
+        budget = self.context_builder.budget(self.provider_name)
+        trimmed = fit_text(error, max(budget - estimate_tokens(code), 256))
+        if trimmed is not error:
+            saved = estimate_tokens(error) - estimate_tokens(trimmed)
+            tracer.record("context", 0.0, self.provider_name, stage="fix", saved_tokens=saved)
+            sys_log.log("AGENT", f"Fix prompt: error output trimmed by {saved} tokens", "DEBUG")
+        error = trimmed
+        return (
+            f"The python script `{file_path}` crashed.\n"
+            f"ERROR:\n{error}\n\n"
+            f"CODE:\n{code}\n\n"
+            "TASK: Return ONLY the fixed code."
+        )
+
+    async def _generate_fix(self, provider, fix_prompt):
+        label = LOCAL if provider is self.graph.local_llm else self.provider_key
+        fix_response = ""
+        async for chunk in self._traced(provider.stream(fix_prompt), label, "fix.generate"):
+            fix_response += chunk
+        # An empty file "runs cleanly": never let that (or an error message) replace the script
+        if is_error(fix_response):
+            raise ValueError(f"provider error: {fix_response.strip()[:200]}")
+        fixed_code = fix_response.replace("```python", "").replace("```", "").strip()
+        if not fixed_code:
+            raise ValueError("the model returned no code")
+        return fixed_code
+
+    def _apply_fix(self, file_path, fixed_code):
+        with tracer.span("fix.apply"):
+            self.memory.create_backup(file_path)
+            self.files.write_allowed = True
+            self.files.write_file(file_path, fixed_code)
+        if self.response_cache is not None:
+            self.response_cache.invalidate_path(file_path)
+
+    async def _execute_streaming(self, file_path, max_lines=50, interval=0.25):
+        """Run a script, yielding ("output", markdown) batches while it runs, then ("result", dict)."""
+        lines = asyncio.Queue()
+        started = time.perf_counter()
+        task = asyncio.create_task(self.files.aexecute_script(
+            file_path, on_output=lambda stream, line: lines.put_nowait(line)))
+        try:
+            while True:
+                batch = []
+                try:
+                    batch.append(await asyncio.wait_for(lines.get(), interval))
+                except asyncio.TimeoutError:
+                    pass
+                while not lines.empty():
+                    batch.append(lines.get_nowait())
+                if batch:
+                    shown = batch[-max_lines:]
+                    skipped = f"... {len(batch) - len(shown)} more lines\n" if len(batch) > len(shown) else ""
+                    yield "output", "```text\n" + skipped + "\n".join(shown) + "\n```\n"
+                if task.done() and lines.empty():
+                    break
+            result = task.result()
+            tracer.record("fix.run", (time.perf_counter() - started) * 1000, exit_code=result["exit_code"])
+            yield "result", result
+        finally:
+            # Consumer went away (user abort): cancelling kills the script's process group
+            task.cancel()
+
+    async def autonomous_fix(self, file_path, max_attempts=3, candidates=1):
+        self.last_active = time.monotonic()
+        tracer.start_trace()
+        with tracer.span("fix", candidates=candidates) as span:
+            fixer = self._parallel_fix if candidates > 1 else self._serial_fix
+            update = ""
+            async for update in fixer(file_path, max_attempts, candidates):
+                yield update
+            # Both loops end on a "⚠️ **Failed ..." line when they give up
+            span["success"] = not update.startswith("⚠️")
+        await tracer.maybe_flush()
+
+    async def _serial_fix(self, file_path, max_attempts, candidates=1):
         attempt = 1
         while attempt <= max_attempts:
             sys_log.log("AGENT", f"Auto-fix Attempt {attempt} for {file_path}")
             yield f"\n🔄 **Attempt {attempt}/{max_attempts}:** Executing `{file_path}`...\n"
-            
-            result = self.files.execute_script(file_path)
+
+            async for kind, payload in self._execute_streaming(file_path):
+                if kind == "output":
+                    yield payload
+                else:
+                    result = payload
             
             if result["success"]:
+                # Output was already streamed above
                 yield f"✅ **Success!** Script ran cleanly.\n"
-                yield f"Output:\n```\n{result['output']}\n```\n"
                 return
             
             yield f"❌ **Error Detected:**\n```text\n{result['error']}\n```\n"
             yield f"🧠 **Analyzing & Fixing...**\n"
 
             current_code = self.files.read_file(file_path)
-            fix_prompt = (
-                f"The python script `{file_path}` crashed.\n"
-                f"ERROR:\n{result['error']}\n\n"
-                f"CODE:\n{current_code}\n\n"
-                "TASK: Return ONLY the fixed code."
-            )
-            
-            fix_response = ""
-            async for chunk in self.provider.stream(fix_prompt):
-                fix_response += chunk
-            
-            fixed_code = fix_response.replace("```python", "").replace("```", "").strip()
-
-            self.memory.create_backup(file_path)
-            self.files.write_allowed = True
-            self.files.write_file(file_path, fixed_code)
+            try:
+                fixed_code = await self._generate_fix(self.provider, self._fix_prompt(file_path, result["error"], current_code))
+            except ValueError as e:
+                yield f"⚠️ **No usable fix:** {e}. Retrying...\n"
+                attempt += 1
+                continue
+            self._apply_fix(file_path, fixed_code)
             
             yield f"🛠️ **Patch Applied.** Retrying...\n"
             attempt += 1
 
         yield f"⚠️ **Failed to fix script after {max_attempts} attempts.**\n"
+
+    async def _run_candidate(self, file_path, workdir, index, provider, fix_prompt, slots):
+        fixed_code = await self._generate_fix(provider, fix_prompt)
+        # Each candidate runs from its own copy; the script's own directory stays importable
+        src = Path(file_path).resolve()
+        candidate = Path(workdir) / f"candidate_{index}" / src.name
+        candidate.parent.mkdir()
+        candidate.write_text(fixed_code, encoding="utf-8")
+        env = dict(os.environ, PYTHONPATH=os.pathsep.join(filter(None, [str(src.parent), os.getenv("PYTHONPATH")])))
+        async with slots:
+            with tracer.span("fix.candidate") as span:
+                result = await self.files.aexecute_script(str(candidate), cwd=str(src.parent), env=env)
+                span["exit_code"] = result["exit_code"]
+        return index, fixed_code, result
+
+    async def _parallel_fix(self, file_path, max_attempts, candidates):
+        """Generate N fixes concurrently, test each in a temp copy, keep the first that passes."""
+        # Alternate cloud + local models so candidates differ by more than sampling noise
+        sources = [self.provider, self.graph.local_llm] if self.fix_with_local else [self.provider]
+        slots = asyncio.Semaphore(self.fix_workers)
+
+        for attempt in range(1, max_attempts + 1):
+            sys_log.log("AGENT", f"Parallel auto-fix round {attempt} for {file_path} ({candidates} candidates)")
+            yield f"\n🔄 **Round {attempt}/{max_attempts}:** Executing `{file_path}`...\n"
+
+            async for kind, payload in self._execute_streaming(file_path):
+                if kind == "output":
+                    yield payload
+                else:
+                    result = payload
+            if result["success"]:
+                yield "✅ **Success!** Script ran cleanly.\n"
+                return
+
+            yield f"❌ **Error Detected:**\n```text\n{result['error']}\n```\n"
+            yield f"🧠 **Generating {candidates} candidate fixes in parallel...**\n"
+
+            fix_prompt = self._fix_prompt(file_path, result["error"], self.files.read_file(file_path))
+            with tempfile.TemporaryDirectory(prefix="neuroterm_fix_") as workdir:
+                tasks = [asyncio.create_task(self._run_candidate(
+                             file_path, workdir, i, sources[i % len(sources)], fix_prompt, slots))
+                         for i in range(candidates)]
+                winner = None
+                try:
+                    for next_done in asyncio.as_completed(tasks):
+                        try:
+                            index, fixed_code, candidate_result = await next_done
+                        except Exception as e:
+                            yield f"⚠️ Candidate failed: {e}\n"
+                            continue
+                        if candidate_result["success"]:
+                            winner = (index, fixed_code, candidate_result)
+                            break
+                        last_line = (candidate_result["error"].strip().splitlines() or ["failed"])[-1]
+                        yield f"🧪 Candidate {index + 1}: ❌ `{last_line}`\n"
+                finally:
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
+
+            if winner:
+                index, fixed_code, candidate_result = winner
+                self._apply_fix(file_path, fixed_code)
+                yield f"🧪 Candidate {index + 1}: ✅ passed, remaining candidates cancelled.\n"
+                yield "🛠️ **Patch Applied.**\n"
+                yield f"Output:\n```\n{candidate_result['output']}\n```\n"
+                return
+
+        yield f"⚠️ **Failed to fix script after {max_attempts} rounds of {candidates} candidates.**\n"
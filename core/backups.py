@@ -0,0 +1,293 @@
+import difflib
+import hashlib
+import json
+import os
+import time
+import zlib
+from pathlib import Path
+from core.logger import sys_log
+from core.storage import data_path
+
+FULL, DELTA = b"F", b"D"
+
+
+def make_delta(base, content):
+    """Line-level delta: "=" copies base lines [i1, i2), "+" inserts literal text."""
+    a = base.splitlines(keepends=True)
+    b = content.splitlines(keepends=True)
+    # Edits are usually local: only diff what lies between the common prefix and suffix
+    head = 0
+    while head < min(len(a), len(b)) and a[head] == b[head]:
+        head += 1
+    tail = 0
+    while tail < min(len(a), len(b)) - head and a[-tail - 1] == b[-tail - 1]:
+        tail += 1
+
+    ops = [["=", 0, head]] if head else []
+    matcher = difflib.SequenceMatcher(None, a[head:len(a) - tail], b[head:len(b) - tail], autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["=", head + i1, head + i2])
+        elif tag in ("replace", "insert"):
+            # latin-1 round-trips arbitrary bytes through JSON
+            ops.append(["+", b"".join(b[head + j1:head + j2]).decode("latin-1")])
+    if tail:
+        ops.append(["=", len(a) - tail, len(a)])
+    return json.dumps(ops, separators=(",", ":")).encode("latin-1")
+
+
+def apply_delta(base, delta):
+    a = base.splitlines(keepends=True)
+    out = []
+    for op in json.loads(delta):
+        if op[0] == "=":
+            out.extend(a[op[1]:op[2]])
+        else:
+            out.append(op[1].encode("latin-1"))
+    return b"".join(out)
+
+
+class BackupStore:
+    """Content-addressed backups under one directory, indexed in the `backups` table.
+
+    Each distinct file version is one zlib blob named by the sha256 of its
+    content, so identical versions (of any file) are stored once. A version
+    can instead be stored as a line delta against the previous backup of the
+    same file when that is smaller; chains are cut with a full snapshot every
+    `max_chain` versions so restores stay cheap.
+    """
+
+    def __init__(self, store, root="neuroterm_backups", delta=True, max_chain=16,
+                 keep_per_file=50, max_age_days=30, level=6):
+        self.store = store
+        self.root = data_path(root)
+        self.delta = delta
+        self.max_chain = max_chain
+        self.keep_per_file = keep_per_file
+        self.max_age_days = max_age_days
+        self.level = level
+        # Last saved content per file, so the next delta does not have to rebuild its base
+        self._recent = {}
+        self._migrate()
+
+    def _migrate(self):
+        self.store.execute("CREATE TABLE IF NOT EXISTS backups "
+                           "(id INTEGER PRIMARY KEY, timestamp REAL, original_path TEXT, backup_path TEXT)")
+        # Rows written before the blob store only have a backup_path to a .bak copy
+        columns = {row[1] for row in self.store.query("PRAGMA table_info(backups)")}
+        for name, kind in (("content_hash", "TEXT"), ("size", "INTEGER")):
+            if name not in columns:
+                self.store.execute(f"ALTER TABLE backups ADD COLUMN {name} {kind}")
+        self.store.executescript('''
+            CREATE TABLE IF NOT EXISTS backup_blobs
+                (hash TEXT PRIMARY KEY, base_hash TEXT, depth INTEGER, size INTEGER, stored_bytes INTEGER);
+            CREATE INDEX IF NOT EXISTS idx_backups_original_path ON backups(original_path);
+            CREATE INDEX IF NOT EXISTS idx_backups_path_ts ON backups(original_path, timestamp);
+            CREATE INDEX IF NOT EXISTS idx_backups_content_hash ON backups(content_hash);
+        ''')
+
+    def _blob_path(self, digest):
+        return self.root / digest[:2] / digest[2:]
+
+    def _write_blob(self, digest, payload):
+        path = self._blob_path(digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_bytes(payload)
+        os.replace(tmp, path)
+        return len(payload)
+
+    def _read_blob(self, digest):
+        """Returns (kind, base_hash or None, body)."""
+        raw = self._blob_path(digest).read_bytes()
+        if raw[:1] == DELTA:
+            return DELTA, raw[1:65].decode("ascii"), zlib.decompress(raw[65:])
+        return FULL, None, zlib.decompress(raw[1:])
+
+    def content(self, digest):
+        """Rebuild a version by walking its delta chain back to a full snapshot."""
+        chain = []
+        kind, base, body = self._read_blob(digest)
+        while kind == DELTA:
+            chain.append(body)
+            kind, base, body = self._read_blob(base)
+        for delta in reversed(chain):
+            body = apply_delta(body, delta)
+        return body
+
+    def _latest(self, path):
+        rows = self.store.query(
+            "SELECT b.id, b.content_hash, o.depth FROM backups b JOIN backup_blobs o ON o.hash = b.content_hash "
+            "WHERE b.original_path = ? ORDER BY b.timestamp DESC, b.id DESC LIMIT 1", (path,))
+        return rows[0] if rows else None
+
+    def save(self, file_path):
+        """Back up the current content of file_path. Returns the backup row as a dict, or None."""
+        src = Path(file_path)
+        if not src.exists(): return None
+        data = src.read_bytes()
+        digest = hashlib.sha256(data).hexdigest()
+        # Absolute: the store is shared by every directory codevue runs in
+        key = str(src.resolve())
+
+        latest = self._latest(key)
+        if latest and latest[1] == digest:
+            # Unchanged since the last backup (e.g. a retry that never wrote)
+            return self.get(latest[0])
+
+        stored, base = 0, None
+        # Same content already stored (another file, or an older version): just point at it
+        if not self.store.query("SELECT 1 FROM backup_blobs WHERE hash = ?", (digest,)):
+            payload, depth = FULL + zlib.compress(data, self.level), 0
+            if self.delta and latest and latest[2] < self.max_chain:
+                try:
+                    cached = self._recent.get(key)
+                    previous = cached[1] if cached and cached[0] == latest[1] else self.content(latest[1])
+                    delta = zlib.compress(make_delta(previous, data), self.level)
+                    if len(delta) + 64 < len(payload):
+                        payload = DELTA + latest[1].encode("ascii") + delta
+                        base, depth = latest[1], latest[2] + 1
+                except Exception as e:
+                    sys_log.log("BACKUP", f"Delta against {latest[1][:12]} failed, storing full copy: {e}", "ERROR")
+            stored = self._write_blob(digest, payload)
+            self.store.execute("INSERT INTO backup_blobs (hash, base_hash, depth, size, stored_bytes) VALUES (?, ?, ?, ?, ?)",
+                               (digest, base, depth, len(data), stored))
+
+        cursor = self.store.execute(
+            "INSERT INTO backups (timestamp, original_path, backup_path, content_hash, size) VALUES (?, ?, ?, ?, ?)",
+            (time.time(), key, str(self._blob_path(digest)), digest, len(data)))
+        backup_id = cursor.lastrowid
+        self._recent[key] = (digest, data)
+        sys_log.log("BACKUP", f"#{backup_id} {key} ({len(data)}B -> {stored}B{', delta' if base else ''})")
+        self._prune(key)
+        return self.get(backup_id)
+
+    def get(self, backup_id):
+        rows = self.store.query(
+            "SELECT b.id, b.timestamp, b.original_path, b.backup_path, b.content_hash, o.base_hash, b.size, o.stored_bytes "
+            "FROM backups b LEFT JOIN backup_blobs o ON o.hash = b.content_hash WHERE b.id = ?", (backup_id,))
+        if not rows: return None
+        keys = ("id", "timestamp", "path", "backup_path", "hash", "base", "size", "stored_bytes")
+        return dict(zip(keys, rows[0]))
+
+    def list(self, file_path=None, limit=50):
+        """Newest first; only the index is read, never the blobs."""
+        if file_path is None:
+            ids = self.store.query("SELECT id FROM backups ORDER BY timestamp DESC, id DESC LIMIT ?", (limit,))
+        else:
+            ids = self.store.query(
+                "SELECT id FROM backups WHERE original_path = ? ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (str(Path(file_path).resolve()), limit))
+        return [self.get(row[0]) for row in ids]
+
+    def read(self, backup_id):
+        entry = self.get(backup_id)
+        if entry is None:
+            raise KeyError(f"No backup #{backup_id}")
+        if entry["hash"] is None:
+            return Path(entry["backup_path"]).read_bytes()
+        return self.content(entry["hash"])
+
+    def restore(self, backup_id, dest=None):
+        """Write a backup back to its file (or dest). The current content is backed up first."""
+        entry = self.get(backup_id)
+        if entry is None:
+            raise KeyError(f"No backup #{backup_id}")
+        target = Path(dest or entry["path"])
+        data = self.read(backup_id)
+        if target.exists():
+            self.save(target)
+        target.write_bytes(data)
+        sys_log.log("BACKUP", f"Restored #{backup_id} to {target}")
+        return str(target)
+
+    def diff(self, backup_id, other_id=None, context=3):
+        """Unified diff from a backup to another backup, or to the file as it is now."""
+        entry = self.get(backup_id)
+        if entry is None:
+            raise KeyError(f"No backup #{backup_id}")
+        old = self.read(backup_id).decode("utf-8", "replace").splitlines(keepends=True)
+        if other_id is None:
+            current = Path(entry["path"])
+            new = current.read_bytes() if current.exists() else b""
+            label = entry["path"]
+        else:
+            new = self.read(other_id)
+            label = f"{entry['path']}@{other_id}"
+        return "".join(difflib.unified_diff(
+            old, new.decode("utf-8", "replace").splitlines(keepends=True),
+            f"{entry['path']}@{backup_id}", label, n=context))
+
+    def _prune(self, path):
+        """Apply keep_per_file to one file right after a save, freeing blobs it no longer needs."""
+        if not self.keep_per_file: return
+        rows = self.store.query(
+            "SELECT id, content_hash FROM backups WHERE original_path = ? AND content_hash IS NOT NULL "
+            "ORDER BY timestamp DESC, id DESC LIMIT -1 OFFSET ?", (path, self.keep_per_file))
+        if rows:
+            with self.store.transaction() as conn:
+                conn.executemany("DELETE FROM backups WHERE id = ?", [(r[0],) for r in rows])
+            # A full sweep also catches delta bases that only the pruned rows kept alive
+            self._sweep()
+
+    def _live_hashes(self):
+        # Blobs referenced by a row, plus every base their delta chains depend on
+        rows = self.store.query('''
+            WITH RECURSIVE live(h) AS (
+                SELECT content_hash FROM backups WHERE content_hash IS NOT NULL
+                UNION
+                SELECT o.base_hash FROM backup_blobs o JOIN live ON o.hash = live.h
+                WHERE o.base_hash IS NOT NULL)
+            SELECT h FROM live''')
+        return {row[0] for row in rows}
+
+    def _sweep(self):
+        """Delete blobs that nothing refers to. Returns (count, bytes freed)."""
+        live = self._live_hashes()
+        dead = [row[0] for row in self.store.query("SELECT hash FROM backup_blobs") if row[0] not in live]
+        freed = 0
+        for digest in dead:
+            path = self._blob_path(digest)
+            if path.exists():
+                freed += path.stat().st_size
+                path.unlink()
+        with self.store.transaction() as conn:
+            conn.executemany("DELETE FROM backup_blobs WHERE hash = ?", [(h,) for h in dead])
+        return len(dead), freed
+
+    def gc(self, keep_per_file=None, max_age_days=None):
+        """Retention + sweep: drop rows past the per-file count or age limit (the newest backup of
+        each file is always kept), then delete blobs and legacy .bak files nothing refers to."""
+        keep = keep_per_file or self.keep_per_file
+        max_age = max_age_days if max_age_days is not None else self.max_age_days
+        cutoff = time.time() - max_age * 86400 if max_age else None
+        start = time.perf_counter()
+
+        doomed = []
+        for (path,) in self.store.query("SELECT DISTINCT original_path FROM backups"):
+            rows = self.store.query(
+                "SELECT id, timestamp, backup_path, content_hash FROM backups WHERE original_path = ? "
+                "ORDER BY timestamp DESC, id DESC", (path,))
+            for rank, (backup_id, ts, backup_path, digest) in enumerate(rows):
+                if rank == 0: continue
+                if (keep and rank >= keep) or (cutoff and ts < cutoff):
+                    doomed.append((backup_id, backup_path, digest))
+
+        with self.store.transaction() as conn:
+            conn.executemany("DELETE FROM backups WHERE id = ?", [(d[0],) for d in doomed])
+        for _, backup_path, digest in doomed:
+            if digest is None:
+                Path(backup_path).unlink(missing_ok=True)
+
+        blobs, freed = self._sweep()
+        stats = {"rows": len(doomed), "blobs": blobs, "bytes_freed": freed,
+                 "seconds": round(time.perf_counter() - start, 3)}
+        sys_log.log("BACKUP", f"GC: {stats}")
+        return stats
+
+    def stats(self):
+        rows, files, size = self.store.query(
+            "SELECT COUNT(*), COUNT(DISTINCT original_path), COALESCE(SUM(size), 0) "
+            "FROM backups WHERE content_hash IS NOT NULL")[0]
+        blobs, stored = self.store.query("SELECT COUNT(*), COALESCE(SUM(stored_bytes), 0) FROM backup_blobs")[0]
+        return {"backups": rows, "files": files, "blobs": blobs, "logical_bytes": size, "stored_bytes": stored}
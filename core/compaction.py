@@ -0,0 +1,345 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import time
+import uuid
+import numpy as np
+from core.context import fit_text
+from core.logger import sys_log
+from core.projects import GLOBAL, current_project
+from core.streams import is_error
+from core.tracing import percentile, tracer
+
+DIGEST_PROMPT = (
+    "Below are past conversations between a developer and an AI assistant. Write a short digest of "
+    "what is worth remembering from them: facts, decisions, file and function names, fixes. "
+    "Plain text, at most 8 bullet points.\n\n{conversations}"
+)
+
+
+def _unit(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def _dir_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+class MemoryCompactor:
+    """Keeps long-lived conversation memory bounded. One run:
+
+    1. dedupe     drop chat vectors with cosine >= dup_threshold to an older one;
+                  a turn whose chunks all went is merged into the survivor's turn
+    2. expire     delete turns older than expire_after_days retrieved < min_access times
+    3. summarize  cluster turns older than summarize_after_days by embedding and
+                  replace each cluster of min_cluster+ turns with one digest turn
+                  written by the local model
+    4. rebuild    the Chroma collection from its surviving vectors when at least
+                  rebuild_ratio of them went (deletes leave HNSW tombstones that
+                  keep costing disk and search time); no re-embedding
+    5. VACUUM     the SQLite store and Chroma's, and remove the HNSW segment
+                  directories of dropped collections (Chroma leaves them behind)
+
+    and measures collection sizes and retrieval latency before and after. A run
+    covers one project namespace (the active one unless compact() is given one).
+    """
+
+    def __init__(self, memory, summarizer=None, dup_threshold=0.97, expire_after_days=90, min_access=1,
+                 summarize_after_days=14, cluster_threshold=0.75, min_cluster=3, max_cluster=8,
+                 rebuild_ratio=0.3, sample_queries=20, block=256):
+        self.memory = memory
+        # Anything with an async stream(prompt) (the local OllamaProvider); None skips summarization
+        self.summarizer = summarizer
+        self.dup_threshold = dup_threshold
+        self.expire_after_days = expire_after_days
+        self.min_access = min_access
+        self.summarize_after_days = summarize_after_days
+        self.cluster_threshold = cluster_threshold
+        self.min_cluster = min_cluster
+        self.max_cluster = max_cluster
+        self.rebuild_ratio = rebuild_ratio
+        self.sample_queries = sample_queries
+        self.block = block
+        self._running = asyncio.Lock()
+        self.memory.store.execute("CREATE TABLE IF NOT EXISTS compaction_runs "
+                                  "(id INTEGER PRIMARY KEY, timestamp REAL, report TEXT)")
+
+    @property
+    def vectors(self):
+        return self.memory.vector_store
+
+    @property
+    def project(self):
+        return self.memory.project
+
+    def _in_project(self):
+        """WHERE fragment and params limiting logs to the namespace being compacted."""
+        return "COALESCE(project, ?) = ?", (GLOBAL, self.project)
+
+    def last_run(self):
+        row = self.memory.store.query("SELECT MAX(timestamp) FROM compaction_runs")
+        return row[0][0] or 0.0
+
+    # --- measurement -------------------------------------------------------
+
+    def _queries(self):
+        scope, params = self._in_project()
+        rows = self.memory.store.query(f"SELECT user_msg FROM logs WHERE kind IS NOT 'digest' AND {scope} "
+                                       "ORDER BY id DESC LIMIT ?", (*params, self.sample_queries))
+        queries = [row[0] for row in rows if row[0]]
+        # Embed once up front: both measurements then time the search, not the embedding call
+        return [(q, self.memory.embed_query(q)) for q in queries]
+
+    def measure(self, queries):
+        scope, params = self._in_project()
+        logs, digests = self.memory.store.query(
+            f"SELECT COUNT(*), COALESCE(SUM(kind = 'digest'), 0) FROM logs WHERE {scope}", params)[0]
+        latencies = []
+        for text, vector in queries:
+            start = time.perf_counter()
+            self.vectors.similarity_search_by_vector(vector, k=4)
+            self.memory._lexical_search(text, 4, 0, [self.project])
+            latencies.append((time.perf_counter() - start) * 1000)
+        return {
+            "logs": logs,
+            "digests": digests,
+            "vectors": self.vectors._collection.count(),
+            "db_bytes": self.memory.store.size(),
+            "chroma_bytes": _dir_size(self.memory.chroma_path),
+            "retrieval_p50_ms": round(percentile(latencies, 50), 2),
+            "retrieval_p95_ms": round(percentile(latencies, 95), 2),
+        }
+
+    # --- passes ------------------------------------------------------------
+
+    def _delete_logs(self, log_ids):
+        for i in range(0, len(log_ids), 500):
+            batch = log_ids[i:i + 500]
+            self.vectors.delete(where={"log_id": {"$in": batch}})
+            self.memory.store.execute(f"DELETE FROM logs WHERE id IN ({','.join('?' * len(batch))})", batch)
+
+    def dedupe(self):
+        data = self.vectors.get(include=["embeddings", "metadatas"])
+        n = len(data["ids"])
+        if n < 2:
+            return {"vectors": 0, "logs": 0}
+        log_ids = [m.get("log_id") if m else None for m in data["metadatas"]]
+        # Oldest first, so the earliest copy survives
+        order = sorted(range(n), key=lambda i: log_ids[i] if log_ids[i] is not None else -1)
+        ids = [data["ids"][i] for i in order]
+        log_ids = [log_ids[i] for i in order]
+        vectors = _unit([data["embeddings"][i] for i in order])
+
+        dropped = np.zeros(n, dtype=bool)
+        survivor = {}
+        for start in range(0, n, self.block):
+            end = min(start + self.block, n)
+            sims = vectors[start:end] @ vectors[:end].T
+            for row in range(end - start):
+                i = start + row
+                matches = np.nonzero(sims[row, :i] >= self.dup_threshold)[0]
+                matches = matches[~dropped[matches]]
+                if len(matches):
+                    dropped[i] = True
+                    survivor[i] = int(matches[0])
+
+        drop_ids = [ids[i] for i in np.nonzero(dropped)[0]]
+        if not drop_ids:
+            return {"vectors": 0, "logs": 0}
+        # Turns with every chunk dropped are folded into the turn that kept the matching chunk
+        kept_logs = {log_ids[i] for i in range(n) if not dropped[i]}
+        merges = {}
+        for i, j in survivor.items():
+            source, target = log_ids[i], log_ids[j]
+            if source is not None and target is not None and source != target and source not in kept_logs:
+                merges.setdefault(source, target)
+        for i in range(0, len(drop_ids), 500):
+            self.vectors.delete(ids=drop_ids[i:i + 500])
+        with self.memory.store.transaction() as conn:
+            for source, target in merges.items():
+                conn.execute("UPDATE logs SET access_count = COALESCE(access_count, 0) + "
+                             "(SELECT COALESCE(access_count, 0) FROM logs WHERE id = ?) WHERE id = ?", (source, target))
+                conn.execute("DELETE FROM logs WHERE id = ?", (source,))
+        return {"vectors": len(drop_ids), "logs": len(merges)}
+
+    def expire(self, now=None):
+        cutoff = (now or time.time()) - self.expire_after_days * 86400
+        scope, params = self._in_project()
+        rows = self.memory.store.query(f"SELECT id FROM logs WHERE timestamp < ? AND COALESCE(access_count, 0) < ? "
+                                       f"AND {scope}", (cutoff, self.min_access, *params))
+        log_ids = [row[0] for row in rows]
+        self._delete_logs(log_ids)
+        return len(log_ids)
+
+    def clusters(self, now=None):
+        """Greedy centroid clustering of old turns, oldest first. Returns [[(id, ts, user, ai, access)]]."""
+        cutoff = (now or time.time()) - self.summarize_after_days * 86400
+        scope, params = self._in_project()
+        rows = self.memory.store.query(
+            "SELECT id, timestamp, user_msg, ai_msg, COALESCE(access_count, 0) FROM logs "
+            f"WHERE timestamp < ? AND kind IS NOT 'digest' AND {scope} ORDER BY timestamp", (cutoff, *params))
+        if len(rows) < self.min_cluster:
+            return []
+        by_log = {}
+        for i in range(0, len(rows), 500):
+            batch = [row[0] for row in rows[i:i + 500]]
+            data = self.vectors.get(where={"log_id": {"$in": batch}}, include=["embeddings", "metadatas"])
+            for vector, meta in zip(data["embeddings"], data["metadatas"]):
+                by_log.setdefault(meta["log_id"], []).append(vector)
+        rows = [row for row in rows if row[0] in by_log]
+        if not rows:
+            return []
+        # One vector per turn: the mean of its chunks
+        vectors = _unit([np.mean(by_log[row[0]], axis=0) for row in rows])
+
+        clusters, centroids = [], []
+        for row, vector in zip(rows, vectors):
+            best, best_sim = None, self.cluster_threshold
+            for c, centroid in enumerate(centroids):
+                if len(clusters[c]) < self.max_cluster:
+                    sim = float(centroid @ vector) / (np.linalg.norm(centroid) or 1)
+                    if sim >= best_sim:
+                        best, best_sim = c, sim
+            if best is None:
+                clusters.append([row])
+                centroids.append(vector.copy())
+            else:
+                clusters[best].append(row)
+                centroids[best] += vector
+        return [c for c in clusters if len(c) >= self.min_cluster]
+
+    async def _digest(self, cluster):
+        conversations = "\n\n".join(f"User: {user[:500]}\nAI: {ai[:1000]}" for _, _, user, ai, _ in cluster)
+        prompt = DIGEST_PROMPT.format(conversations=fit_text(conversations, 1500))
+        summary = ""
+        async for token in self.summarizer.stream(prompt):
+            summary += token
+        summary = summary.strip()
+        if not summary or is_error(summary):
+            raise RuntimeError(summary or "empty summary")
+        return summary
+
+    def _replace_with_digest(self, cluster, summary):
+        first, last = cluster[0][1], cluster[-1][1]
+        title = (f"Digest of {len(cluster)} conversations "
+                 f"({time.strftime('%Y-%m-%d', time.localtime(first))} to "
+                 f"{time.strftime('%Y-%m-%d', time.localtime(last))})")
+        with self.memory.store.transaction() as conn:
+            # Dated like its newest turn so age-based expiry still applies to it
+            digest_id = conn.execute(
+                "INSERT INTO logs (timestamp, user_msg, ai_msg, context, access_count, kind, project) "
+                "VALUES (?, ?, ?, '', ?, 'digest', ?)",
+                (last, title, summary, sum(row[4] for row in cluster), self.project)).lastrowid
+        docs = self.memory.splitter.create_documents(
+            [f"User: {title}\nAI: {summary}"],
+            metadatas=[{"log_id": digest_id, "kind": "digest", "project": self.project}])
+        self.vectors.add_documents(docs)
+        self._delete_logs([row[0] for row in cluster])
+
+    async def summarize(self, now=None):
+        if self.summarizer is None:
+            return {"digests": 0, "turns": 0}
+        clusters = await asyncio.to_thread(self.clusters, now)
+        digests = turns = 0
+        for cluster in clusters:
+            try:
+                summary = await self._digest(cluster)
+            except Exception as e:
+                # Keep the originals; the next run tries again
+                sys_log.log("COMPACT", f"Summary of {len(cluster)} turns failed: {e}", "ERROR")
+                continue
+            await asyncio.to_thread(self._locked, self._replace_with_digest, cluster, summary)
+            digests += 1
+            turns += len(cluster)
+        return {"digests": digests, "turns": turns}
+
+    def rebuild(self, before):
+        """Recreate the chat collection with only its live entries. Returns True if it ran."""
+        collection = self.vectors._collection
+        remaining = collection.count()
+        if not before or (before - remaining) / before < self.rebuild_ratio:
+            return False
+        data = self.vectors.get(include=["embeddings", "metadatas", "documents"])
+        self.vectors.reset_collection()
+        collection = self.vectors._collection
+        for i in range(0, len(data["ids"]), 1000):
+            collection.add(ids=data["ids"][i:i + 1000], embeddings=data["embeddings"][i:i + 1000],
+                           metadatas=data["metadatas"][i:i + 1000], documents=data["documents"][i:i + 1000])
+        return True
+
+    def reclaim_chroma(self):
+        """VACUUM chroma.sqlite3 and delete segment directories no collection uses. Returns bytes reclaimed."""
+        path = self.memory.chroma_path
+        before = _dir_size(path)
+        # Listed before reading the live segments, so a collection created meanwhile is never removed
+        dirs = [name for name in os.listdir(path) if os.path.isdir(os.path.join(path, name))]
+        try:
+            db = sqlite3.connect(os.path.join(path, "chroma.sqlite3"), timeout=30)
+            try:
+                live = {row[0] for row in db.execute("SELECT id FROM segments")}
+                db.execute("VACUUM")
+            finally:
+                db.close()
+        except sqlite3.Error as e:
+            sys_log.log("COMPACT", f"Chroma vacuum failed: {e}", "ERROR")
+            return 0
+        for name in dirs:
+            try:
+                uuid.UUID(name)
+            except ValueError:
+                continue
+            if name not in live:
+                shutil.rmtree(os.path.join(path, name), ignore_errors=True)
+        return before - _dir_size(path)
+
+    def _vacuum(self):
+        return self.memory.store.vacuum() + self.reclaim_chroma()
+
+    def _locked(self, fn, *args):
+        with self.memory.write_lock:
+            return fn(*args)
+
+    async def compact(self, now=None, project=None):
+        if self._running.locked():
+            raise RuntimeError("Compaction is already running")
+        async with self._running:
+            # Pin the namespace for the whole run (a /project switch mid-run must not split it)
+            token = current_project.set(project or self.memory.project)
+            try:
+                report = await self._compact(now)
+            finally:
+                current_project.reset(token)
+        return report
+
+    async def _compact(self, now):
+        start = time.perf_counter()
+        with tracer.span("compact", project=self.project) as span:
+            await asyncio.to_thread(self.memory.initialize)
+            queries = await asyncio.to_thread(self._queries)
+            report = {"project": self.project, "before": await asyncio.to_thread(self.measure, queries)}
+            report["deduplicated"] = await asyncio.to_thread(self._locked, self.dedupe)
+            report["expired"] = await asyncio.to_thread(self._locked, self.expire, now)
+            report["summarized"] = await self.summarize(now)
+            report["rebuilt"] = await asyncio.to_thread(self._locked, self.rebuild, report["before"]["vectors"])
+            report["vacuumed_bytes"] = await asyncio.to_thread(self._locked, self._vacuum)
+            report["after"] = await asyncio.to_thread(self.measure, queries)
+            span.update(vectors_before=report["before"]["vectors"], vectors_after=report["after"]["vectors"])
+        report["seconds"] = round(time.perf_counter() - start, 2)
+        self.memory.store.execute("INSERT INTO compaction_runs (timestamp, report) VALUES (?, ?)",
+                                  (time.time(), json.dumps(report)))
+        sys_log.log("COMPACT", f"[{self.project}] vectors {report['before']['vectors']} -> {report['after']['vectors']}, "
+                               f"logs {report['before']['logs']} -> {report['after']['logs']}, "
+                               f"retrieval p95 {report['before']['retrieval_p95_ms']} -> "
+                               f"{report['after']['retrieval_p95_ms']}ms")
+        return report
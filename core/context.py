@@ -0,0 +1,167 @@
+import math
+import re
+from collections import Counter
+
+_WORD = re.compile(r"\w+")
+
+# Context tokens per provider. Local models have small windows and slow
+# prefill; cloud models take more, but every token still costs latency.
+DEFAULT_BUDGETS = {
+    "ollama": 600,
+    "gemini": 1500,
+    "openrouter": 1200,
+    "mistral": 1200,
+    "huggingface": 1000,
+}
+
+
+def estimate_tokens(text):
+    """~4 chars per token: close enough for budgeting without a tokenizer."""
+    return (len(text) + 3) // 4
+
+
+def _terms(text):
+    return Counter(t.lower() for t in _WORD.findall(text))
+
+
+def _cosine(a, b):
+    if not a or not b:
+        return 0.0
+    dot = sum(count * b[t] for t, count in a.items() if t in b)
+    return dot / (math.sqrt(sum(v * v for v in a.values())) * math.sqrt(sum(v * v for v in b.values())))
+
+
+def _shingles(text, n=3):
+    words = [t.lower() for t in _WORD.findall(text)]
+    return {tuple(words[i:i + n]) for i in range(max(len(words) - n + 1, 1))}
+
+
+def _overlap(a, b, min_chars=20, max_chars=400):
+    """Length of the longest suffix of a that is a prefix of b (splitter/indexer overlap)."""
+    for size in range(min(len(a), len(b), max_chars), min_chars - 1, -1):
+        if a.endswith(b[:size]):
+            return size
+    return 0
+
+
+def merge_chunks(texts):
+    """Fold chunks into their neighbours: drop ones contained in another, join overlapping pairs."""
+    merged = []
+    for text in texts:
+        text = text.strip()
+        if not text:
+            continue
+        for i, kept in enumerate(merged):
+            if text in kept:
+                break
+            if kept in text:
+                merged[i] = text
+                break
+            if (size := _overlap(kept, text)):
+                merged[i] = kept + text[size:]
+                break
+            if (size := _overlap(text, kept)):
+                merged[i] = text + kept[size:]
+                break
+        else:
+            merged.append(text)
+    return merged
+
+
+def fit_text(text, budget, head_share=0.25):
+    """Trim text to ~budget tokens, keeping its start and (mostly) its end.
+    Tracebacks put the actual error last, so the tail gets the larger share."""
+    if estimate_tokens(text) <= budget:
+        return text
+    chars = budget * 4
+    head = text[:int(chars * head_share)]
+    tail = text[-(chars - len(head)):]
+    cut = len(text) - len(head) - len(tail)
+    return f"{head}\n... [{cut} chars trimmed] ...\n{tail}"
+
+
+class ContextBuilder:
+    """Turns ranked retrieval candidates into a prompt context that fits a token budget.
+
+    Candidates are merged where chunks overlap, near-duplicates are dropped
+    (word-shingle Jaccard >= dup_threshold), and the rest are picked greedily
+    by maximal marginal relevance: relevance comes from the fused retrieval
+    rank, redundancy from term-vector cosine against what is already picked.
+    """
+
+    def __init__(self, budgets=None, default_budget=1000, max_chunks=4, mmr_lambda=0.7, dup_threshold=0.8):
+        self.budgets = dict(DEFAULT_BUDGETS, **(budgets or {}))
+        self.default_budget = default_budget
+        self.max_chunks = max_chunks
+        self.mmr_lambda = mmr_lambda
+        self.dup_threshold = dup_threshold
+
+    def budget(self, provider):
+        return self.budgets.get(provider, self.default_budget)
+
+    def _dedupe(self, texts):
+        kept, shingles = [], []
+        for text in texts:
+            sh = _shingles(text)
+            if any(len(sh & other) / len(sh | other) >= self.dup_threshold for other in shingles):
+                continue
+            kept.append(text)
+            shingles.append(sh)
+        return kept
+
+    def _mmr(self, query, texts):
+        """Order texts by MMR. texts arrive in fused-rank order."""
+        query_terms = _terms(query)
+        terms = [_terms(t) for t in texts]
+        # Rank prior (1.0 .. ~0) blended with direct query overlap
+        relevance = [0.5 * (1 - i / len(texts)) + 0.5 * _cosine(query_terms, terms[i]) for i in range(len(texts))]
+        order, remaining = [], list(range(len(texts)))
+        while remaining:
+            def score(i):
+                redundancy = max((_cosine(terms[i], terms[j]) for j in order), default=0.0)
+                return self.mmr_lambda * relevance[i] - (1 - self.mmr_lambda) * redundancy
+            best = max(remaining, key=score)
+            order.append(best)
+            remaining.remove(best)
+        return [texts[i] for i in order]
+
+    def build(self, query, candidates, provider=None, budget=None, baseline=None):
+        """candidates: ranked texts (best first). Returns (context, report).
+
+        saved_tokens is measured against `baseline` (the context that would have
+        been sent without the builder) when given, else against all candidates.
+        """
+        budget = budget or self.budget(provider)
+        texts = [t for t in candidates if t and t.strip()]
+        candidate_tokens = estimate_tokens("\n---\n".join(texts))
+        baseline_tokens = estimate_tokens(baseline) if baseline is not None else candidate_tokens
+
+        merged = merge_chunks(texts)
+        unique = self._dedupe(merged)
+        picked, used = [], 0
+        for text in self._mmr(query, unique) if unique else []:
+            if len(picked) >= self.max_chunks:
+                break
+            cost = estimate_tokens(text) + 2
+            if used + cost > budget:
+                if picked:
+                    continue
+                # Always send something: trim the best candidate to the budget
+                text = fit_text(text, budget)
+                cost = estimate_tokens(text)
+            picked.append(text)
+            used += cost
+
+        context = "\n---\n".join(picked)
+        context_tokens = estimate_tokens(context)
+        return context, {
+            "candidates": len(texts),
+            "merged": len(texts) - len(merged),
+            "duplicates": len(merged) - len(unique),
+            "kept": len(picked),
+            "budget": budget,
+            "candidate_tokens": candidate_tokens,
+            "baseline_tokens": baseline_tokens,
+            "context_tokens": context_tokens,
+            "saved_tokens": baseline_tokens - context_tokens,
+        }
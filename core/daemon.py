@@ -0,0 +1,234 @@
+import asyncio
+import itertools
+import json
+import os
+import signal
+import socket
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager, suppress
+from core.logger import sys_log
+from core.ops import run_op
+from core.projects import current_project
+from core.storage import data_path
+
+DEFAULT_SOCKET = os.getenv("NEUROTERM_SOCKET") or str(data_path("neuroterm.sock"))
+# Lines carry whole answers / fix logs, so allow more than asyncio's 64KB default
+LINE_LIMIT = 2 ** 24
+
+
+def encode(message):
+    return (json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def socket_alive(path):
+    """True if something accepts connections on the Unix socket at path."""
+    if not os.path.exists(path):
+        return False
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as s:
+        s.settimeout(0.2)
+        try:
+            s.connect(path)
+            return True
+        except OSError:
+            return False
+
+
+class FairScheduler:
+    """At most `max_active` jobs run at once. When a slot frees it goes to the
+    next session in round-robin order, so one busy client can't starve the rest."""
+
+    def __init__(self, max_active=4):
+        self.max_active = max_active
+        self.active = 0
+        self._waiting = OrderedDict()  # session -> deque of futures, in turn order
+
+    @asynccontextmanager
+    async def slot(self, session):
+        if self.active < self.max_active and not self._waiting:
+            self.active += 1
+        else:
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiting.setdefault(session, deque()).append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                if waiter.done() and not waiter.cancelled():
+                    # The slot was handed over just as we were cancelled; pass it on
+                    self._release()
+                else:
+                    self._forget(session, waiter)
+                raise
+        try:
+            yield
+        finally:
+            self._release()
+
+    def _forget(self, session, waiter):
+        queue = self._waiting.get(session)
+        if queue is not None and waiter in queue:
+            queue.remove(waiter)
+            if not queue:
+                del self._waiting[session]
+
+    def _release(self):
+        while self._waiting:
+            session, queue = self._waiting.popitem(last=False)
+            waiter = queue.popleft()
+            if queue:
+                # Back of the line until every other waiting session had a turn
+                self._waiting[session] = queue
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    def waiting(self):
+        return sum(len(q) for q in self._waiting.values())
+
+
+class AgentServer:
+    """Hosts one warm NeuroAgent for many clients over a Unix socket.
+
+    Protocol: newline-delimited JSON in both directions. A client sends
+    {"id": 1, "op": "stream", "params": {"prompt": "..."}} and gets back
+    {"id": 1, "chunk": "..."} lines followed by {"id": 1, "done": true,
+    "result": ...} or {"id": 1, "error": "..."}. Requests on one connection
+    run concurrently; {"id": 1, "op": "cancel"} stops one. An optional "project"
+    field selects the memory namespace the request reads and writes.
+
+    Ops: "stream" (prompt), "fix" (path, max_attempts, candidates), "ping",
+    and everything in core.ops. stream/fix/index/compact go through the FairScheduler.
+    "project" is per client; "provider", "allow_write" and "cache" change the one
+    shared agent, so they apply to every attached session.
+    """
+
+    SCHEDULED = {"index", "compact"}
+
+    def __init__(self, agent, path=DEFAULT_SOCKET, max_active=4):
+        self.agent = agent
+        self.path = path
+        self.scheduler = FairScheduler(max_active)
+        self.sessions = 0
+        self._ids = itertools.count(1)
+        self._server = None
+        self._idle = None
+
+    async def start(self):
+        if socket_alive(self.path):
+            raise RuntimeError(f"A daemon is already listening on {self.path}")
+        with suppress(FileNotFoundError):
+            # Left behind by a daemon that didn't shut down cleanly
+            os.unlink(self.path)
+        # Bound under a private umask: a chmod after bind leaves a window where any local user can connect
+        umask = os.umask(0o077)
+        try:
+            self._server = await asyncio.start_unix_server(self._session, self.path, limit=LINE_LIMIT)
+        finally:
+            os.umask(umask)
+        sys_log.log("DAEMON", f"Listening on {self.path}")
+        await self.agent.warm_up()
+        self._idle = asyncio.create_task(self.agent.idle_compaction())
+        return self
+
+    async def serve_forever(self):
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.stop()
+
+    async def stop(self):
+        if self._server is None:
+            return
+        self._server.close()
+        self._server = None
+        self._idle.cancel()
+        with suppress(FileNotFoundError):
+            os.unlink(self.path)
+        await self.agent.aclose()
+        sys_log.log("DAEMON", "Stopped")
+
+    async def _session(self, reader, writer):
+        session = next(self._ids)
+        self.sessions += 1
+        lock = asyncio.Lock()
+        tasks = {}
+        sys_log.log("DAEMON", f"Session {session} attached ({self.sessions} active)")
+
+        async def send(message):
+            async with lock:
+                writer.write(encode(message))
+                await writer.drain()
+
+        try:
+            while line := await reader.readline():
+                try:
+                    request = json.loads(line)
+                    request_id, op = request["id"], request["op"]
+                except (ValueError, KeyError, TypeError) as e:
+                    await send({"id": None, "error": f"bad request: {e}"})
+                    continue
+                if op == "cancel":
+                    if request_id in tasks:
+                        tasks[request_id].cancel()
+                    continue
+                task = asyncio.create_task(self._handle(session, request_id, op, request.get("params") or {}, send,
+                                                        request.get("project")))
+                tasks[request_id] = task
+                task.add_done_callback(lambda _, rid=request_id: tasks.pop(rid, None))
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            # A client that goes away takes its in-flight requests with it
+            for task in list(tasks.values()):
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            self.sessions -= 1
+            writer.close()
+            sys_log.log("DAEMON", f"Session {session} detached ({self.sessions} active)")
+
+    async def _handle(self, session, request_id, op, params, send, project=None):
+        if project:
+            # Each handler is its own task, so this only scopes this request
+            current_project.set(project)
+        try:
+            if op == "stream":
+                async with self.scheduler.slot(session):
+                    async for chunk in self.agent.stream(params["prompt"]):
+                        await send({"id": request_id, "chunk": chunk})
+                result = None
+            elif op == "fix":
+                async with self.scheduler.slot(session):
+                    async for update in self.agent.autonomous_fix(
+                            params["path"], params.get("max_attempts", 3), params.get("candidates", 1)):
+                        await send({"id": request_id, "chunk": update})
+                result = None
+            elif op == "ping":
+                result = {"sessions": self.sessions, "active": self.scheduler.active,
+                          "waiting": self.scheduler.waiting(), "provider": self.agent.provider_name,
+                          "ingest": self.agent.ingest.metrics()}
+            elif op == "project":
+                # Switching is per client: resolve here, the client keeps the id
+                result = await run_op(self.agent, op, dict(params, apply=False))
+            elif op in self.SCHEDULED:
+                async with self.scheduler.slot(session):
+                    result = await run_op(self.agent, op, params)
+            else:
+                result = await run_op(self.agent, op, params)
+            await send({"id": request_id, "done": True, "result": result})
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            sys_log.log("DAEMON", f"Session {session} {op} failed: {e}", "ERROR")
+            with suppress(Exception):
+                await send({"id": request_id, "error": str(e)})
+
+
+async def serve(path=DEFAULT_SOCKET, max_active=4, **agent_kwargs):
+    from core.agent import NeuroAgent
+    server = AgentServer(NeuroAgent(lazy=True, **agent_kwargs), path, max_active)
+    await server.start()
+    # SIGTERM (e.g. from a service manager) shuts down like Ctrl+C: socket removed, memory flushed
+    task = asyncio.current_task()
+    asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, task.cancel)
+    with suppress(asyncio.CancelledError):
+        await server.serve_forever()
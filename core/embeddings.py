@@ -0,0 +1,192 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from core.providers.ollama import OllamaProvider
+from core.storage import SQLiteStore
+from core.tracing import tracer
+
+
+class OllamaEmbeddings(Embeddings):
+    """Ollama embeddings over OllamaProvider's keep-alive pool. Same endpoint and
+    document/query instructions as langchain_community's OllamaEmbeddings (which
+    opened a new connection per text), so stored vectors stay comparable."""
+
+    def __init__(self, model="nomic-embed-text", embed_instruction="passage: ", query_instruction="query: "):
+        self.model = model
+        self.embed_instruction = embed_instruction
+        self.query_instruction = query_instruction
+        self.provider = OllamaProvider(model)
+
+    def embed_documents(self, texts):
+        return self.provider.embed([f"{self.embed_instruction}{t}" for t in texts], self.model)
+
+    def embed_query(self, text):
+        return self.provider.embed([f"{self.query_instruction}{text}"], self.model)[0]
+
+
+class CachedEmbeddings(Embeddings):
+    """Content-addressed embedding cache: in-memory LRU in front of a float32 SQLite table.
+
+    Keys are sha256(model, kind, text) where kind separates query and document
+    embeddings (Ollama models prefix them with different instructions).
+    Thread-safe; concurrent misses on the same key share one backend call.
+    """
+
+    def __init__(self, inner, model_name, db_path="neuroterm_embeddings.db",
+                 memory_entries=4096, max_disk_entries=200_000):
+        self.inner = inner
+        self.model_name = model_name
+        self.memory_entries = memory_entries
+        self.max_disk_entries = max_disk_entries
+        self._lru = OrderedDict()
+        # Guards the LRU, the in-flight table and the counters (retrieval, router, ingest and
+        # response cache all embed from their own threads)
+        self._lock = threading.Lock()
+        self._inflight = {}  # key -> Future of the call computing it
+        self.store = SQLiteStore.open(db_path)
+        self.store.executescript('''
+            CREATE TABLE IF NOT EXISTS embedding_cache
+                (key TEXT PRIMARY KEY, model TEXT, dim INTEGER, vector BLOB, last_used REAL);
+            CREATE INDEX IF NOT EXISTS idx_embedding_cache_last_used ON embedding_cache(last_used);
+        ''')
+        self._disk_count = self.store.query("SELECT COUNT(*) FROM embedding_cache")[0][0]
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.miss_seconds = 0.0
+
+    def _key(self, kind, text):
+        return hashlib.sha256(f"{self.model_name}\0{kind}\0{text}".encode("utf-8")).hexdigest()
+
+    def _remember(self, key, vector):
+        # Caller holds self._lock
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.memory_entries:
+            self._lru.popitem(last=False)
+
+    def _lookup(self, keys):
+        found = {}
+        with self._lock:
+            for key in keys:
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    found[key] = vector
+            self.memory_hits += len(found)
+
+        missing = [k for k in keys if k not in found]
+        now = time.time()
+        for i in range(0, len(missing), 500):
+            chunk = missing[i:i + 500]
+            rows = self.store.query(
+                f"SELECT key, vector FROM embedding_cache WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+            with self._lock:
+                for key, blob in rows:
+                    vector = np.frombuffer(blob, dtype=np.float32).tolist()
+                    found[key] = vector
+                    self._remember(key, vector)
+                self.disk_hits += len(rows)
+            if rows:
+                self.store.executemany("UPDATE embedding_cache SET last_used = ? WHERE key = ?",
+                                       [(now, key) for key, _ in rows])
+        return found
+
+    def _store(self, pairs):
+        now = time.time()
+        with self.store.transaction() as conn:
+            # Only rows actually added count towards the limit (a key may already be on disk)
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO embedding_cache (key, model, dim, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                [(key, self.model_name, len(v), np.asarray(v, dtype=np.float32).tobytes(), now) for key, v in pairs])
+            added = conn.total_changes - before
+        with self._lock:
+            for key, vector in pairs:
+                self._remember(key, vector)
+            self._disk_count += added
+            full = self._disk_count > self.max_disk_entries
+        if full:
+            self.evict(int(self.max_disk_entries * 0.9))
+
+    def evict(self, keep):
+        """Drop least recently used rows until at most `keep` remain."""
+        self.store.execute(
+            "DELETE FROM embedding_cache WHERE key NOT IN "
+            "(SELECT key FROM embedding_cache ORDER BY last_used DESC LIMIT ?)", (keep,))
+        self._disk_count = self.store.query("SELECT COUNT(*) FROM embedding_cache")[0][0]
+
+    def _embed(self, kind, texts, compute):
+        with tracer.span("embed", self.model_name, texts=len(texts)) as span:
+            vectors = self._embed_cached(kind, texts, compute, span)
+        return vectors
+
+    def _embed_cached(self, kind, texts, compute, span):
+        keys = [self._key(kind, t) for t in texts]
+        found = self._lookup(list(dict.fromkeys(keys)))
+
+        # Embed each distinct missing text once, in a single batch; keys another thread is
+        # already computing are waited for instead
+        todo, waits = {}, {}
+        with self._lock:
+            for key, text in zip(keys, texts):
+                if key in found or key in todo or key in waits:
+                    continue
+                if key in self._lru:
+                    # Stored by a call that finished after our lookup
+                    found[key] = self._lru[key]
+                elif key in self._inflight:
+                    waits[key] = self._inflight[key]
+                else:
+                    todo[key] = text
+                    self._inflight[key] = Future()
+        if todo:
+            try:
+                start = time.perf_counter()
+                vectors = compute(list(todo.values()))
+                elapsed = time.perf_counter() - start
+                pairs = list(zip(todo.keys(), vectors))
+                self._store(pairs)
+            except BaseException as e:
+                for key in todo:
+                    self._inflight[key].set_exception(e)
+                raise
+            finally:
+                with self._lock:
+                    futures = [self._inflight.pop(key) for key in todo]
+            for future, (_, vector) in zip(futures, pairs):
+                future.set_result(vector)
+            with self._lock:
+                self.miss_seconds += elapsed
+                self.misses += len(todo)
+            span["misses"] = len(todo)
+            found.update(pairs)
+        for key, future in waits.items():
+            found[key] = future.result()
+        return [found[k] for k in keys]
+
+    def embed_documents(self, texts):
+        return self._embed("doc", texts, self.inner.embed_documents)
+
+    def embed_query(self, text):
+        return self._embed("query", [text], lambda t: [self.inner.embed_query(t[0])])[0]
+
+    def stats(self):
+        hits = self.memory_hits + self.disk_hits
+        lookups = hits + self.misses
+        avg_miss = self.miss_seconds / self.misses if self.misses else 0.0
+        return {
+            "lookups": lookups,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_ratio": hits / lookups if lookups else 0.0,
+            "avg_miss_ms": avg_miss * 1000,
+            "est_saved_s": hits * avg_miss,
+            "disk_entries": self._disk_count,
+        }
@@ -1,13 +1,89 @@
+import asyncio
 import os
+import signal
 import subprocess
 import sys
+from collections import deque
 from pathlib import Path
+from core.walker import DirWalker
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+class OutputCapture:
+    """Keeps the first and last `limit // 2` bytes of a stream and counts the rest."""
+
+    def __init__(self, limit, max_line=65536):
+        self.half = limit // 2
+        # Longer lines (or newline-free output) are passed to on_output in pieces of this size
+        self.max_line = max_line
+        self.head = bytearray()
+        self.tail = deque()
+        self.tail_size = 0
+        self.dropped = 0
+        self._partial = bytearray()
+
+    def feed(self, data):
+        room = self.half - len(self.head)
+        if room > 0:
+            self.head += data[:room]
+            data = data[room:]
+        if data:
+            self.tail.append(data)
+            self.tail_size += len(data)
+            while self.tail_size - len(self.tail[0]) >= self.half:
+                self.dropped += len(self.tail[0])
+                self.tail_size -= len(self.tail.popleft())
+
+    def lines(self, data):
+        """Split a chunk into complete lines, carrying the partial last line over (at most max_line bytes)."""
+        parts = data.split(b"\n")
+        self._partial += parts[0]
+        out = []
+        if len(parts) > 1:
+            out.append(bytes(self._partial))
+            out += parts[1:-1]
+            self._partial = bytearray(parts[-1])
+        while len(self._partial) >= self.max_line:
+            out.append(bytes(self._partial[:self.max_line]))
+            del self._partial[:self.max_line]
+        return [p.decode("utf-8", "replace") for p in out]
+
+    def text(self):
+        tail = b"".join(self.tail)
+        if self.dropped:
+            middle = f"\n... [{self.dropped} bytes of output truncated] ...\n".encode()
+            return (bytes(self.head) + middle + tail).decode("utf-8", "replace")
+        return (bytes(self.head) + tail).decode("utf-8", "replace")
+
+
+def _limit_child(cpu_seconds, memory_mb, file_mb):
+    def apply():
+        if cpu_seconds:
+            resource.setrlimit(resource.RLIMIT_CPU, (cpu_seconds, cpu_seconds + 1))
+        if memory_mb:
+            resource.setrlimit(resource.RLIMIT_AS, (memory_mb * 2**20,) * 2)
+        if file_mb:
+            resource.setrlimit(resource.RLIMIT_FSIZE, (file_mb * 2**20,) * 2)
+    return apply if resource and (cpu_seconds or memory_mb or file_mb) else None
+
 
 class FileManager:
-    def __init__(self, root_dir="."):
+    def __init__(self, root_dir=".", timeout=15, cpu_seconds=None, memory_mb=None, file_mb=None,
+                 max_output=1_000_000):
         self.root = Path(root_dir)
         self.write_allowed = False
         self.active_file = None
+        # Defaults for aexecute_script; every one can be overridden per call
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.file_mb = file_mb
+        self.max_output = max_output
+        # Shared by tree/scan and the code indexer: unchanged directories are served from its snapshot
+        self.walker = DirWalker()
 
     def read_file(self, path):
         try:
@@ -52,31 +128,108 @@ class FileManager:
                 "exit_code": -1
             }
 
-    def scan_directory(self, path="."):
-        path = Path(path)
-        if not path.exists(): return []
-        return [{"path": str(p), "type": "dir" if p.is_dir() else "file"} for p in path.iterdir()]
-        
-    def tree(self, path=".", level=0):
-        # Simple tree implementation
-        path = Path(path)
-        tree_str = ""
-        if level == 0:
-            tree_str += f"{path.name}/\n"
-        
+    async def aexecute_script(self, file_path, cwd=None, env=None, on_output=None, timeout=None,
+                              cpu_seconds=None, memory_mb=None, file_mb=None, max_output=None):
+        """Async execute_script: streams lines to on_output(stream, line) as they are produced,
+        keeps memory bounded on huge output, and kills the whole process group on timeout or
+        cancellation. Returns the same dict as execute_script."""
+        timeout = timeout or self.timeout
+        max_output = max_output or self.max_output
+        posix = os.name == "posix"
         try:
-            for entry in sorted(path.iterdir()):
-                prefix = "  " * (level + 1)
-                if entry.is_dir():
-                    tree_str += f"{prefix}📁 {entry.name}/\n"
-                    if level < 2: # Limit depth
-                         tree_str += self.tree(entry, level + 1)
+            proc = await asyncio.create_subprocess_exec(
+                sys.executable, file_path,
+                stdout=asyncio.subprocess.PIPE,
+                stderr=asyncio.subprocess.PIPE,
+                cwd=cwd,
+                env=env,
+                start_new_session=posix,
+                preexec_fn=_limit_child(cpu_seconds or self.cpu_seconds, memory_mb or self.memory_mb,
+                                        file_mb or self.file_mb) if posix else None,
+            )
+        except Exception as e:
+            return {"success": False, "output": "", "error": f"❌ Execution failed: {str(e)}", "exit_code": -1}
+
+        captures = {"stdout": OutputCapture(max_output), "stderr": OutputCapture(max_output)}
+
+        async def pump(stream, name):
+            capture = captures[name]
+            while chunk := await stream.read(65536):
+                capture.feed(chunk)
+                if on_output:
+                    for line in capture.lines(chunk):
+                        on_output(name, line)
+
+        def kill():
+            if proc.returncode is not None:
+                return
+            try:
+                if posix:
+                    os.killpg(proc.pid, signal.SIGKILL)
                 else:
-                    tree_str += f"{prefix}📄 {entry.name}\n"
-        except PermissionError:
-            pass
-        return tree_str
-    
+                    proc.kill()
+            except ProcessLookupError:
+                pass
+
+        running = asyncio.gather(pump(proc.stdout, "stdout"), pump(proc.stderr, "stderr"), proc.wait())
+        try:
+            await asyncio.wait_for(running, timeout)
+        except asyncio.TimeoutError:
+            kill()
+            await proc.wait()
+            return {
+                "success": False,
+                "output": captures["stdout"].text(),
+                "error": f"❌ Execution timed out (killed after {timeout}s).\n{captures['stderr'].text()}",
+                "exit_code": -1
+            }
+        except BaseException:
+            # Cancelled (user abort, losing fix candidate): take the children down with us
+            kill()
+            running.cancel()
+            await asyncio.gather(running, proc.wait(), return_exceptions=True)
+            raise
+
+        return {
+            "success": proc.returncode == 0,
+            "output": captures["stdout"].text(),
+            "error": captures["stderr"].text(),
+            "exit_code": proc.returncode
+        }
+
+    def iter_files(self, path=None, extensions=None):
+        """Yield (path, os.stat_result) for files under path, skipping IGNORED_DIRS and .gitignored paths."""
+        for entry in self.walker.walk(path or self.root, extensions=extensions, files_only=True):
+            try:
+                # Fresh stat: the walker's snapshot only knows names and types
+                yield entry.path, os.stat(entry.path)
+            except OSError:
+                continue
+
+    def scan(self, path=".", max_depth=1, max_entries=None, gitignore=True):
+        """Yield {"path", "type", "depth"} as the walk finds them, in tree order."""
+        for entry in self.walker.walk(path, max_depth, max_entries, gitignore=gitignore):
+            yield {"path": entry.path, "type": "dir" if entry.kind == "d" else "file", "depth": entry.depth}
+
+    def scan_directory(self, path=".", max_depth=1, max_entries=None):
+        if not Path(path).exists(): return []
+        return list(self.scan(path, max_depth, max_entries))
+
+    def iter_tree(self, path=".", max_depth=3, max_entries=2000):
+        """Yield the lines of tree() one at a time, so large trees can be rendered progressively."""
+        yield f"{Path(path).resolve().name}/\n"
+        # One extra entry tells us whether the limit cut anything off
+        limit = max_entries + 1 if max_entries else None
+        for n, entry in enumerate(self.walker.walk(path, max_depth, limit)):
+            if n == max_entries:
+                yield f"  … more entries not shown (limit {max_entries})\n"
+                return
+            prefix = "  " * entry.depth
+            yield f"{prefix}📁 {entry.name}/\n" if entry.kind == "d" else f"{prefix}📄 {entry.name}\n"
+
+    def tree(self, path=".", max_depth=3, max_entries=2000):
+        return "".join(self.iter_tree(path, max_depth, max_entries))
+
     def create_project(self, name):
         p = Path(name)
         p.mkdir(exist_ok=True)
@@ -1,36 +1,125 @@
+import asyncio
+import time
+from collections import Counter, deque
+from contextlib import nullcontext
 from core.providers.ollama import OllamaProvider
+from core.router import RouteCache, EmbeddingVoter, classify_lexical, normalize_prompt
 from core.logger import sys_log
+from core.streams import is_error
+from core.tracing import tracer
 
 class NeuroGraph:
-    def __init__(self):
+    def __init__(self, db_path="neuroterm.db", lexical_threshold=0.66, knn_threshold=0.75):
         # Local Router Model
-        self.local_llm = OllamaProvider(model="llama3.2") 
-        self.api_llm = None 
+        self.local_llm = OllamaProvider(model="llama3.2")
+        self.api_llm = None
+
+        # Fast-path tiers, tried in order before the LLM router
+        self.cache = RouteCache(db_path)
+        self.voter = EmbeddingVoter()
+        self.voter.load(self.cache.examples)
+        self.embed_fn = None
+        # Optional core.limits.ProviderLimiter; the router's LLM call counts against "ollama"
+        self.limiter = None
+        self.lexical_threshold = lexical_threshold
+        self.knn_threshold = knn_threshold
+
+        self.route_stats = Counter()
+        self.route_latencies = deque(maxlen=1000)
+        self.last_route = None
 
     def set_api_provider(self, provider):
         self.api_llm = provider
 
-    async def route_request(self, prompt):
-        sys_log.log("GRAPH", f"Routing request: '{prompt[:30]}...'")
-        
+    def set_embedder(self, embed_fn):
+        self.embed_fn = embed_fn
+
+    def set_limiter(self, limiter):
+        self.limiter = limiter
+
+    async def _embed(self, prompt):
+        if self.embed_fn is None:
+            return None
+        try:
+            return await asyncio.to_thread(self.embed_fn, prompt)
+        except Exception as e:
+            sys_log.log("GRAPH", f"Router embedding failed: {e}", "ERROR")
+            return None
+
+    async def _llm_route(self, prompt):
         routing_prompt = (
             f"Analyze this coding request: '{prompt}'\n"
             "If it is a simple code explanation, generic question, or local file retrieval, reply 'simple'.\n"
             "If it requires complex reasoning, refactoring, or external API knowledge, reply 'complex'.\n"
             "Reply ONLY with the word 'simple' or 'complex'."
         )
-        
+
         try:
             response = ""
-            async for token in self.local_llm.stream(routing_prompt):
-                response += token
-            
+            async with self.limiter.slot("ollama") if self.limiter is not None else nullcontext():
+                async for token in self.local_llm.stream(routing_prompt):
+                    response += token
+
+            if is_error(response):
+                # Ollama reports failures in-band; not a decision worth caching or voting on
+                sys_log.log("GRAPH", f"Routing Error: {response.strip()[:200]}. Defaulting to complex.", "ERROR")
+                return None
+
             decision = response.strip().lower()
-            sys_log.log("GRAPH", f"Decision: {decision.upper()}", "DEBUG")
-            
+            sys_log.log("GRAPH", f"LLM Decision: {decision.upper()}", "DEBUG")
+
             if "simple" in decision:
                 return "simple"
             return "complex"
         except Exception as e:
             sys_log.log("GRAPH", f"Routing Error: {e}. Defaulting to complex.", "ERROR")
-            return "complex"
+            return None
+
+    async def route_request(self, prompt):
+        sys_log.log("GRAPH", f"Routing request: '{prompt[:30]}...'")
+        start = time.perf_counter()
+        key = normalize_prompt(prompt)
+
+        # Tier 0: exact cache hit on the normalized prompt
+        tier, decision = "cache", self.cache.get(key)
+
+        if decision is None:
+            # Tier 1: lexical heuristics
+            tier = "lexical"
+            decision, confidence = classify_lexical(prompt)
+
+            if confidence < self.lexical_threshold:
+                # Tier 2: nearest-neighbour vote over previously routed prompts
+                vector = await self._embed(prompt)
+                if vector is not None:
+                    voted, confidence = self.voter.vote(vector)
+                    if voted and confidence >= self.knn_threshold:
+                        tier, decision = "knn", voted
+
+                # Tier 3: LLM router, only when nothing cheaper is confident
+                if tier == "lexical":
+                    tier, decision = "llm", await self._llm_route(prompt)
+                    if decision is None:
+                        tier, decision = "fallback", "complex"
+                    elif vector is not None:
+                        self.voter.add(vector, decision)
+
+                if tier in ("knn", "llm"):
+                    self.cache.put(key, decision, tier, vector if tier == "llm" else None)
+
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        self.route_stats[tier] += 1
+        self.route_latencies.append(elapsed_ms)
+        self.last_route = {"decision": decision, "tier": tier, "ms": elapsed_ms}
+        tracer.record("route", elapsed_ms, tier=tier, decision=decision)
+        sys_log.log("GRAPH", f"Decision: {decision.upper()} via {tier} in {elapsed_ms:.1f}ms", "DEBUG")
+        return decision
+
+    def routing_summary(self, fast_ms=10.0):
+        total = len(self.route_latencies)
+        fast = sum(1 for ms in self.route_latencies if ms < fast_ms)
+        return {
+            "requests": total,
+            "tiers": dict(self.route_stats),
+            "fast_share": fast / total if total else 0.0,
+        }
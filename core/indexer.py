@@ -0,0 +1,197 @@
+import ast
+import hashlib
+import json
+import os
+import time
+from core.logger import sys_log
+from core.projects import GLOBAL
+
+SOURCE_EXTENSIONS = {
+    ".py", ".pyi", ".js", ".jsx", ".ts", ".tsx", ".go", ".rs", ".java", ".kt", ".c", ".h",
+    ".cpp", ".hpp", ".cs", ".rb", ".php", ".swift", ".sh", ".sql", ".md", ".toml", ".yaml",
+    ".yml", ".json", ".cfg", ".ini",
+}
+
+
+def chunk_lines(text, window=60, overlap=10):
+    """Fixed line windows, used for non-Python files and unparsable Python."""
+    lines = text.splitlines()
+    chunks = []
+    step = window - overlap
+    for start in range(0, max(len(lines), 1), step):
+        body = "\n".join(lines[start:start + window])
+        if body.strip():
+            chunks.append({"text": body, "start": start + 1, "end": min(start + window, len(lines)),
+                           "symbol": "", "kind": "lines"})
+        if start + window >= len(lines):
+            break
+    return chunks
+
+
+def chunk_python(text, max_chars=4000):
+    """One chunk per top-level function/class (methods split out of oversized classes),
+    plus one for the module-level code in between."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return chunk_lines(text)
+
+    lines = text.splitlines()
+    chunks, covered = [], set()
+
+    def add(node, symbol, kind):
+        start = min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+        end = node.end_lineno
+        covered.update(range(start, end + 1))
+        chunks.append({"text": "\n".join(lines[start - 1:end]), "start": start, "end": end,
+                       "symbol": symbol, "kind": kind})
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            add(node, node.name, "function")
+        elif isinstance(node, ast.ClassDef):
+            source = ast.get_source_segment(text, node) or ""
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            if len(source) <= max_chars or not methods:
+                add(node, node.name, "class")
+                continue
+            for method in methods:
+                add(method, f"{node.name}.{method.name}", "method")
+            # Class header + attributes, without the method bodies
+            rest = [i for i in range(node.lineno, node.end_lineno + 1) if i not in covered]
+            covered.update(rest)
+            chunks.append({"text": "\n".join(lines[i - 1] for i in rest), "start": node.lineno,
+                           "end": node.end_lineno, "symbol": node.name, "kind": "class"})
+
+    module_lines = [lines[i - 1] for i in range(1, len(lines) + 1) if i not in covered]
+    if "\n".join(module_lines).strip():
+        chunks.append({"text": "\n".join(module_lines), "start": 1, "end": len(lines),
+                       "symbol": "<module>", "kind": "module"})
+    return chunks
+
+
+class CodeIndexer:
+    """Incremental RAG index of the working tree, kept in its own Chroma collection.
+
+    A manifest (path, mtime, size, content hash, chunk ids) makes re-indexing an
+    unchanged tree a stat() per file; only files whose content hash changed are
+    re-chunked and re-embedded, and chunks of deleted files are removed.
+    """
+
+    def __init__(self, memory, files, batch_size=64):
+        self.memory = memory
+        self.files = files
+        self.batch_size = batch_size
+        columns = {row[1] for row in self.memory.store.query("PRAGMA table_info(code_manifest)")}
+        if columns and "project" not in columns:
+            # Manifest from before project namespaces: its chunks live in the global namespace
+            self.memory.store.execute("ALTER TABLE code_manifest RENAME TO code_manifest_old")
+        self.memory.store.execute('''CREATE TABLE IF NOT EXISTS code_manifest
+                                     (project TEXT, path TEXT, mtime REAL, size INTEGER, hash TEXT,
+                                      chunk_ids TEXT, indexed_at REAL, PRIMARY KEY (project, path))''')
+        if columns and "project" not in columns:
+            with self.memory.store.transaction() as conn:
+                conn.execute("INSERT INTO code_manifest SELECT ?, path, mtime, size, hash, chunk_ids, indexed_at "
+                             "FROM code_manifest_old", (GLOBAL,))
+                conn.execute("DROP TABLE code_manifest_old")
+
+    def _manifest(self, project):
+        rows = self.memory.store.query("SELECT path, mtime, size, hash, chunk_ids FROM code_manifest "
+                                       "WHERE project = ?", (project,))
+        return {path: (mtime, size, digest, json.loads(ids)) for path, mtime, size, digest, ids in rows}
+
+    @staticmethod
+    def _chunk(path, text):
+        if path.endswith((".py", ".pyi")):
+            return chunk_python(text)
+        return chunk_lines(text)
+
+    def index(self, root=".", max_file_bytes=512_000):
+        start = time.perf_counter()
+        self.memory.initialize()
+        # The active project's namespace, fixed for the whole run
+        project = self.memory.project
+        collection = self.memory.stores(project)[1]
+        manifest = self._manifest(project)
+        seen = set()
+        stats = {"files": 0, "unchanged": 0, "reindexed": 0, "chunks": 0, "removed": 0}
+
+        pending_texts, pending_meta, pending_ids = [], [], []
+        stale_ids, manifest_rows = [], []
+
+        def flush():
+            with self.memory.write_lock:
+                write()
+
+        def write():
+            if stale_ids:
+                collection.delete(ids=list(stale_ids))
+                self.memory.store.executemany("DELETE FROM code_chunks WHERE chunk_id = ?", [(i,) for i in stale_ids])
+                stale_ids.clear()
+            if pending_texts:
+                collection.add_texts(pending_texts, metadatas=pending_meta, ids=pending_ids)
+                self.memory.store.executemany(
+                    "INSERT OR IGNORE INTO code_chunks (chunk_id, path, body, project) VALUES (?, ?, ?, ?)",
+                    [(i, m["path"], t, project) for i, m, t in zip(pending_ids, pending_meta, pending_texts)])
+                pending_texts.clear(), pending_meta.clear(), pending_ids.clear()
+            if manifest_rows:
+                self.memory.store.executemany(
+                    "INSERT OR REPLACE INTO code_manifest (project, path, mtime, size, hash, chunk_ids, indexed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", [(project, *row) for row in manifest_rows])
+                manifest_rows.clear()
+
+        for path, st in self.files.iter_files(root, SOURCE_EXTENSIONS):
+            path = os.path.relpath(path)
+            seen.add(path)
+            stats["files"] += 1
+            if st.st_size > max_file_bytes:
+                continue
+            old = manifest.get(path)
+            if old and old[0] == st.st_mtime and old[1] == st.st_size:
+                stats["unchanged"] += 1
+                continue
+
+            try:
+                with open(path, "rb") as f:
+                    raw = f.read()
+                text = raw.decode("utf-8")
+            except (OSError, UnicodeDecodeError):
+                continue
+            digest = hashlib.sha256(raw).hexdigest()
+            if old and old[2] == digest:
+                # Touched but identical: refresh stat info only
+                manifest_rows.append((path, st.st_mtime, st.st_size, digest, json.dumps(old[3]), time.time()))
+                stats["unchanged"] += 1
+                continue
+
+            if old:
+                stale_ids.extend(old[3])
+            ids = []
+            id_prefix = hashlib.sha1(f"{project}\0{path}\0{digest}".encode("utf-8")).hexdigest()[:16]
+            for i, chunk in enumerate(self._chunk(path, text)):
+                chunk_id = f"{id_prefix}:{i}"
+                ids.append(chunk_id)
+                pending_ids.append(chunk_id)
+                pending_texts.append(f"# {path}:{chunk['start']}-{chunk['end']}\n{chunk['text']}")
+                pending_meta.append({"path": path, "start_line": chunk["start"], "end_line": chunk["end"],
+                                     "symbol": chunk["symbol"], "kind": chunk["kind"], "project": project})
+            manifest_rows.append((path, st.st_mtime, st.st_size, digest, json.dumps(ids), time.time()))
+            stats["reindexed"] += 1
+            stats["chunks"] += len(ids)
+            if len(pending_texts) >= self.batch_size:
+                flush()
+
+        # Files that disappeared since the last run
+        root_prefix = os.path.relpath(root)
+        for path, (_, _, _, ids) in manifest.items():
+            in_root = root_prefix == "." or path == root_prefix or path.startswith(root_prefix + os.sep)
+            if in_root and path not in seen:
+                stale_ids.extend(ids)
+                self.memory.store.execute("DELETE FROM code_manifest WHERE project = ? AND path = ?", (project, path))
+                stats["removed"] += 1
+        flush()
+
+        stats["seconds"] = round(time.perf_counter() - start, 2)
+        stats["project"] = project
+        sys_log.log("INDEX", f"Indexed {root} into {project}: {stats}")
+        return stats
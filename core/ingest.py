@@ -0,0 +1,108 @@
+import asyncio
+import atexit
+import itertools
+import time
+from core.logger import sys_log
+from core.tracing import tracer
+
+class IngestQueue:
+    """Write-behind pipeline for MemoryManager: batches interactions off the request path."""
+
+    def __init__(self, memory, batch_size=16, idle_flush=0.5):
+        self.memory = memory
+        self.batch_size = batch_size
+        self.idle_flush = idle_flush
+        self._queue = None
+        self._worker = None
+        self._ids = itertools.count()
+        # Everything submitted but not yet persisted, so a clean exit can still save it
+        self._pending = {}
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.failed = 0
+        self.last_lag = 0.0
+        self.max_lag = 0.0
+        atexit.register(self.flush_sync)
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        if self._worker is None or self._worker.done() or self._worker.get_loop() is not loop:
+            self._queue = asyncio.Queue()
+            # Items left on a previous loop's queue are still in _pending
+            for item_id, item in self._pending.items():
+                self._queue.put_nowait((item_id, item))
+            self._worker = loop.create_task(self._run())
+
+    def submit(self, user_msg, ai_msg, context=""):
+        self._ensure_worker()
+        item_id = next(self._ids)
+        # Project captured now: the worker flushes later, outside this request's context
+        item = (user_msg, ai_msg, context, time.time(), self.memory.project)
+        self._pending[item_id] = item
+        self._queue.put_nowait((item_id, item))
+        self.enqueued += 1
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            # Keep collecting until the batch is full or the queue goes idle
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), self.idle_flush))
+                except asyncio.TimeoutError:
+                    break
+            await self._flush(batch)
+
+    async def _flush(self, batch):
+        items = [item for _, item in batch]
+        try:
+            with tracer.span("ingest", items=len(items)):
+                await asyncio.to_thread(self.memory.save_interactions, items)
+            for item_id, _ in batch:
+                self._pending.pop(item_id, None)
+            lag = time.time() - min(item[3] for item in items)
+            self.last_lag = lag
+            self.max_lag = max(self.max_lag, lag)
+            self.flushed += len(items)
+            sys_log.log("MEMORY", f"Ingested batch of {len(items)} (lag {lag:.2f}s, depth {self._queue.qsize()})", "DEBUG")
+        except Exception as e:
+            # Nothing was committed: rows stay in _pending and are retried by flush_sync (drain/exit)
+            self.failed += len(items)
+            sys_log.log("MEMORY", f"Ingest batch failed: {e}", "ERROR")
+        finally:
+            for _ in batch:
+                self._queue.task_done()
+
+    async def drain(self):
+        """Wait for everything queued to be persisted, then stop the worker."""
+        if self._worker is None:
+            return
+        if not self._worker.done():
+            await self._queue.join()
+            self._worker.cancel()
+            await asyncio.gather(self._worker, return_exceptions=True)
+        self._worker = None
+        self.flush_sync()
+
+    def flush_sync(self):
+        if not self._pending:
+            return
+        items = list(self._pending.values())
+        try:
+            self.memory.save_interactions(items)
+            self._pending.clear()
+        except Exception as e:
+            sys_log.log("MEMORY", f"Final ingest flush failed, {len(items)} interactions lost: {e}", "ERROR")
+
+    def metrics(self):
+        oldest = min((item[3] for item in self._pending.values()), default=None)
+        return {
+            "depth": len(self._pending),
+            "enqueued": self.enqueued,
+            "flushed": self.flushed,
+            "failed": self.failed,
+            "last_lag_s": self.last_lag,
+            "max_lag_s": self.max_lag,
+            "oldest_pending_s": time.time() - oldest if oldest else 0.0,
+        }
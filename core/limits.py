@@ -0,0 +1,87 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from core.tracing import tracer
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, in bursts of up to `capacity`."""
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        # Held while sleeping, so waiters are served in arrival order
+        self._lock = asyncio.Lock()
+
+    async def acquire(self, n=1):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= n:
+                    self.tokens -= n
+                    return
+                await asyncio.sleep((n - self.tokens) / self.rate)
+
+
+class ProviderLimiter:
+    """Per-provider cap on in-flight generations plus a requests/minute token bucket.
+
+    concurrency / per_minute: {provider: limit}; the "*" key (or a bare number)
+    applies to providers without their own entry. None means unlimited.
+
+    Keys are provider names, except that an Ollama main provider is "ollama:<model>"
+    so it does not share slots with the local router model ("ollama").
+
+    NeuroAgent takes a slot for every answer, auto-fix candidate and speculative
+    start, and NeuroGraph for its LLM routing call. Embeddings are not limited:
+    they are blocking calls on worker threads, mostly served from CachedEmbeddings.
+    """
+
+    def __init__(self, concurrency=None, per_minute=None):
+        self.concurrency = self._by_provider(concurrency)
+        self.per_minute = self._by_provider(per_minute)
+        self._semaphores = {}
+        self._buckets = {}
+
+    @staticmethod
+    def _by_provider(limits):
+        if limits is None or isinstance(limits, dict):
+            return dict(limits or {})
+        return {"*": limits}
+
+    def _limit(self, limits, provider):
+        return limits.get(provider, limits.get("*"))
+
+    def _semaphore(self, provider):
+        if provider not in self._semaphores:
+            limit = self._limit(self.concurrency, provider)
+            self._semaphores[provider] = asyncio.Semaphore(int(limit)) if limit else None
+        return self._semaphores[provider]
+
+    def _bucket(self, provider):
+        if provider not in self._buckets:
+            limit = self._limit(self.per_minute, provider)
+            # Burst of a few seconds' worth, so a cold start doesn't fire a whole minute at once
+            self._buckets[provider] = TokenBucket(limit / 60, max(limit / 20, 1.0)) if limit else None
+        return self._buckets[provider]
+
+    @asynccontextmanager
+    async def slot(self, provider):
+        semaphore, bucket = self._semaphore(provider), self._bucket(provider)
+        t0 = time.perf_counter()
+        if semaphore is not None:
+            await semaphore.acquire()
+        try:
+            if bucket is not None:
+                await bucket.acquire()
+            waited = (time.perf_counter() - t0) * 1000
+            if waited >= 1:
+                tracer.record("limit.wait", waited, provider)
+            yield
+        finally:
+            if semaphore is not None:
+                semaphore.release()
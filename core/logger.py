@@ -1,7 +1,65 @@
+import atexit
+import json
 import logging
-import time
+import logging.handlers
+import os
+import queue
+from collections import deque
 from pathlib import Path
 
+TEXT_FORMAT = '%(asctime)s - [%(levelname)s] - %(message)s'
+LEVELS = {"INFO": logging.INFO, "DEBUG": logging.DEBUG, "ERROR": logging.ERROR}
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """One JSON object per line: ts, level, component, message."""
+
+    def format(self, record):
+        component = getattr(record, "component", "")
+        message = record.getMessage()
+        # SystemLogger.log prefixes "[COMPONENT] " for the text format; it is a field here
+        if component and message.startswith(f"[{component}] "):
+            message = message[len(component) + 3:]
+        return json.dumps({
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "component": component,
+            "message": message,
+        }, ensure_ascii=False)
+
+
+class RingBufferHandler(logging.Handler):
+    """Keeps the last `capacity` formatted lines in memory for /log."""
+
+    def __init__(self, capacity):
+        super().__init__()
+        self.lines = deque(maxlen=capacity)
+
+    def emit(self, record):
+        self.lines.append(self.format(record))
+
+
+class _PassThroughQueueHandler(logging.handlers.QueueHandler):
+    # Our records carry a plain pre-built string, so skip QueueHandler's format + copy on the caller
+    def prepare(self, record):
+        return record
+
+
+def tail_lines(path, n, block_size=8192):
+    """Last n lines of a file, reading backwards from the end in blocks (cost ~ n, not file size)."""
+    with open(path, "rb") as f:
+        f.seek(0, os.SEEK_END)
+        pos = f.tell()
+        data = b""
+        while pos > 0 and data.count(b"\n") <= n:
+            step = min(block_size, pos)
+            pos -= step
+            f.seek(pos)
+            data = f.read(step) + data
+    lines = data.decode("utf-8", "replace").splitlines()
+    return [line.strip() for line in lines[-n:]]
+
+
 class SystemLogger:
     _instance = None
 
@@ -12,35 +70,69 @@ class SystemLogger:
         return cls._instance
 
     def _setup(self):
-        self.log_file = Path("system.log")
-        
-        # Setup standard python logging
         self.logger = logging.getLogger("NeuroTerm")
         self.logger.setLevel(logging.DEBUG)
-        
-        # File Handler (Persistent logs)
-        fh = logging.FileHandler(self.log_file, mode='a', encoding='utf-8')
-        fh.setFormatter(logging.Formatter('%(asctime)s - [%(levelname)s] - %(message)s'))
-        self.logger.addHandler(fh)
+        self.logger.propagate = False
+        self.listener = None
+        self.configure(
+            log_file=os.getenv("NEUROTERM_LOG_FILE", "system.log"),
+            max_bytes=int(os.getenv("NEUROTERM_LOG_MAX_BYTES", str(5 * 2**20))),
+            backup_count=int(os.getenv("NEUROTERM_LOG_BACKUPS", "3")),
+            fmt=os.getenv("NEUROTERM_LOG_FORMAT", "text"),
+            ring_size=int(os.getenv("NEUROTERM_LOG_RING", "1000")),
+        )
+        atexit.register(self.stop)
+
+    def configure(self, log_file="system.log", max_bytes=5 * 2**20, backup_count=3, fmt="text", ring_size=1000):
+        """(Re)build the pipeline. Callers only pay for a queue put; formatting, rotation and
+        disk writes happen on the QueueListener thread. fmt is "text" or "jsonl"."""
+        self.stop()
+        self.log_file = Path(log_file)
+        self.fmt = fmt
+
+        # Rotating file (persistent logs), written from the listener thread
+        fh = logging.handlers.RotatingFileHandler(
+            self.log_file, mode='a', maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8', delay=True)
+        fh.setFormatter(JsonLinesFormatter() if fmt == "jsonl" else logging.Formatter(TEXT_FORMAT))
+
+        # /log reads from here; always human-readable whatever the file format
+        self.ring = RingBufferHandler(ring_size)
+        self.ring.setFormatter(logging.Formatter(TEXT_FORMAT))
+
+        self.queue = queue.SimpleQueue()
+        for handler in list(self.logger.handlers):
+            self.logger.removeHandler(handler)
+        self.logger.addHandler(_PassThroughQueueHandler(self.queue))
+        self.listener = logging.handlers.QueueListener(self.queue, fh, self.ring, respect_handler_level=True)
+        self.listener.start()
+
+    def stop(self):
+        """Flush queued records to disk and stop the writer thread."""
+        if self.listener is not None:
+            self.listener.stop()
+            for handler in self.listener.handlers:
+                handler.close()
+            self.listener = None
 
     def log(self, component: str, message: str, level="INFO"):
-        formatted_msg = f"[{component.upper()}] {message}"
-        
-        if level == "INFO":
-            self.logger.info(formatted_msg)
-        elif level == "DEBUG":
-            self.logger.debug(formatted_msg)
-        elif level == "ERROR":
-            self.logger.error(formatted_msg)
-            
+        component = component.upper()
+        formatted_msg = f"[{component}] {message}"
+
+        levelno = LEVELS.get(level)
+        if levelno is not None and self.logger.isEnabledFor(levelno):
+            # makeRecord + handle skips Logger.findCaller's stack walk; the format never shows caller info
+            record = self.logger.makeRecord(self.logger.name, levelno, "", 0, formatted_msg, None, None)
+            record.component = component
+            self.logger.handle(record)
+
         return formatted_msg
 
     def get_recent_logs(self, n=20):
-        if not self.log_file.exists():
-            return ["No logs yet."]
-        
-        with open(self.log_file, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-            return [line.strip() for line in lines[-n:]]
+        lines = self.ring.lines
+        if len(lines) >= n or not self.log_file.exists():
+            # The ring covers the request (or holds everything there is)
+            return list(lines)[-n:] or ["No logs yet."]
+        # Fresh session: older lines only live on disk
+        return tail_lines(self.log_file, n)
 
 sys_log = SystemLogger()
@@ -1,75 +1,330 @@
-import sqlite3
+import asyncio
+import os
+import threading
 import time
-import shutil
-from pathlib import Path
-from langchain_chroma import Chroma
-from langchain_community.embeddings import OllamaEmbeddings
-from langchain_text_splitters import RecursiveCharacterTextSplitter
+from core.backups import BackupStore
 from core.logger import sys_log
+from core.projects import GLOBAL, collection_names, current_project, detect
+from core.retrieval import fts_query, rrf
+from core.storage import SQLiteStore, data_path
+from core.tracing import tracer
 
 class MemoryManager:
-    def __init__(self, db_path="neuroterm.db", chroma_path="neuroterm_chroma"):
+    def __init__(self, db_path="neuroterm.db", chroma_path="neuroterm_chroma", lazy=False,
+                 retrieval_mode="hybrid", vector_slow_s=1.5, vector_cooldown_s=60, backup_dir="neuroterm_backups",
+                 project=None, fan_out=False):
         self.db_path = db_path
-        
-        sys_log.log("MEMORY", "Initializing Vector DB (nomic-embed-text)...")
-        self.embedding_fn = OllamaEmbeddings(model="nomic-embed-text") 
-        self.vector_store = Chroma(
-            collection_name="chat_history",
-            embedding_function=self.embedding_fn,
-            persist_directory=chroma_path
-        )
-        
+        self.chroma_path = str(data_path(chroma_path))
+        # hybrid = FTS5 + vectors fused with RRF; lexical = FTS5 only; vector = embeddings only
+        self.retrieval_mode = retrieval_mode
+        self.vector_slow_s = vector_slow_s
+        self.vector_cooldown_s = vector_cooldown_s
+        self._vector_down_until = 0.0
+        self.store = SQLiteStore.open(db_path)
         self._init_sql()
+        self.backups = BackupStore(self.store, backup_dir)
+        # Namespace for requests that don't set current_project: the git work tree we run in
+        self.default_project = project or self.use_root(".")[0]
+        # Also search global memory (and pre-namespace history) alongside the active project
+        self.fan_out = fan_out
+
+        # Vector side (langchain, chromadb, embeddings) is heavy to import and open,
+        # so with lazy=True it is deferred until warm() or the first call that needs it
+        self.embedding_fn = None
+        self.splitter = None
+        self._stores = {}  # project -> (chat Chroma, code Chroma)
+        self._stores_lock = threading.Lock()
+        self.ready = threading.Event()
+        self._init_lock = threading.Lock()
+        # Background initialize() started by a cold retrieval; one at a time
+        self._warm_thread = None
+        self._warm_lock = threading.Lock()
+        # One writer at a time across ingest, indexing and compaction (daemon sessions share them)
+        self.write_lock = threading.RLock()
+        if not lazy:
+            self.initialize()
+
+    def initialize(self):
+        if self.ready.is_set():
+            return
+        with self._init_lock:
+            if self.ready.is_set():
+                return
+            from langchain_chroma import Chroma
+            from langchain_text_splitters import RecursiveCharacterTextSplitter
+            from core.embeddings import CachedEmbeddings, OllamaEmbeddings
+
+            sys_log.log("MEMORY", "Initializing Vector DB (nomic-embed-text)...")
+            ollama = OllamaEmbeddings("nomic-embed-text")
+            self.embedding_fn = CachedEmbeddings(ollama, "nomic-embed-text")
+            self._chroma = Chroma
+            self.stores(self.default_project)
+            self.splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
+            self.ready.set()
+
+    def stores(self, project):
+        """(chat, code) vector stores of one project namespace, opened on first use."""
+        if project not in self._stores:
+            with self._stores_lock:
+                if project not in self._stores:
+                    # Working-tree chunks from CodeIndexer are kept apart from chat turns
+                    self._stores[project] = tuple(
+                        self._chroma(collection_name=name, embedding_function=self.embedding_fn,
+                                     persist_directory=self.chroma_path)
+                        for name in collection_names(project))
+        return self._stores[project]
+
+    @property
+    def project(self):
+        return current_project.get() or self.default_project
+
+    @property
+    def vector_store(self):
+        return self.stores(self.project)[0] if self.ready.is_set() else None
+
+    @property
+    def code_store(self):
+        return self.stores(self.project)[1] if self.ready.is_set() else None
+
+    def use_root(self, path):
+        """Register the git work tree containing path; returns (project, root) or (GLOBAL, None)."""
+        project, root = detect(path)
+        if root:
+            self.store.execute(
+                "INSERT INTO projects (id, name, root, last_used) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET last_used = excluded.last_used",
+                (project, root.name, str(root), time.time()))
+        return project, root
+
+    def find_project(self, name):
+        """Project id for an id, a directory name or a path; None if unknown."""
+        if name == GLOBAL:
+            return GLOBAL
+        row = self.store.query("SELECT id FROM projects WHERE id = ? OR name = ? ORDER BY last_used DESC LIMIT 1",
+                               (name, name))
+        if row:
+            return row[0][0]
+        if os.path.isdir(os.path.expanduser(name)):
+            project, root = self.use_root(os.path.expanduser(name))
+            return project if root else None
+        return None
+
+    def project_root(self, project=None):
+        row = self.store.query("SELECT root FROM projects WHERE id = ?", (project or self.project,))
+        return row[0][0] if row else None
+
+    def projects(self):
+        """Known namespaces with their turn counts, most recently used first."""
+        counts = dict(self.store.query(
+            "SELECT COALESCE(project, ?), COUNT(*) FROM logs GROUP BY 1", (GLOBAL,)))
+        rows = self.store.query("SELECT id, name, root FROM projects ORDER BY last_used DESC")
+        return ([{"id": GLOBAL, "name": GLOBAL, "root": None, "turns": counts.get(GLOBAL, 0)}] +
+                [{"id": i, "name": name, "root": root, "turns": counts.get(i, 0)} for i, name, root in rows])
+
+    def scopes(self):
+        """Namespaces a retrieval searches: the active project, plus global when fanning out."""
+        project = self.project
+        return [project, GLOBAL] if self.fan_out and project != GLOBAL else [project]
+
+    async def warm(self):
+        start = time.perf_counter()
+        try:
+            await asyncio.to_thread(self.initialize)
+            sys_log.log("MEMORY", f"Vector DB ready in {time.perf_counter() - start:.2f}s")
+        except Exception as e:
+            # Requests retry initialize() themselves, so a failed warm-up is not fatal
+            sys_log.log("MEMORY", f"Vector DB warm-up failed: {e}", "ERROR")
+
+    def embed_query(self, text):
+        self.initialize()
+        return self.embedding_fn.embed_query(text)
 
     def _init_sql(self):
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute('''CREATE TABLE IF NOT EXISTS logs 
-                     (id INTEGER PRIMARY KEY, timestamp REAL, user_msg TEXT, ai_msg TEXT, context TEXT)''')
-        c.execute('''CREATE TABLE IF NOT EXISTS backups
-                     (id INTEGER PRIMARY KEY, timestamp REAL, original_path TEXT, backup_path TEXT)''')
-        conn.commit()
-        conn.close()
+        self.store.executescript('''
+            CREATE TABLE IF NOT EXISTS logs
+                (id INTEGER PRIMARY KEY, timestamp REAL, user_msg TEXT, ai_msg TEXT, context TEXT);
+            CREATE INDEX IF NOT EXISTS idx_logs_timestamp ON logs(timestamp);
+        ''')
+        # Retention bookkeeping for MemoryCompactor: how often a turn was retrieved, and turn vs digest
+        columns = {row[1] for row in self.store.query("PRAGMA table_info(logs)")}
+        for name, kind in (("access_count", "INTEGER DEFAULT 0"), ("last_access", "REAL"),
+                           ("kind", "TEXT DEFAULT 'turn'")):
+            if name not in columns:
+                self.store.execute(f"ALTER TABLE logs ADD COLUMN {name} {kind}")
+        # Project namespaces; rows from before them have project NULL and belong to GLOBAL
+        if "project" not in columns:
+            self.store.execute("ALTER TABLE logs ADD COLUMN project TEXT")
+        self.store.executescript('''
+            CREATE INDEX IF NOT EXISTS idx_logs_project ON logs(project);
+            CREATE TABLE IF NOT EXISTS projects (id TEXT PRIMARY KEY, name TEXT, root TEXT, last_used REAL);
+        ''')
+        # Lexical side: BM25 over chat logs (kept in sync by triggers) and indexed code chunks
+        has_fts = self.store.query("SELECT 1 FROM sqlite_master WHERE name = 'logs_fts'")
+        # Older DBs re-indexed a row on any UPDATE, including _note_access's bookkeeping on every read
+        trigger = self.store.query("SELECT sql FROM sqlite_master WHERE name = 'logs_fts_au'")
+        if trigger and "UPDATE OF" not in trigger[0][0]:
+            self.store.execute("DROP TRIGGER logs_fts_au")
+        self.store.executescript('''
+            CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(
+                user_msg, ai_msg, content='logs', content_rowid='id', tokenize="unicode61 tokenchars '_'");
+            CREATE TRIGGER IF NOT EXISTS logs_fts_ai AFTER INSERT ON logs BEGIN
+                INSERT INTO logs_fts(rowid, user_msg, ai_msg) VALUES (new.id, new.user_msg, new.ai_msg);
+            END;
+            CREATE TRIGGER IF NOT EXISTS logs_fts_ad AFTER DELETE ON logs BEGIN
+                INSERT INTO logs_fts(logs_fts, rowid, user_msg, ai_msg) VALUES ('delete', old.id, old.user_msg, old.ai_msg);
+            END;
+            CREATE TRIGGER IF NOT EXISTS logs_fts_au AFTER UPDATE OF user_msg, ai_msg ON logs BEGIN
+                INSERT INTO logs_fts(logs_fts, rowid, user_msg, ai_msg) VALUES ('delete', old.id, old.user_msg, old.ai_msg);
+                INSERT INTO logs_fts(rowid, user_msg, ai_msg) VALUES (new.id, new.user_msg, new.ai_msg);
+            END;
+            CREATE TABLE IF NOT EXISTS code_chunks
+                (id INTEGER PRIMARY KEY, chunk_id TEXT UNIQUE, path TEXT, body TEXT);
+            CREATE VIRTUAL TABLE IF NOT EXISTS code_fts USING fts5(
+                path, body, content='code_chunks', content_rowid='id', tokenize="unicode61 tokenchars '_'");
+            CREATE TRIGGER IF NOT EXISTS code_fts_ai AFTER INSERT ON code_chunks BEGIN
+                INSERT INTO code_fts(rowid, path, body) VALUES (new.id, new.path, new.body);
+            END;
+            CREATE TRIGGER IF NOT EXISTS code_fts_ad AFTER DELETE ON code_chunks BEGIN
+                INSERT INTO code_fts(code_fts, rowid, path, body) VALUES ('delete', old.id, old.path, old.body);
+            END;
+        ''')
+        if "project" not in {row[1] for row in self.store.query("PRAGMA table_info(code_chunks)")}:
+            self.store.execute("ALTER TABLE code_chunks ADD COLUMN project TEXT")
+        if not has_fts:
+            self.store.execute("INSERT INTO logs_fts(logs_fts) VALUES ('rebuild')")
 
     def save_interaction(self, user_msg, ai_msg, context=""):
-        # SQL
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("INSERT INTO logs (timestamp, user_msg, ai_msg, context) VALUES (?, ?, ?, ?)",
-                  (time.time(), user_msg, ai_msg, context))
-        conn.commit()
-        conn.close()
-
-        # Vector
-        splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-        text = f"User: {user_msg}\nAI: {ai_msg}"
-        docs = splitter.create_documents([text])
-        self.vector_store.add_documents(docs)
-        sys_log.log("MEMORY", "Interaction saved to Long-Term Memory.")
-
-    def retrieve_context(self, query, k=2):
+        self.save_interactions([(user_msg, ai_msg, context, time.time())])
+
+    def save_interactions(self, items):
+        """Persist a batch of (user_msg, ai_msg, context, timestamp[, project]) in one transaction
+        + one embed call per project. Items without a project go to the active one.
+
+        Raises only if the SQL transaction failed (nothing was saved, so the caller may
+        retry the batch); once the rows are committed, vector failures are just logged.
+        """
+        by_project = {}
+        for user_msg, ai_msg, context, ts, *project in items:
+            by_project.setdefault(project[0] if project else self.project, []).append((user_msg, ai_msg, context, ts))
+        with self.write_lock:
+            # SQL (one transaction; row ids link vector chunks back to their log entry)
+            with self.store.transaction() as conn:
+                log_ids = {project: [conn.execute(
+                    "INSERT INTO logs (timestamp, user_msg, ai_msg, context, project) VALUES (?, ?, ?, ?, ?)",
+                    (ts, user_msg, ai_msg, context, project)).lastrowid
+                    for user_msg, ai_msg, context, ts in batch] for project, batch in by_project.items()}
+            for project, batch in by_project.items():
+                self._embed_interactions(batch, log_ids[project], project)
+
+    def _embed_interactions(self, items, log_ids, project):
+        try:
+            self.initialize()
+            texts = [f"User: {user_msg}\nAI: {ai_msg}" for user_msg, ai_msg, _, _ in items]
+            docs = self.splitter.create_documents(texts, metadatas=[{"log_id": i, "project": project} for i in log_ids])
+            self.stores(project)[0].add_documents(docs)
+        except Exception as e:
+            # The SQL log is the record of truth; a failed embed only costs recall
+            sys_log.log("MEMORY", f"Vector ingest failed for {len(items)} interactions: {e}", "ERROR")
+            return
+        sys_log.log("MEMORY", f"{len(items)} interaction(s) saved to Long-Term Memory ({project}).")
+
+    def _lexical_search(self, query, k, code_k, scopes):
+        match = fts_query(query)
+        if not match:
+            return [], []
+        marks = ",".join("?" * len(scopes))
+        logs = self.store.query(
+            "SELECT l.id, l.user_msg, snippet(logs_fts, 1, '', '', '…', 64) FROM logs_fts "
+            "JOIN logs l ON l.id = logs_fts.rowid "
+            f"WHERE logs_fts MATCH ? AND COALESCE(l.project, ?) IN ({marks}) ORDER BY bm25(logs_fts) LIMIT ?",
+            (match, GLOBAL, *scopes, k))
+        code = self.store.query(
+            "SELECT c.chunk_id, c.body FROM code_fts JOIN code_chunks c ON c.id = code_fts.rowid "
+            f"WHERE code_fts MATCH ? AND COALESCE(c.project, ?) IN ({marks}) ORDER BY bm25(code_fts) LIMIT ?",
+            (match, GLOBAL, *scopes, code_k)) if code_k else []
+        return ([(("log", rowid), f"User: {user_msg[:200]}\nAI: {ai}") for rowid, user_msg, ai in logs],
+                [(("code", chunk_id), body) for chunk_id, body in code])
+
+    def _vector_search(self, query, k, code_k, project):
+        chat_store, code_store = self.stores(project)
+        # Rows from before namespaces carry no project metadata, so only filter project collections
+        where = {"project": project} if project != GLOBAL else None
+        chat = chat_store.similarity_search(query, k=k, filter=where)
+        # Same query text, so the embedding is served from the cache
+        code = code_store.similarity_search(query, k=code_k, filter=where) if code_k else []
+        return ([(("log", d.metadata["log_id"]) if "log_id" in d.metadata else ("chat", d.page_content), d.page_content)
+                 for d in chat],
+                [(("code", d.id), d.page_content) for d in code])
+
+    def _vector_available(self):
+        if not self.ready.is_set():
+            # Don't block retrieval on a cold vector DB; warm it up in the background instead
+            # (once: later calls only check readiness, a failed warm-up is retried by the next one)
+            with self._warm_lock:
+                if self._warm_thread is None or not self._warm_thread.is_alive():
+                    self._warm_thread = threading.Thread(target=self._safe_initialize, daemon=True)
+                    self._warm_thread.start()
+            return False
+        return time.time() >= self._vector_down_until
+
+    def _safe_initialize(self):
+        try:
+            self.initialize()
+        except Exception as e:
+            sys_log.log("MEMORY", f"Vector DB init failed: {e}", "ERROR")
+
+    def retrieve_context(self, query, k=2, code_k=2, mode=None):
+        chat, code = self.retrieve_candidates(query, k, code_k, mode)
+        return "\n---\n".join(chat + code)
+
+    def retrieve_candidates(self, query, k=4, code_k=4, mode=None):
+        """Ranked (chat texts, code texts), best first, for ContextBuilder to pack."""
+        scopes = self.scopes()
+        with tracer.span("retrieve", mode=mode or self.retrieval_mode, scopes=scopes):
+            return self._retrieve(query, k, code_k, mode, scopes)
+
+    def _retrieve(self, query, k, code_k, mode, scopes):
         sys_log.log("MEMORY", f"Retrieving context for: '{query[:30]}...'")
+        mode = mode or self.retrieval_mode
+        if mode != "lexical" and not self._vector_available():
+            # Fast mode: embeddings are cold, slow or down, so answer from FTS alone
+            mode = "lexical"
+
+        rankings = []
         try:
-            results = self.vector_store.similarity_search(query, k=k)
-            if not results: return ""
-            return "\n---\n".join([doc.page_content for doc in results])
+            if mode != "lexical":
+                start = time.perf_counter()
+                try:
+                    for project in scopes:
+                        rankings += self._vector_search(query, k, code_k, project)
+                except Exception as e:
+                    sys_log.log("MEMORY", f"Vector retrieval failed, using lexical: {e}", "ERROR")
+                    self._vector_down_until = time.time() + self.vector_cooldown_s
+                    mode = "lexical"
+                if time.perf_counter() - start > self.vector_slow_s:
+                    sys_log.log("MEMORY", "Vector retrieval slow, lexical-only for a while", "ERROR")
+                    self._vector_down_until = time.time() + self.vector_cooldown_s
+            if mode != "vector":
+                rankings += self._lexical_search(query, k, code_k, scopes)
         except Exception as e:
             sys_log.log("MEMORY", f"Retrieval Error: {e}", "ERROR")
-            return ""
+
+        # Fuse chat and code separately so each keeps its own k
+        chat = rrf(rankings[0::2], limit=k)
+        code = rrf(rankings[1::2], limit=code_k) if code_k else []
+        self._note_access([key[1] for key, _ in chat if key[0] == "log"])
+        return [text for _, text in chat], [text for _, text in code]
+
+    def _note_access(self, log_ids):
+        if not log_ids:
+            return
+        try:
+            self.store.execute(
+                f"UPDATE logs SET access_count = COALESCE(access_count, 0) + 1, last_access = ? "
+                f"WHERE id IN ({','.join('?' * len(log_ids))})", (time.time(), *log_ids))
+        except Exception as e:
+            sys_log.log("MEMORY", f"Access bookkeeping failed: {e}", "ERROR")
 
     def create_backup(self, file_path):
-        src = Path(file_path)
-        if not src.exists(): return None
-        
-        ts = int(time.time())
-        dest = f"{file_path}.{ts}.bak"
-        shutil.copy2(src, dest)
-        
-        conn = sqlite3.connect(self.db_path)
-        c = conn.cursor()
-        c.execute("INSERT INTO backups (timestamp, original_path, backup_path) VALUES (?, ?, ?)",
-                  (time.time(), str(src), dest))
-        conn.commit()
-        conn.close()
-        sys_log.log("MEMORY", f"Backup created: {dest}")
-        return dest
+        """Snapshot file_path into the backup store. Returns the backup entry (see BackupStore.get)."""
+        return self.backups.save(file_path)
@@ -0,0 +1,93 @@
+import asyncio
+from core.logger import sys_log
+from core.response_cache import ResponseCache
+from core.tracing import tracer
+
+# Non-streaming commands as JSON-in / JSON-out functions of a NeuroAgent, so the
+# app can run them in-process (NeuroAgent.call) or on the daemon (RemoteAgent.call).
+
+
+async def cache(agent, action=""):
+    if action == "on" and agent.response_cache is None:
+        agent.response_cache = ResponseCache(agent.memory.embed_query)
+    elif action == "off":
+        agent.response_cache = None
+    elif action == "clear" and agent.response_cache is not None:
+        agent.response_cache.clear()
+    enabled = agent.response_cache is not None
+    return {"enabled": enabled, "stats": agent.response_cache.stats() if enabled else None}
+
+
+async def backups(agent, action="", target=""):
+    store = agent.memory.backups
+    if action == "diff" and str(target).isdigit():
+        return {"diff": await asyncio.to_thread(store.diff, int(target))}
+    if action == "restore" and str(target).isdigit():
+        if not agent.files.write_allowed:
+            raise PermissionError("Write access denied. Use /allow write")
+        return {"restored": str(await asyncio.to_thread(store.restore, int(target)))}
+    if action == "gc":
+        return {"gc": await asyncio.to_thread(store.gc)}
+    rows = await asyncio.to_thread(store.list, action or None, 20)
+    return {"backups": rows, "stats": await asyncio.to_thread(store.stats)}
+
+
+async def stats(agent, action="", target=""):
+    if action == "export":
+        path = target or "spans.jsonl"
+        return {"exported": await asyncio.to_thread(tracer.export_jsonl, path), "path": path}
+    # Default: this session (in memory); "all": every persisted session
+    spans = await asyncio.to_thread(tracer.load) if action == "all" else None
+    return {"rows": tracer.summary(spans), "ingest": agent.ingest.metrics()}
+
+
+async def log(agent, n=15):
+    return {"lines": sys_log.get_recent_logs(n)}
+
+
+async def index(agent, root=""):
+    # Default: the active project's work tree (the daemon's cwd is not the client's)
+    root = root or await asyncio.to_thread(agent.memory.project_root) or "."
+    return await agent.index_project(root)
+
+
+async def compact(agent):
+    return await agent.compact_memory()
+
+
+async def project(agent, target="", fan_out=None, apply=True):
+    memory = agent.memory
+    if fan_out is not None:
+        memory.fan_out = fan_out
+    selected = memory.project
+    if target:
+        selected = await asyncio.to_thread(memory.find_project, target)
+        if selected is None:
+            raise ValueError(f"Unknown project {target} (not a known name, nor a directory in a git work tree)")
+        if apply:
+            memory.default_project = selected
+    return {"project": selected, "fan_out": memory.fan_out, "projects": await asyncio.to_thread(memory.projects)}
+
+
+async def provider(agent, name):
+    agent.provider_name = name
+    agent._load_provider()
+    return {"provider": name}
+
+
+async def allow_write(agent):
+    agent.files.write_allowed = True
+    return {"write_allowed": True}
+
+
+async def read(agent, path):
+    return {"content": agent.files.read_file(path)}
+
+
+OPS = {f.__name__: f for f in (cache, backups, stats, log, index, compact, project, provider, allow_write, read)}
+
+
+async def run_op(agent, op, params=None):
+    if op not in OPS:
+        raise ValueError(f"Unknown op {op}")
+    return await OPS[op](agent, **(params or {}))
@@ -0,0 +1,40 @@
+import contextvars
+import hashlib
+import re
+from pathlib import Path
+
+# Memory outside any project, and everything stored before namespaces existed
+GLOBAL = "global"
+
+# Set per request by the daemon (each session has its own project); falls back to
+# MemoryManager.default_project. asyncio.to_thread and child tasks inherit it.
+current_project = contextvars.ContextVar("current_project", default=None)
+
+
+def find_root(path="."):
+    """Nearest enclosing git work tree (a .git dir, or a .git file for worktrees/submodules)."""
+    path = Path(path).resolve()
+    for candidate in (path, *path.parents):
+        if (candidate / ".git").exists():
+            return candidate
+    return None
+
+
+def project_id(root):
+    """Stable, collection-name-safe id: readable dir name + hash of the absolute path."""
+    root = Path(root).resolve()
+    slug = re.sub(r"[^a-z0-9]+", "-", root.name.lower()).strip("-")[:40] or "project"
+    return f"{slug}-{hashlib.sha1(str(root).encode('utf-8')).hexdigest()[:8]}"
+
+
+def detect(path="."):
+    """(project id, root) for the git work tree containing path, or (GLOBAL, None)."""
+    root = find_root(path)
+    return (project_id(root), root) if root else (GLOBAL, None)
+
+
+def collection_names(project):
+    if project == GLOBAL:
+        # The collections from before namespaces are the global namespace
+        return "chat_history", "code_index"
+    return f"chat_{project}", f"code_{project}"
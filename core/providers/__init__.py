@@ -1 +0,0 @@
-from . import gemini, ollama, openrouter
@@ -14,15 +14,21 @@ class GeminiProvider(LLMProvider):
         if system:
             contents.append({"role": "user", "parts": [{"text": system}]})
         contents.append({"role": "user", "parts": [{"text": prompt}]})
+        response = None
         try:
-            response = self.client.models.generate_content_stream(
+            # Async client: network reads await on the event loop instead of blocking it
+            response = await self.client.aio.models.generate_content_stream(
                 model=self.model, contents=contents
             )
-            for chunk in response:
+            async for chunk in response:
                 if chunk.text:
                     yield chunk.text
         except Exception as e:
             yield f"\n❌ Gemini error: {str(e)}"
+        finally:
+            # Runs on cancellation / early close too, so the HTTP stream is released
+            if response is not None:
+                await response.aclose()
 
     def models(self):
         return ["gemini-1.5-flash", "gemini-1.5-pro", "gemini-2.0-flash-exp"]
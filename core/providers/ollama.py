@@ -1,41 +1,142 @@
+import asyncio
 import httpx
 import json
+import os
+import threading
+from urllib.parse import urlsplit
 from .base import LLMProvider
+from core.logger import sys_log
+
+
+def base_url(host=None):
+    """OLLAMA_HOST as the ollama CLI takes it: a URL, or a bare "host[:port]" (port defaults to 11434)."""
+    host = (host or os.getenv("OLLAMA_HOST") or "http://localhost:11434").strip().rstrip("/")
+    if "://" in host:
+        return host
+    parts = urlsplit(f"http://{host}")
+    netloc = parts.netloc if not parts.netloc.startswith(":") else f"localhost{parts.netloc}"
+    return f"http://{netloc or 'localhost'}{'' if parts.port else ':11434'}{parts.path}"
+
 
 class OllamaProvider(LLMProvider):
     name = "ollama"
 
+    # One connection pool shared by every instance (router, chat, warm-up)...
+    _client = None
+    _client_loop = None
+    # ...and a blocking one for embeddings, which LangChain requests from worker threads
+    _sync_client = None
+    _sync_lock = threading.Lock()
+    pool_limits = httpx.Limits(
+        max_connections=int(os.getenv("OLLAMA_MAX_CONNECTIONS", "8")),
+        max_keepalive_connections=int(os.getenv("OLLAMA_MAX_KEEPALIVE", "4")),
+        keepalive_expiry=float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "300")),
+    )
+    keep_alive = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+
     def __init__(self, model: str = "llama3.2"):
         self.model = model
-        self.base_url = "http://localhost:11434"
+        self.base_url = base_url()
+
+    @classmethod
+    def configure_pool(cls, **limits):
+        """Override pool limits (httpx.Limits kwargs). Applies to the next client created."""
+        cls.pool_limits = httpx.Limits(**limits)
+
+    @classmethod
+    def client(cls):
+        # httpx clients are bound to the loop they were first used on
+        loop = asyncio.get_running_loop()
+        if cls._client is None or cls._client.is_closed or cls._client_loop is not loop:
+            cls._client = httpx.AsyncClient(
+                timeout=httpx.Timeout(120.0, connect=5.0),
+                limits=cls.pool_limits,
+            )
+            cls._client_loop = loop
+        return cls._client
+
+    @classmethod
+    def sync_client(cls):
+        # httpx.Client is thread-safe: one pool for every embedding thread
+        with cls._sync_lock:
+            if cls._sync_client is None or cls._sync_client.is_closed:
+                cls._sync_client = httpx.Client(
+                    timeout=httpx.Timeout(120.0, connect=5.0),
+                    limits=cls.pool_limits,
+                )
+            return cls._sync_client
+
+    @classmethod
+    async def aclose_pool(cls):
+        if cls._client is not None and not cls._client.is_closed:
+            await cls._client.aclose()
+        cls._client = None
+        cls._client_loop = None
+        with cls._sync_lock:
+            if cls._sync_client is not None:
+                cls._sync_client.close()
+            cls._sync_client = None
 
     async def stream(self, prompt: str, system: str = None):
         messages = []
         if system:
             messages.append({"role": "system", "content": system})
         messages.append({"role": "user", "content": prompt})
-        
+
         try:
-            async with httpx.AsyncClient(timeout=120.0) as client:
-                async with client.stream(
-                    "POST",
-                    f"{self.base_url}/api/chat",
-                    json={"model": self.model, "messages": messages, "stream": True}
-                ) as response:
-                    if response.status_code != 200:
-                        yield f"❌ Ollama Error: HTTP {response.status_code}"
-                        return
-
-                    async for line in response.aiter_lines():
-                        if line.strip():
-                            try:
-                                data = json.loads(line)
-                                if "message" in data:
-                                    yield data["message"].get("content", "")
-                            except json.JSONDecodeError:
-                                continue
+            async with self.client().stream(
+                "POST",
+                f"{self.base_url}/api/chat",
+                json={"model": self.model, "messages": messages, "stream": True, "keep_alive": self.keep_alive}
+            ) as response:
+                if response.status_code != 200:
+                    yield f"❌ Ollama Error: HTTP {response.status_code}"
+                    return
+
+                async for line in response.aiter_lines():
+                    if line.strip():
+                        try:
+                            data = json.loads(line)
+                            if "message" in data:
+                                yield data["message"].get("content", "")
+                        except json.JSONDecodeError:
+                            continue
         except Exception as e:
             yield f"\n❌ Ollama Connection Error: {str(e)}"
 
+    def embed(self, texts, model: str = "nomic-embed-text"):
+        """One vector per text, over the shared blocking pool (call it from a worker thread).
+
+        Uses /api/embeddings, one prompt per request: /api/embed normalizes its
+        vectors, which would not be comparable with the ones already stored.
+        """
+        client = self.sync_client()
+        vectors = []
+        for text in texts:
+            response = client.post(
+                f"{self.base_url}/api/embeddings",
+                json={"model": model, "prompt": text, "keep_alive": self.keep_alive},
+            )
+            response.raise_for_status()
+            vectors.append(response.json()["embedding"])
+        return vectors
+
+    async def warm_up(self, chat_models=("llama3.2",), embed_models=("nomic-embed-text",)):
+        """Preload models into Ollama memory so the first real request skips the cold load."""
+        async def load(endpoint, payload):
+            try:
+                response = await self.client().post(f"{self.base_url}{endpoint}", json=payload)
+                response.raise_for_status()
+                return True
+            except Exception as e:
+                sys_log.log("OLLAMA", f"Warm-up failed for {payload['model']}: {e}", "ERROR")
+                return False
+
+        jobs = [load("/api/generate", {"model": m, "keep_alive": self.keep_alive}) for m in chat_models]
+        jobs += [load("/api/embed", {"model": m, "input": "", "keep_alive": self.keep_alive}) for m in embed_models]
+        results = await asyncio.gather(*jobs)
+        sys_log.log("OLLAMA", f"Warm-up finished: {sum(results)}/{len(results)} models loaded")
+        return all(results)
+
     def models(self):
         return ["llama3.2", "phi3", "mistral", "nomic-embed-text"]
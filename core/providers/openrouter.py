@@ -1,13 +1,14 @@
+import os
 from openai import AsyncOpenAI
 from .base import LLMProvider
 
 class OpenRouterProvider(LLMProvider):
     name = "openrouter"
     
-    def __init__(self, api_key: str, model: str = "xiaomi/mimo-v2-flash:free"):
+    def __init__(self, api_key: str, model: str = "xiaomi/mimo-v2-flash:free", base_url: str = None):
         self.client = AsyncOpenAI(
             api_key=api_key,
-            base_url="https://openrouter.ai/api/v1"
+            base_url=base_url or os.getenv("OPENROUTER_BASE_URL", "https://openrouter.ai/api/v1")
         )
         self.model = model
         self.messages = []
@@ -0,0 +1,126 @@
+import asyncio
+import itertools
+import json
+import os
+from contextlib import suppress
+from core.daemon import DEFAULT_SOCKET, LINE_LIMIT, encode, socket_alive
+from core.projects import GLOBAL, detect
+
+# Params that name files: the daemon has its own cwd, so relative paths are resolved here first
+PATH_PARAMS = {"fix": ("path",), "read": ("path",), "index": ("root",)}
+
+
+class RemoteAgent:
+    """Thin client for an AgentServer. Mirrors the NeuroAgent surface the app uses:
+    stream(), autonomous_fix(), call(), warm_up() and aclose()."""
+
+    remote = True
+
+    def __init__(self, path=DEFAULT_SOCKET):
+        self.path = path
+        self._ids = itertools.count(1)
+        self._replies = {}
+        self._reader_task = None
+        self._writer = None
+        self._connect_lock = asyncio.Lock()
+        # This terminal's memory namespace; sent with every request (the daemon may run elsewhere)
+        self.project, self._root = detect()
+
+    @staticmethod
+    def available(path=DEFAULT_SOCKET):
+        return socket_alive(path)
+
+    async def _connect(self):
+        async with self._connect_lock:
+            if self._writer is not None and not self._writer.is_closing():
+                return
+            reader, self._writer = await asyncio.open_unix_connection(self.path, limit=LINE_LIMIT)
+            self._reader_task = asyncio.create_task(self._read(reader))
+
+    async def _read(self, reader):
+        try:
+            while line := await reader.readline():
+                message = json.loads(line)
+                queue = self._replies.get(message.get("id"))
+                if queue is not None:
+                    queue.put_nowait(message)
+        finally:
+            # Daemon gone: wake every waiter with an error instead of hanging
+            for queue in self._replies.values():
+                queue.put_nowait({"error": "connection to the daemon was lost"})
+            self._writer = None
+
+    @staticmethod
+    def _absolute(op, params):
+        params = dict(params)
+        for key in PATH_PARAMS.get(op, ()):
+            if params.get(key):
+                params[key] = os.path.abspath(params[key])
+        if op == "backups" and params.get("action") not in ("", None, "diff", "restore", "gc"):
+            # "/backups <file>": the action is the file to list
+            params["action"] = os.path.abspath(params["action"])
+        elif op == "stats" and params.get("action") == "export":
+            params["target"] = os.path.abspath(params.get("target") or "spans.jsonl")
+        elif op == "project" and params.get("target") and os.path.isdir(params["target"]):
+            params["target"] = os.path.abspath(params["target"])
+        return params
+
+    async def _request(self, op, params):
+        params = self._absolute(op, params)
+        await self._connect()
+        request_id = next(self._ids)
+        queue = self._replies[request_id] = asyncio.Queue()
+        self._writer.write(encode({"id": request_id, "op": op, "params": params, "project": self.project}))
+        await self._writer.drain()
+        return request_id, queue
+
+    async def _streaming(self, op, **params):
+        request_id, queue = await self._request(op, params)
+        finished = False
+        try:
+            while True:
+                message = await queue.get()
+                if "chunk" in message:
+                    yield message["chunk"]
+                    continue
+                finished = True
+                if "error" in message:
+                    raise RuntimeError(message["error"])
+                return
+        finally:
+            self._replies.pop(request_id, None)
+            if not finished and self._writer is not None:
+                # Consumer stopped early (or was cancelled): stop the work on the daemon too
+                with suppress(Exception):
+                    self._writer.write(encode({"id": request_id, "op": "cancel"}))
+
+    def stream(self, prompt):
+        return self._streaming("stream", prompt=prompt)
+
+    def autonomous_fix(self, file_path, max_attempts=3, candidates=1):
+        return self._streaming("fix", path=file_path, max_attempts=max_attempts, candidates=candidates)
+
+    async def call(self, op, **params):
+        request_id, queue = await self._request(op, params)
+        try:
+            message = await queue.get()
+        finally:
+            self._replies.pop(request_id, None)
+        if "error" in message:
+            raise RuntimeError(message["error"])
+        result = message.get("result")
+        if op == "project" and params.get("target"):
+            self.project = result["project"]
+        return result
+
+    async def warm_up(self):
+        # Registers this terminal's work tree with the daemon (and warms the connection)
+        await self.call("project", target=str(self._root) if self._root else GLOBAL)
+
+    async def aclose(self):
+        if self._writer is not None:
+            self._writer.close()
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+            with suppress(asyncio.CancelledError, Exception):
+                await self._reader_task
@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import time
+from collections import OrderedDict
+import numpy as np
+
+_PATH = re.compile(r"[\w./\\-]+\.[A-Za-z0-9]{1,8}")
+
+
+def referenced_files(*texts):
+    """Existing files mentioned in the prompt/context, with their current mtime."""
+    found = {}
+    for text in texts:
+        for candidate in set(_PATH.findall(text or "")):
+            try:
+                found[candidate] = os.stat(candidate).st_mtime
+            except (OSError, ValueError):
+                continue
+    return found
+
+
+def cache_scope(provider, model, project=""):
+    # Not the retrieved context: a repeated question retrieves the turn saved by its first
+    # answer, so the context differs every time. Freshness comes from the referenced files.
+    # Not the route either: NeuroAgent looks answers up before routing.
+    return hashlib.sha1(f"{provider}\0{model}\0{project}".encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Semantic answer cache: prompts within `threshold` cosine similarity share an answer.
+
+    Entries are scoped by the configured provider/model + project, expire after `ttl` seconds,
+    are evicted LRU beyond `max_entries`, and are dropped as soon as a file
+    mentioned in their prompt or retrieved context changes on disk.
+    """
+
+    def __init__(self, embed_fn, threshold=0.95, ttl=24 * 3600, max_entries=512):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._next_id = 0
+
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.invalidated = 0
+
+    @staticmethod
+    def _unit(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _stale(self, entry, now):
+        if now - entry["created"] > self.ttl:
+            self.expired += 1
+            return True
+        for path, mtime in entry["files"].items():
+            try:
+                if os.stat(path).st_mtime != mtime:
+                    self.invalidated += 1
+                    return True
+            except OSError:
+                self.invalidated += 1
+                return True
+        return False
+
+    def lookup(self, prompt, scope, vector=None):
+        """Returns (answer or None, query vector) so a miss can reuse the embedding in store()."""
+        if vector is None:
+            vector = self.embed_fn(prompt)
+        v = self._unit(vector)
+        now = time.time()
+        best_id, best_sim = None, self.threshold
+        for entry_id, entry in list(self._entries.items()):
+            if entry["scope"] != scope:
+                continue
+            if self._stale(entry, now):
+                del self._entries[entry_id]
+                continue
+            if entry["vector"].shape != v.shape:
+                continue
+            sim = float(entry["vector"] @ v)
+            if sim >= best_sim:
+                best_id, best_sim = entry_id, sim
+
+        if best_id is None:
+            self.misses += 1
+            return None, vector
+        self.hits += 1
+        self._entries.move_to_end(best_id)
+        return self._entries[best_id]["answer"], vector
+
+    def store(self, prompt, scope, answer, vector=None, files=None):
+        if vector is None:
+            vector = self.embed_fn(prompt)
+        self._entries[self._next_id] = {
+            "vector": self._unit(vector),
+            "scope": scope,
+            "answer": answer,
+            "files": files or {},
+            "created": time.time(),
+        }
+        self._next_id += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate_path(self, path):
+        for entry_id, entry in list(self._entries.items()):
+            if path in entry["files"]:
+                del self._entries[entry_id]
+                self.invalidated += 1
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "expired": self.expired,
+            "invalidated": self.invalidated,
+        }
@@ -0,0 +1,21 @@
+import re
+
+_TOKEN = re.compile(r"\w+", re.UNICODE)
+
+
+def fts_query(text, max_terms=24):
+    """Turn free text (tracebacks, identifiers, prose) into a safe FTS5 OR-query."""
+    terms = list(dict.fromkeys(t.lower() for t in _TOKEN.findall(text) if len(t) > 1))[:max_terms]
+    return " OR ".join(f'"{t}"' for t in terms)
+
+
+def rrf(rankings, k=60, limit=None):
+    """Reciprocal rank fusion over ranked lists of (key, text). Returns fused [(key, text)]."""
+    scores, texts = {}, {}
+    for ranking in rankings:
+        for rank, (key, text) in enumerate(ranking):
+            scores[key] = scores.get(key, 0.0) + 1.0 / (k + rank + 1)
+            # First list to supply a key wins the text (vector chunks are listed first)
+            texts.setdefault(key, text)
+    fused = sorted(scores, key=scores.get, reverse=True)
+    return [(key, texts[key]) for key in fused[:limit]]
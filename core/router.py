@@ -0,0 +1,134 @@
+import re
+import time
+from collections import OrderedDict
+import numpy as np
+from core.storage import SQLiteStore
+
+# Weighted keyword hints. Positive pushes towards "complex", negative towards "simple".
+LEXICAL_HINTS = [
+    (r"\b(refactor|rewrite|redesign|architect\w*|migrat\w*)\b", 2.0),
+    (r"\b(optimi[sz]\w*|performance|concurren\w*|thread\w*|async\w*|race condition)\b", 1.5),
+    (r"\b(traceback|exception|stack ?trace|segfault|crash\w*)\b", 1.5),
+    (r"\b(error|bug|fix|debug\w*|broken|wrong|fails?|failing)\b", 1.0),
+    (r"\b(implement|build|design|integrat\w*|api|sdk|deploy\w*|security)\b", 1.0),
+    (r"\bwhy (does|is|do|did)\b", 0.75),
+    (r"^(what is|what's|what does|what are|define|meaning of)\b", -1.5),
+    (r"^(explain|describe|summari[sz]e|list|show|read|open|print|cat)\b", -1.25),
+    (r"\b(how do i|syntax for|example of|difference between)\b", -0.75),
+    (r"^(hi|hello|hey|thanks|thank you|ok|okay)\b", -2.0),
+]
+_COMPILED_HINTS = [(re.compile(p), w) for p, w in LEXICAL_HINTS]
+
+
+def normalize_prompt(prompt: str) -> str:
+    return " ".join(prompt.lower().split()).strip(" ?!.")
+
+
+def classify_lexical(prompt: str):
+    """Cheap keyword/shape classifier. Returns (decision, confidence in [0, 1])."""
+    text = normalize_prompt(prompt)
+    score = sum(w for rx, w in _COMPILED_HINTS if rx.search(text))
+
+    # Prompt shape: pasted code or long requests rarely are "simple"
+    lines = prompt.count("\n")
+    if "```" in prompt or lines > 15:
+        score += 1.5
+    if len(text) > 600:
+        score += 1.0
+    elif len(text) < 60 and score <= 0:
+        score -= 0.5
+
+    decision = "complex" if score > 0 else "simple"
+    confidence = min(abs(score) / 3.0, 1.0)
+    return decision, confidence
+
+
+class RouteCache:
+    """LRU of routing decisions keyed by normalized prompt, persisted to SQLite."""
+
+    def __init__(self, db_path="neuroterm.db", max_entries=2048):
+        self.store = SQLiteStore.open(db_path)
+        self.max_entries = max_entries
+        self._lru = OrderedDict()
+        self._init_sql()
+
+    def _init_sql(self):
+        self.store.execute('''CREATE TABLE IF NOT EXISTS route_cache
+                              (prompt_key TEXT PRIMARY KEY, decision TEXT, tier TEXT, vector BLOB, timestamp REAL)''')
+        rows = self.store.query("SELECT prompt_key, decision, vector FROM route_cache ORDER BY timestamp DESC LIMIT ?",
+                                (self.max_entries,))
+        self.examples = []
+        for key, decision, vector in reversed(rows):
+            self._lru[key] = decision
+            if vector:
+                self.examples.append((np.frombuffer(vector, dtype=np.float32), decision))
+
+    def get(self, key):
+        decision = self._lru.get(key)
+        if decision is not None:
+            self._lru.move_to_end(key)
+        return decision
+
+    def put(self, key, decision, tier, vector=None):
+        self._lru[key] = decision
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+        blob = np.asarray(vector, dtype=np.float32).tobytes() if vector is not None else None
+        self.store.execute("INSERT OR REPLACE INTO route_cache (prompt_key, decision, tier, vector, timestamp) VALUES (?, ?, ?, ?, ?)",
+                           (key, decision, tier, blob, time.time()))
+
+
+class EmbeddingVoter:
+    """k-nearest-neighbour vote over embeddings of previously routed prompts."""
+
+    def __init__(self, k=5, max_examples=2048):
+        self.k = k
+        self.max_examples = max_examples
+        self._vectors = np.zeros((0, 0), dtype=np.float32)
+        self._labels = []
+
+    @staticmethod
+    def _unit(vector):
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def load(self, examples):
+        vectors = [self._unit(v) for v, _ in examples]
+        if not vectors or len({v.shape[0] for v in vectors}) != 1:
+            return
+        self._vectors = np.vstack(vectors)[-self.max_examples:]
+        self._labels = [d for _, d in examples][-self.max_examples:]
+
+    def add(self, vector, decision):
+        v = self._unit(vector)[None, :]
+        if self._vectors.size and self._vectors.shape[1] != v.shape[1]:
+            # Embedding model changed, old examples are no longer comparable
+            self._vectors, self._labels = np.zeros((0, 0), dtype=np.float32), []
+        self._vectors = v if not self._vectors.size else np.vstack([self._vectors, v])
+        self._labels.append(decision)
+        if len(self._labels) > self.max_examples:
+            self._vectors = self._vectors[-self.max_examples:]
+            self._labels = self._labels[-self.max_examples:]
+
+    def vote(self, vector):
+        """Returns (decision, confidence) or (None, 0.0) when there is nothing to compare against."""
+        if len(self._labels) < self.k:
+            return None, 0.0
+        v = self._unit(vector)
+        if v.shape[0] != self._vectors.shape[1]:
+            return None, 0.0
+        sims = self._vectors @ v
+        top = np.argsort(sims)[-self.k:]
+        weights = {"simple": 0.0, "complex": 0.0}
+        for i in top:
+            weights[self._labels[i]] += max(float(sims[i]), 0.0)
+        total = sum(weights.values())
+        if not total:
+            return None, 0.0
+        decision = max(weights, key=weights.get)
+        # Agreement among neighbours, discounted when even the best match is far away
+        confidence = (weights[decision] / total) * min(float(sims[top[-1]]) / 0.9, 1.0)
+        return decision, confidence
@@ -0,0 +1,117 @@
+import atexit
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+
+def data_home():
+    """NEUROTERM_HOME, else the per-user data dir ($XDG_DATA_HOME/neuroterm, default ~/.local/share/neuroterm)."""
+    home = os.getenv("NEUROTERM_HOME")
+    if home:
+        return Path(home).expanduser()
+    return Path(os.getenv("XDG_DATA_HOME") or Path.home() / ".local" / "share") / "neuroterm"
+
+
+def data_path(path):
+    """Relative data paths live under data_home(), so every directory codevue is started
+    from shares one store (projects are namespaces in it) and the install can be read-only."""
+    if Path(path).is_absolute():
+        return Path(path)
+    home = data_home()
+    # Private: chat history, backups and the daemon socket live here
+    home.mkdir(mode=0o700, parents=True, exist_ok=True)
+    return home / path
+
+
+class SQLiteStore:
+    """One long-lived, WAL-mode connection per database file, shared across the app.
+
+    The connection is used from the event loop and from worker threads
+    (ingest, retrieval), so every call is serialized through a lock.
+    """
+    _stores = {}
+    _stores_lock = threading.Lock()
+
+    PRAGMAS = (
+        "PRAGMA journal_mode=WAL",
+        "PRAGMA synchronous=NORMAL",   # durable at checkpoints, no fsync per commit in WAL
+        "PRAGMA cache_size=-16000",    # ~16MB page cache
+        "PRAGMA temp_store=MEMORY",
+        "PRAGMA busy_timeout=5000",
+    )
+
+    def __init__(self, db_path):
+        self.db_path = str(db_path)
+        self._lock = threading.RLock()
+        # cached_statements keeps our handful of hot queries prepared
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False, cached_statements=256)
+        for pragma in self.PRAGMAS:
+            self.conn.execute(pragma)
+
+    @classmethod
+    def open(cls, db_path):
+        db_path = data_path(db_path)
+        key = str(db_path.resolve())
+        with cls._stores_lock:
+            store = cls._stores.get(key)
+            if store is None:
+                store = cls._stores[key] = cls(db_path)
+            return store
+
+    @classmethod
+    def close_all(cls):
+        with cls._stores_lock:
+            for store in cls._stores.values():
+                store.close()
+            cls._stores.clear()
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            try:
+                yield self.conn
+                self.conn.commit()
+            except BaseException:
+                self.conn.rollback()
+                raise
+
+    def execute(self, sql, params=()):
+        with self.transaction() as conn:
+            return conn.execute(sql, params)
+
+    def executemany(self, sql, rows):
+        with self.transaction() as conn:
+            conn.executemany(sql, rows)
+
+    def executescript(self, script):
+        with self.transaction() as conn:
+            conn.executescript(script)
+
+    def vacuum(self):
+        """Rebuild the file without free pages and truncate the WAL. Returns bytes reclaimed."""
+        with self._lock:
+            before = self.size()
+            self.conn.commit()
+            self.conn.execute("VACUUM")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            return before - self.size()
+
+    def size(self):
+        """Bytes on disk, WAL included."""
+        return sum(Path(self.db_path + suffix).stat().st_size
+                   for suffix in ("", "-wal") if Path(self.db_path + suffix).exists())
+
+    def query(self, sql, params=()):
+        with self._lock:
+            return self.conn.execute(sql, params).fetchall()
+
+    def close(self):
+        with self._lock:
+            try:
+                self.conn.execute("PRAGMA optimize")
+            except sqlite3.Error:
+                pass
+            self.conn.close()
+
+atexit.register(SQLiteStore.close_all)
@@ -0,0 +1,192 @@
+import asyncio
+import time
+from contextlib import suppress
+from core.logger import sys_log
+
+_DONE = object()
+
+
+def is_error(item):
+    """Providers report failures as a "❌ ..." chunk rather than raising."""
+    return item is None or isinstance(item, Exception) or item.lstrip().startswith("❌")
+
+
+class PrefetchedStream:
+    """Drains an async token stream in the background so it can start before anyone consumes it."""
+
+    def __init__(self, source):
+        self._source = source
+        self._queue = asyncio.Queue()
+        self.first_token = asyncio.Event()
+        # First item (token or exception); None if the source ended without one
+        self.first = None
+        self._task = asyncio.create_task(self._pump())
+
+    async def _pump(self):
+        try:
+            async for token in self._source:
+                if not self.first_token.is_set():
+                    self.first = token
+                self._queue.put_nowait(token)
+                self.first_token.set()
+        except Exception as e:
+            if not self.first_token.is_set():
+                self.first = e
+            self._queue.put_nowait(e)
+        finally:
+            self._queue.put_nowait(_DONE)
+            self.first_token.set()
+
+    async def __aiter__(self):
+        try:
+            while True:
+                item = await self._queue.get()
+                if item is _DONE:
+                    return
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            if not self._task.done():
+                await self.cancel()
+
+    async def cancel(self):
+        self._task.cancel()
+        with suppress(asyncio.CancelledError):
+            await self._task
+        with suppress(Exception):
+            await self._source.aclose()
+
+
+class CircuitBreaker:
+    """Per-provider breaker: after `threshold` consecutive failures a provider is
+    skipped for `cooldown` seconds, then let through for one trial request."""
+
+    def __init__(self, threshold=3, cooldown=30.0):
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self._failures = {}
+        self._opened = {}
+
+    def allow(self, name):
+        opened = self._opened.get(name)
+        if opened is None:
+            return True
+        if time.monotonic() - opened < self.cooldown:
+            return False
+        # Half-open: this request is the trial, everyone else waits another cooldown
+        self._opened[name] = time.monotonic()
+        return True
+
+    def success(self, name):
+        self._failures[name] = 0
+        if self._opened.pop(name, None) is not None:
+            sys_log.log("BREAKER", f"{name} recovered, circuit closed")
+
+    def failure(self, name):
+        self._failures[name] = self._failures.get(name, 0) + 1
+        if self._failures[name] >= self.threshold:
+            if name not in self._opened:
+                sys_log.log("BREAKER", f"{name} failed {self._failures[name]}x in a row, "
+                                       f"skipping it for {self.cooldown:.0f}s", "ERROR")
+            self._opened[name] = time.monotonic()
+
+    def state(self):
+        now = time.monotonic()
+        return {name: "open" if now - opened < self.cooldown else "half-open"
+                for name, opened in self._opened.items()}
+
+
+class HedgedStream:
+    """Streams from the first of several providers to produce a usable token.
+
+    sources: [(name, start)] in preference order, start() returning a token stream.
+    The first allowed source starts immediately. Another is started when the
+    running ones have been silent for `hedge_after` seconds (None: never), or
+    as soon as one fails before its first token. The first good first token
+    wins; the rest are cancelled. If every source fails, the last error is
+    streamed as-is.
+    """
+
+    def __init__(self, sources, hedge_after=None, breaker=None):
+        self.sources = list(sources)
+        self.hedge_after = hedge_after
+        self.breaker = breaker
+        self.winner = None
+        self.failed = []
+        self.skipped = []
+
+    def _launch(self, queue, running):
+        while queue:
+            name, start = queue.pop(0)
+            if self.breaker is not None and not self.breaker.allow(name):
+                sys_log.log("HEDGE", f"Skipping {name}: circuit open", "DEBUG")
+                self.skipped.append(name)
+                continue
+            try:
+                running[name] = PrefetchedStream(start())
+                return True
+            except Exception as e:
+                sys_log.log("HEDGE", f"Could not start {name}: {e}", "ERROR")
+                self._fail(name)
+        return False
+
+    def _fail(self, name):
+        self.failed.append(name)
+        if self.breaker is not None:
+            self.breaker.failure(name)
+
+    async def _race(self):
+        queue, running, last_error = list(self.sources), {}, None
+        if not self._launch(queue, running) and not self.failed and self.sources:
+            # Every circuit is open: trying the primary beats failing outright
+            name, start = self.sources[0]
+            running[name] = PrefetchedStream(start())
+        try:
+            while running:
+                waits = {asyncio.create_task(s.first_token.wait()): name for name, s in running.items()}
+                done, _ = await asyncio.wait(waits, timeout=self.hedge_after if queue else None,
+                                             return_when=asyncio.FIRST_COMPLETED)
+                for task in waits:
+                    task.cancel()
+                if not done:
+                    sys_log.log("HEDGE", f"No first token after {self.hedge_after}s from {', '.join(running)}, "
+                                         "starting another provider")
+                    self._launch(queue, running)
+                    continue
+                for task in done:
+                    name = waits[task]
+                    stream = running.pop(name)
+                    if not is_error(stream.first):
+                        return name, stream
+                    sys_log.log("HEDGE", f"{name} failed before its first token: {str(stream.first).strip()}", "ERROR")
+                    self._fail(name)
+                    if last_error is not None:
+                        await last_error[1].cancel()
+                    last_error = (name, stream)
+                if not running:
+                    self._launch(queue, running)
+            return last_error
+        finally:
+            for stream in running.values():
+                await stream.cancel()
+
+    async def __aiter__(self):
+        result = await self._race()
+        if result is None:
+            return
+        self.winner, stream = result
+        # None: the consumer stopped early, which says nothing about the provider
+        verdict, failed = None, False
+        try:
+            async for token in stream:
+                failed = failed or is_error(token)
+                yield token
+            verdict = not failed
+        except Exception:
+            verdict = False
+            raise
+        finally:
+            # A winner from self.failed is the all-failed error stream, already counted
+            if verdict is not None and self.breaker is not None and self.winner not in self.failed:
+                (self.breaker.success if verdict else self.breaker.failure)(self.winner)
@@ -0,0 +1,152 @@
+import asyncio
+import atexit
+import contextvars
+import json
+import math
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from core.logger import sys_log
+from core.storage import SQLiteStore
+
+# Set per request by start_trace(); asyncio.to_thread and child tasks inherit it
+current_trace = contextvars.ContextVar("current_trace", default=None)
+
+
+def percentile(values, q):
+    """Nearest-rank percentile (q in 0..100) of an unsorted list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[max(math.ceil(q / 100 * len(ordered)) - 1, 0)]
+
+
+class Tracer:
+    """Cheap per-stage timing spans.
+
+    record()/span() only append a dict to in-memory buffers. Spans reach the
+    `spans` SQLite table in batches via flush(): from maybe_flush() on a worker
+    thread once `flush_every` are pending, and at exit.
+    """
+
+    def __init__(self, db_path="neuroterm.db", max_spans=20_000, flush_every=200, retention_days=14):
+        self.db_path = db_path
+        self.flush_every = flush_every
+        self.retention_days = retention_days
+        self.spans = deque(maxlen=max_spans)
+        self._pending = []
+        self._lock = threading.Lock()
+        self._store = None
+        atexit.register(self.flush)
+
+    @property
+    def store(self):
+        if self._store is None:
+            store = SQLiteStore.open(self.db_path)
+            store.executescript('''
+                CREATE TABLE IF NOT EXISTS spans
+                    (id INTEGER PRIMARY KEY, trace_id TEXT, name TEXT, provider TEXT,
+                     start REAL, duration_ms REAL, attrs TEXT);
+                CREATE INDEX IF NOT EXISTS idx_spans_start ON spans(start);
+            ''')
+            store.execute("DELETE FROM spans WHERE start < ?", (time.time() - self.retention_days * 86400,))
+            self._store = store
+        return self._store
+
+    def start_trace(self):
+        trace_id = uuid.uuid4().hex[:16]
+        current_trace.set(trace_id)
+        return trace_id
+
+    def record(self, name, duration_ms, provider=None, start=None, **attrs):
+        span = {
+            "trace_id": current_trace.get(),
+            "name": name,
+            "provider": provider,
+            "start": start if start is not None else time.time() - duration_ms / 1000,
+            "duration_ms": round(duration_ms, 3),
+            "attrs": attrs,
+        }
+        with self._lock:
+            self.spans.append(span)
+            self._pending.append(span)
+        return span
+
+    @contextmanager
+    def span(self, name, provider=None, **attrs):
+        """Time a block. Yields the attrs dict so the block can add fields (tokens, tier, ...)."""
+        start, t0 = time.time(), time.perf_counter()
+        try:
+            yield attrs
+        except (GeneratorExit, asyncio.CancelledError):
+            attrs["error"] = "cancelled"
+            raise
+        except Exception as e:
+            attrs["error"] = type(e).__name__
+            raise
+        finally:
+            # The block may only learn the provider part-way through (e.g. after routing)
+            provider = attrs.pop("provider", provider)
+            self.record(name, (time.perf_counter() - t0) * 1000, provider, start, **attrs)
+
+    def trace(self, trace_id):
+        """This session's spans for one trace, oldest first."""
+        with self._lock:
+            return [s for s in self.spans if s["trace_id"] == trace_id]
+
+    def flush(self):
+        with self._lock:
+            pending, self._pending = self._pending, []
+        if not pending:
+            return 0
+        try:
+            self.store.executemany(
+                "INSERT INTO spans (trace_id, name, provider, start, duration_ms, attrs) VALUES (?, ?, ?, ?, ?, ?)",
+                [(s["trace_id"], s["name"], s["provider"], s["start"], s["duration_ms"], json.dumps(s["attrs"]))
+                 for s in pending])
+        except Exception as e:
+            sys_log.log("TRACE", f"Span flush failed: {e}", "ERROR")
+            return 0
+        return len(pending)
+
+    async def maybe_flush(self):
+        if len(self._pending) >= self.flush_every:
+            await asyncio.to_thread(self.flush)
+
+    def load(self, since=None):
+        """Persisted spans (all sessions), oldest first."""
+        self.flush()
+        rows = self.store.query(
+            "SELECT trace_id, name, provider, start, duration_ms, attrs FROM spans WHERE start >= ? ORDER BY start",
+            (since or 0,))
+        return [{"trace_id": r[0], "name": r[1], "provider": r[2], "start": r[3], "duration_ms": r[4],
+                 "attrs": json.loads(r[5] or "{}")} for r in rows]
+
+    def summary(self, spans=None):
+        """p50/p95/p99 per (stage, provider). Defaults to this session's in-memory spans."""
+        if spans is None:
+            with self._lock:
+                spans = list(self.spans)
+        groups = defaultdict(list)
+        rates = defaultdict(list)
+        for s in spans:
+            key = (s["name"], s["provider"] or "-")
+            groups[key].append(s["duration_ms"])
+            if "tok_s" in s["attrs"]:
+                rates[key].append(s["attrs"]["tok_s"])
+        return [{
+            "stage": name, "provider": provider, "count": len(values),
+            "p50": percentile(values, 50), "p95": percentile(values, 95), "p99": percentile(values, 99),
+            "tok_s": percentile(rates[(name, provider)], 50) if rates[(name, provider)] else None,
+        } for (name, provider), values in sorted(groups.items())]
+
+    def export_jsonl(self, path, since=None):
+        spans = self.load(since)
+        with open(path, "w", encoding="utf-8") as f:
+            for s in spans:
+                f.write(json.dumps(s) + "\n")
+        return len(spans)
+
+tracer = Tracer()
@@ -0,0 +1,267 @@
+import itertools
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from core.projects import find_root
+
+# Directories never worth indexing or walking into
+IGNORED_DIRS = {".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", "env",
+                ".mypy_cache", ".pytest_cache", ".ruff_cache", ".tox", ".nox", "dist", "build",
+                "neuroterm_chroma", "neuroterm_backups"}
+
+# path: root-joined like os.scandir's entry.path; rel: "/"-separated, relative to the walk root;
+# kind: "d" directory, "f" regular file, "o" anything else (symlinks are listed, never followed)
+WalkEntry = namedtuple("WalkEntry", "path rel name depth kind")
+
+_versions = itertools.count()
+
+
+def _translate(pattern):
+    """gitignore glob -> regex source: * and ? stop at "/", ** spans directories."""
+    out, i, n = [], 0, len(pattern)
+    while i < n:
+        c = pattern[i]
+        if c == "*":
+            if pattern.startswith("**", i) and (i == 0 or pattern[i - 1] == "/"):
+                if i + 2 == n:
+                    out.append(".*")
+                    i += 2
+                    continue
+                if pattern[i + 2] == "/":
+                    out.append("(?:.*/)?")
+                    i += 3
+                    continue
+            out.append("[^/]*")
+            while i < n and pattern[i] == "*":
+                i += 1
+            continue
+        if c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 2 if pattern[i + 1:i + 2] in ("!", "^") else i + 1)
+            if end == -1:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end]
+                if body[:1] in ("!", "^"):
+                    body = "^" + body[1:]
+                out.append(f"[{body.replace(chr(92), chr(92) * 2)}]")
+                i = end
+        elif c == "\\" and i + 1 < n:
+            i += 1
+            out.append(re.escape(pattern[i]))
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class IgnoreRules:
+    """The patterns of one .gitignore, matched against paths relative to its directory."""
+
+    def __init__(self, lines):
+        # Identifies this parse in DirWalker's cached children (a reloaded file gets a new one)
+        self.version = next(_versions)
+        self.rules = []  # (regex, negate, dir_only, basename_only)
+        for line in lines:
+            line = line.rstrip("\n")
+            if not line.endswith("\\ "):
+                line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate or line.startswith("\\!") or line.startswith("\\#"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # No "/" left (besides a trailing one): matches a name at any depth
+            basename_only = "/" not in line
+            try:
+                regex = re.compile(_translate(line.lstrip("/")), re.DOTALL)
+            except re.error:
+                continue
+            self.rules.append((regex, negate, dir_only, basename_only))
+        # Without negations every rule means "ignored": one alternation per kind of rule
+        self._combined = None
+        if not any(negate for _, negate, _, _ in self.rules):
+            self._combined = {}
+            for dir_only in (False, True):
+                for basename_only in (False, True):
+                    sources = [r.pattern for r, _, d, b in self.rules if d == dir_only and b == basename_only]
+                    if sources:
+                        self._combined[dir_only, basename_only] = re.compile("|".join(f"(?:{s})" for s in sources),
+                                                                            re.DOTALL)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding="utf-8", errors="replace") as f:
+            return cls(f.readlines())
+
+    def match(self, rel, is_dir):
+        """True (ignored), False (re-included by a "!" rule) or None (no rule applies)."""
+        name = rel.rsplit("/", 1)[-1]
+        if self._combined is not None:
+            for (dir_only, basename_only), regex in self._combined.items():
+                if (is_dir or not dir_only) and regex.fullmatch(name if basename_only else rel):
+                    return True
+            return None
+        # Last matching rule wins
+        for regex, negate, dir_only, basename_only in reversed(self.rules):
+            if (is_dir or not dir_only) and regex.fullmatch(name if basename_only else rel):
+                return not negate
+        return None
+
+
+class DirWalker:
+    """Iterative os.scandir walker with .gitignore support and a cached snapshot.
+
+    Each directory's listing (names and types) is kept with the directory's
+    mtime, which changes whenever an entry is added, removed or renamed, so an
+    unchanged directory costs one stat() instead of a scandir(); the filtered
+    children are kept too, per set of ignore rules in effect. Directories
+    modified within the last `racy_s` seconds are not cached (a change in the
+    same mtime tick would go unnoticed). File metadata is never cached.
+    """
+
+    def __init__(self, max_dirs=100_000, racy_s=2.0):
+        self.max_dirs = max_dirs
+        self.racy_ns = int(racy_s * 1e9)
+        self._dirs = OrderedDict()  # dir path -> [mtime_ns, listing, rules key, children]
+        self._ignores = {}  # .gitignore path -> (mtime_ns, size, IgnoreRules)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _listing(self, path):
+        """[mtime_ns, sorted [(name, kind)], rules key, filtered children] for a directory."""
+        mtime = os.stat(path).st_mtime_ns
+        with self._lock:
+            cached = self._dirs.get(path)
+            if cached is not None and cached[0] == mtime:
+                self._dirs.move_to_end(path)
+                self.hits += 1
+                return cached
+        listing = []
+        with os.scandir(path) as it:
+            for entry in it:
+                try:
+                    kind = "d" if entry.is_dir(follow_symlinks=False) else \
+                        "f" if entry.is_file(follow_symlinks=False) else "o"
+                except OSError:
+                    continue
+                listing.append((entry.name, kind))
+        listing.sort()
+        snapshot = [mtime, listing, None, None]
+        with self._lock:
+            self.misses += 1
+            if time.time_ns() - mtime > self.racy_ns:
+                self._dirs[path] = snapshot
+                while len(self._dirs) > self.max_dirs:
+                    self._dirs.popitem(last=False)
+        return snapshot
+
+    def _rules(self, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        cached = self._ignores.get(path)
+        if cached is not None and cached[:2] == (st.st_mtime_ns, st.st_size):
+            return cached[2]
+        try:
+            rules = IgnoreRules.load(path)
+        except OSError:
+            return None
+        self._ignores[path] = (st.st_mtime_ns, st.st_size, rules)
+        return rules
+
+    def _outer_rules(self, root):
+        """Ignore files between the git root and root itself (exclusive), as (prefix, rules) outermost first."""
+        top = find_root(root)
+        if top is None:
+            return []
+        root = os.path.realpath(root)
+        chain = []
+        exclude = self._rules(os.path.join(top, ".git", "info", "exclude"))
+        if exclude is not None:
+            chain.append((os.path.relpath(root, top), exclude))
+        current = str(top)
+        for part in ([] if root == current else os.path.relpath(root, current).split(os.sep)):
+            rules = self._rules(os.path.join(current, ".gitignore"))
+            if rules is not None:
+                chain.append((os.path.relpath(root, current), rules))
+            current = os.path.join(current, part)
+        # Paths under root are matched as "<prefix>/<rel>" against these
+        return [(prefix.replace(os.sep, "/") + "/" if prefix != "." else "", 0, rules) for prefix, rules in chain]
+
+    @staticmethod
+    def _ignored(chain, rel, is_dir):
+        # Innermost .gitignore that has an opinion wins
+        for prefix, strip, rules in reversed(chain):
+            verdict = rules.match(prefix + rel[strip:], is_dir)
+            if verdict is not None:
+                return verdict
+        return False
+
+    def _children(self, path, rel, chain, gitignore):
+        """Filtered, sorted [(name, kind)] of one directory and the rule chain for its subtree."""
+        snapshot = self._listing(path)
+        _, listing, key, children = snapshot
+        if gitignore and (".gitignore", "f") in listing:
+            rules = self._rules(os.path.join(path, ".gitignore"))
+            if rules is not None:
+                chain = chain + [("", len(rel) + 1 if rel else 0, rules)]
+        rules_key = tuple(rules.version for _, _, rules in chain) if gitignore else None
+        if children is not None and key == rules_key:
+            return children, chain
+        children = []
+        for name, kind in listing:
+            if kind == "d" and (name in IGNORED_DIRS or name.endswith(".egg-info")):
+                continue
+            if gitignore and chain and self._ignored(chain, f"{rel}/{name}" if rel else name, kind == "d"):
+                continue
+            children.append((name, kind))
+        snapshot[2], snapshot[3] = rules_key, children
+        return children, chain
+
+    def walk(self, root=".", max_depth=None, max_entries=None, extensions=None, files_only=False, gitignore=True):
+        """Yield WalkEntry for everything under root, depth-first in name order (tree order),
+        lazily so callers can render or stop early. Entries directly in root have depth 1;
+        directories deeper than max_depth are listed but not entered."""
+        root = str(root)
+        chain = self._outer_rules(root) if gitignore else []
+        emitted = 0
+        try:
+            children, chain = self._children(root, "", chain, gitignore)
+        except OSError:
+            return
+        stack = [(iter(children), root, "", 1, chain)]
+        while stack:
+            it, path, rel, depth, chain = stack[-1]
+            child = next(it, None)
+            if child is None:
+                stack.pop()
+                continue
+            name, kind = child
+            child_path = os.path.join(path, name)
+            child_rel = f"{rel}/{name}" if rel else name
+            if kind != "d" and extensions and os.path.splitext(name)[1] not in extensions:
+                continue
+            if kind == "f" or not files_only:
+                if max_entries is not None and emitted >= max_entries:
+                    return
+                emitted += 1
+                yield WalkEntry(child_path, child_rel, name, depth, kind)
+            if kind == "d" and (max_depth is None or depth < max_depth):
+                try:
+                    grandchildren, sub_chain = self._children(child_path, child_rel, chain, gitignore)
+                except OSError:
+                    continue
+                stack.append((iter(grandchildren), child_path, child_rel, depth + 1, sub_chain))
+
+    def stats(self):
+        return {"cached_dirs": len(self._dirs), "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,113 @@
+from rich.markdown import Markdown
+from textual.widgets import Static
+
+FENCES = ("```", "~~~")
+
+
+class MarkdownStreamBuffer:
+    """Splits a growing Markdown response into committed blocks and an open tail.
+
+    Everything up to the last blank line outside a code fence (or the end of a
+    closed fence) is finished: feed() hands it back once and it is never parsed
+    again. Only the tail, the block still being written, is re-rendered per
+    frame. Code blocks longer than max_open_lines are cut into separately
+    fenced pieces, and text that runs past max_open_lines or max_open_chars
+    without a blank line is committed up to its last complete line, so the
+    tail stays bounded.
+    """
+
+    def __init__(self, max_open_lines=40, max_open_chars=4000):
+        self.max_open_lines = max_open_lines
+        self.max_open_chars = max_open_chars
+        self.tail = ""
+
+    def feed(self, text):
+        """Add text; return the newly completed Markdown (possibly "")."""
+        self.tail += text
+        lines = self.tail.split("\n")
+        committed = []
+        start = 0
+        fence = opener = None
+        fence_start = size = 0
+
+        # The last element is a partial line and is never committed
+        for i in range(len(lines) - 1):
+            stripped = lines[i].strip()
+            size += len(lines[i]) + 1
+            if fence is None:
+                if stripped.startswith(FENCES):
+                    fence, opener, fence_start = stripped[:3], lines[i], i
+                elif not stripped or i + 1 - start >= self.max_open_lines or size >= self.max_open_chars:
+                    # A blank line ends the block; a long run without one is cut at this line
+                    committed.append("\n".join(lines[start:i + 1]))
+                    start, size = i + 1, 0
+            elif stripped.startswith(fence) and set(stripped) <= {fence[0]}:
+                fence = None
+                committed.append("\n".join(lines[start:i + 1]))
+                start, size = i + 1, 0
+            elif i - fence_start >= self.max_open_lines:
+                # Close the block after this line and reopen it for the tail
+                committed.append("\n".join(lines[start:i + 1]) + "\n" + fence)
+                lines[i] = opener
+                start = fence_start = i
+
+        self.tail = "\n".join(lines[start:])
+        return "\n".join(piece for piece in committed if piece.strip())
+
+    def flush(self):
+        tail, self.tail = self.tail, ""
+        return tail
+
+
+class StreamingMarkdown(Static):
+    """Live view of the response being generated, docked under the chat log.
+
+    Tokens are buffered by append() and rendered at most `fps` times a second.
+    Finished blocks move into the RichLog (rendered once); this widget only
+    ever renders the open trailing block, so cost per frame stays flat no
+    matter how long the answer gets.
+    """
+
+    DEFAULT_CSS = """
+    StreamingMarkdown { height: auto; max-height: 50%; display: none; }
+    StreamingMarkdown.streaming { display: block; }
+    """
+
+    def __init__(self, fps=15, **kwargs):
+        super().__init__("", **kwargs)
+        self.fps = fps
+        self._buffer = MarkdownStreamBuffer()
+        self._pending = []
+        self._log = None
+        self._timer = None
+
+    def begin(self, log_widget, prefix=""):
+        self._log = log_widget
+        self._buffer = MarkdownStreamBuffer()
+        self._pending = [prefix] if prefix else []
+        self.add_class("streaming")
+        self._timer = self.set_interval(1 / self.fps, self._render_frame)
+
+    def append(self, token):
+        self._pending.append(token)
+
+    def _render_frame(self):
+        if not self._pending:
+            return
+        text = "".join(self._pending)
+        self._pending.clear()
+        committed = self._buffer.feed(text)
+        if committed:
+            self._log.write(Markdown(committed))
+        self.update(Markdown(self._buffer.tail))
+
+    def end(self):
+        if self._timer is not None:
+            self._timer.stop()
+            self._timer = None
+        self._render_frame()
+        tail = self._buffer.flush()
+        if tail.strip() and self._log is not None:
+            self._log.write(Markdown(tail))
+        self.update("")
+        self.remove_class("streaming")